@@ -3,12 +3,14 @@ VibeBuilder V2 - Architect Agent
 Uses Gemini for planning
 """
 
-import google.generativeai as genai
 from typing import Dict, List
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from prompts import ARCHITECT_PROMPT
+from utils.usage import usage_from_response
+from utils.response_schemas import PLAN_SCHEMA, json_config, try_parse
+from .client import ModelClient
 
 
 class ArchitectAgent:
@@ -16,16 +18,17 @@ class ArchitectAgent:
     Architect Agent - Plans architecture concisely
     """
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key, transport='rest')
+    def __init__(self, api_key: str, client: ModelClient = None):
+        self.client = client or ModelClient(api_key)
         self.thinking_model = 'gemini-2.5-flash' # Using 2.5 Flash for thinking as well
         self.fallback_model = 'gemini-2.5-flash'
-        self.model = genai.GenerativeModel(
+        self.model = self.client.model(
             'gemini-2.5-flash', # Simplified: Always use flash for planning speed
-            generation_config=genai.GenerationConfig(
-                temperature=0.4,
-                max_output_tokens=1024,
-            )
+            generation_config={
+                "temperature": 0.4,
+                "max_output_tokens": 1024,
+                **json_config(PLAN_SCHEMA)
+            }
         )
     
     def plan(self, idea: str, research: str = "") -> Dict:
@@ -37,11 +40,8 @@ class ArchitectAgent:
 ## App Idea: {idea}
 ## Research: {research[:500]}
 
-Define the technical blueprint. 
-Provide:
-1. "Architect Thoughts" (concise reasoning)
-2. "Core Components" (bullet points)
-3. "Plan" (high-level technical description)
+Define the technical blueprint: your concise reasoning (thoughts), the core UI
+components, and a high-level technical plan.
 
 Be extremely professional and brief."""
 
@@ -49,15 +49,24 @@ Be extremely professional and brief."""
             print(f"[ArchitectAgent] Planning: {idea}")
             response = self.model.generate_content(prompt)
             
-            plan_text = response.text if response.text else ""
-            thinking = self._extract_section(plan_text, "Architect Thoughts")
-            components = self._extract_components(plan_text)
+            blueprint = try_parse(response.text, PLAN_SCHEMA)
+            if blueprint is not None:
+                thinking = blueprint["thoughts"].strip()
+                components = [c.strip()[:50] for c in blueprint["components"] if c.strip()]
+                # The coder reads the same sections the free-text plan had
+                plan_text = self._render_plan(thinking, components, blueprint["plan"].strip())
+            else:
+                plan_text = response.text if response.text else ""
+                thinking = self._extract_section(plan_text, "Architect Thoughts")
+                components = self._extract_components(plan_text)
             
             return {
                 "success": True,
                 "thinking": thinking or f"Designing a modular structure for {idea}.",
                 "plan": plan_text,
-                "components": components if components else ["UI Shell", "State Manager", "Feature Modules"]
+                "components": components if components else ["UI Shell", "State Manager", "Feature Modules"],
+                "structured": blueprint is not None,
+                "usage": usage_from_response(response)
             }
             
         except Exception as e:
@@ -68,6 +77,11 @@ Be extremely professional and brief."""
                 "components": ["HTML Structure", "CSS Styles", "JS Logic"]
             }
     
+    @staticmethod
+    def _render_plan(thinking: str, components: List[str], plan: str) -> str:
+        bullets = '\n'.join(f"- {component}" for component in components)
+        return f"**Architect Thoughts**: {thinking}\n**Core Components**:\n{bullets}\n**Plan**: {plan}"
+
     def _extract_section(self, text: str, section_name: str) -> str:
         if section_name not in text: return ""
         lines = text.split('\n')
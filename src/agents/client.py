@@ -0,0 +1,282 @@
+"""
+VibeBuilder V2 - Model Client
+Gemini generateContent over REST with per-client credentials and a
+keep-alive connection pool
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.cancellation import BuildCancelled, current_token
+from utils.token_ledger import record_usage
+from utils.usage import usage_from_response
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "gemini-2.5-flash"
+DEFAULT_POOL_SIZE = int(os.getenv("VIBEBUILDER_HTTP_POOL_SIZE", "16"))
+DEFAULT_TIMEOUT = float(os.getenv("VIBEBUILDER_HTTP_TIMEOUT", "180"))
+
+
+class ModelError(Exception):
+    """A non-success response from the model API"""
+
+    def __init__(self, status: int, message: str, retry_after: float = None):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class RateLimitError(ModelError):
+    """HTTP 429 / RESOURCE_EXHAUSTED"""
+
+
+class UsageMetadata:
+    """Token counts, with the same attribute names as the SDK"""
+
+    def __init__(self, data: Dict):
+        self.prompt_token_count = data.get("promptTokenCount", 0)
+        self.candidates_token_count = data.get("candidatesTokenCount", 0)
+        self.cached_content_token_count = data.get("cachedContentTokenCount", 0)
+        self.total_token_count = data.get("totalTokenCount", 0)
+
+
+class ModelResponse:
+    """The parts of a generateContent response the agents use"""
+
+    def __init__(self, data: Dict):
+        self.raw = data
+        candidates = data.get("candidates") or [{}]
+        candidate = candidates[0]
+        parts = (candidate.get("content") or {}).get("parts") or []
+        self.text = ''.join(part.get("text", "") for part in parts)
+        self.finish_reason = candidate.get("finishReason", "")
+        self.usage_metadata = UsageMetadata(data.get("usageMetadata") or {})
+
+
+# The connection the current thread's request is using, so a cancel from
+# another thread can shut its socket and unblock the read
+_active = threading.local()
+
+
+def _track(conn):
+    holder = getattr(_active, "holder", None)
+    if holder is not None:
+        holder["conn"] = conn
+    return conn
+
+
+class _TrackedHTTPPool(HTTPConnectionPool):
+    def _get_conn(self, timeout=None):
+        return _track(super()._get_conn(timeout))
+
+
+class _TrackedHTTPSPool(HTTPSConnectionPool):
+    def _get_conn(self, timeout=None):
+        return _track(super()._get_conn(timeout))
+
+
+class _CancellableAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TrackedHTTPPool, "https": _TrackedHTTPSPool}
+
+
+def _abort(holder: Dict):
+    sock = getattr(holder.get("conn"), "sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _camel(key: str) -> str:
+    head, *rest = key.split('_')
+    return head + ''.join(word.title() for word in rest)
+
+
+# Values passed through as given: schema property names are the caller's field names
+_VERBATIM_KEYS = ("response_schema",)
+
+
+def _camel_keys(value):
+    if isinstance(value, dict):
+        return {_camel(k): v if k in _VERBATIM_KEYS else _camel_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_camel_keys(v) for v in value]
+    return value
+
+
+class ModelClient:
+    """
+    One API key, one HTTP connection pool. Thread-safe: a single instance is
+    shared by every agent of an orchestrator and by concurrent builds.
+    """
+
+    def __init__(self, api_key: str, base_url: str = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.api_key = api_key
+        self.base_url = (base_url or os.getenv("VIBEBUILDER_GEMINI_BASE_URL") or DEFAULT_BASE_URL).rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._adapter = _CancellableAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+        self.session.headers.update({"x-goog-api-key": api_key, "Content-Type": "application/json"})
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._errors = 0
+        self._seconds = 0.0
+
+    def model(self, name: str = DEFAULT_MODEL, generation_config: Dict = None,
+              tools: List[Dict] = None) -> "ClientModel":
+        return ClientModel(self, name, generation_config, tools)
+
+    def generate_content(self, model: str, prompt: str, generation_config: Dict = None,
+                         tools: List[Dict] = None, on_text: Callable[[str], None] = None) -> ModelResponse:
+        """
+        With `on_text`, the response is streamed (streamGenerateContent) and
+        each piece of text is passed to it as it arrives; the return value is
+        the whole response either way.
+        """
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if generation_config:
+            body["generationConfig"] = _camel_keys(generation_config)
+        if tools:
+            body["tools"] = _camel_keys(tools)
+        if on_text is None:
+            return ModelResponse(self._post(f"/models/{model}:generateContent", body))
+
+        pieces, last = [], {}
+
+        def on_event(data: Dict):
+            piece = ModelResponse(data)
+            if piece.text:
+                pieces.append(piece.text)
+                on_text(piece.text)
+            # Finish reason and usage arrive with the final chunks
+            if piece.finish_reason:
+                last["finishReason"] = piece.finish_reason
+            if data.get("usageMetadata"):
+                last["usageMetadata"] = data["usageMetadata"]
+
+        self._request("POST", f"/models/{model}:streamGenerateContent?alt=sse", body, on_event)
+        return ModelResponse({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": ''.join(pieces)}]},
+                            "finishReason": last.get("finishReason", "")}],
+            "usageMetadata": last.get("usageMetadata") or {}
+        })
+
+    def get_model(self, name: str = DEFAULT_MODEL) -> Dict:
+        """Model metadata; also a cheap way to open a pooled connection"""
+        return self._request("GET", f"/models/{name}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls, errors, seconds = self._calls, self._errors, self._seconds
+        return {
+            "calls": calls,
+            "errors": errors,
+            "avg_seconds": round(seconds / calls, 4) if calls else None,
+            "connections": self._connections_opened(),
+            "pool_size": self.pool_size
+        }
+
+    def close(self):
+        self.session.close()
+
+    def _post(self, path: str, body: Dict) -> Dict:
+        return self._request("POST", path, body)
+
+    def _request(self, method: str, path: str, body: Dict = None,
+                 on_event: Callable[[Dict], None] = None) -> Dict:
+        """The JSON response, or with `on_event` each server-sent event of a streamed one"""
+        # A cancelled build's pending call is aborted mid-flight, not waited out
+        token = current_token()
+        if token is not None:
+            token.check()
+        holder = {}
+        _active.holder = holder
+        unregister = token.on_cancel(lambda: _abort(holder)) if token is not None else None
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, json=body, timeout=self.timeout,
+                                            stream=on_event is not None)
+            if on_event is not None and response.status_code == 200:
+                # A cancel shuts the socket, which ends this read with a RequestException
+                for line in response.iter_lines():
+                    if line.startswith(b"data:"):
+                        on_event(json.loads(line[5:]))
+        except requests.RequestException as e:
+            self._record(started, error=True)
+            if token is not None and token.cancelled:
+                raise BuildCancelled(token.reason) from e
+            raise
+        finally:
+            _active.holder = None
+            if unregister is not None:
+                unregister()
+        if response.status_code != 200:
+            self._record(started, error=True)
+            raise self._error(response)
+        self._record(started)
+        return {} if on_event is not None else response.json()
+
+    def _record(self, started: float, error: bool = False):
+        with self._lock:
+            self._calls += 1
+            self._errors += int(error)
+            self._seconds += time.perf_counter() - started
+
+    @staticmethod
+    def _error(response) -> ModelError:
+        try:
+            message = response.json().get("error", {}).get("message", "")
+        except ValueError:
+            message = response.text[:200]
+        retry_after = response.headers.get("Retry-After")
+        retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+        error_class = RateLimitError if response.status_code == 429 else ModelError
+        return error_class(response.status_code, message or response.reason, retry_after)
+
+    def _connections_opened(self) -> int:
+        # urllib3 counts every connection a pool had to open; calls minus
+        # this is how many requests reused a kept-alive connection
+        pools = self._adapter.poolmanager.pools
+        return sum(getattr(pools[key], "num_connections", 0) for key in list(pools.keys()))
+
+
+class ClientModel:
+    """A model name plus default config, bound to a client (like genai.GenerativeModel)"""
+
+    def __init__(self, client: ModelClient, name: str, generation_config: Dict = None,
+                 tools: List[Dict] = None):
+        self.client = client
+        self.name = name
+        self.generation_config = dict(generation_config or {})
+        self.tools = tools
+
+    def generate_content(self, prompt: str, generation_config: Dict = None,
+                         on_text: Callable[[str], None] = None) -> ModelResponse:
+        """
+        `generation_config` overrides the defaults field by field; `on_text`
+        streams the response (see ModelClient.generate_content)
+        """
+        config = dict(self.generation_config, **(generation_config or {}))
+        response = self.client.generate_content(self.name, prompt, config, self.tools, on_text)
+        # Charged to the build whose ledger_scope this call runs in, if any
+        record_usage(usage_from_response(response))
+        return response
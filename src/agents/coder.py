@@ -3,13 +3,17 @@ VibeBuilder V2 - Coder Agent
 Uses Gemini for code generation
 """
 
-import google.generativeai as genai
-from typing import Dict, List
-import re
+from typing import Callable, Dict, List
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from prompts import CODER_PROMPT
+from utils.usage import usage_from_response, sum_usage
+from utils.code_cleaner import CodeCleaner, clean_code
+from utils.continuation import generate_document
+from utils.document_index import get_index
+from utils.component_library import describe_components, expand_components
+from .client import ModelClient
 
 
 class CoderAgent:
@@ -17,39 +21,68 @@ class CoderAgent:
     Coder Agent - Generates complete, beautiful code
     """
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key, transport='rest')
-        self.model = genai.GenerativeModel(
+    def __init__(self, api_key: str, client: ModelClient = None):
+        self.client = client or ModelClient(api_key)
+        self.model = self.client.model(
             'gemini-2.5-flash',
-            generation_config=genai.GenerationConfig(
-                temperature=0.4,
-                max_output_tokens=16384,
-            )
+            generation_config={
+                "temperature": 0.4,
+                "max_output_tokens": 16384,
+            }
         )
     
-    def generate(self, idea: str, plan: str, research: str = "") -> Dict:
+    def generate(self, idea: str, plan: str, research: str = "", temperature: float = None,
+                 components: List[Dict] = None, on_code: Callable[[str], None] = None) -> Dict:
         """
         Generate complete code based on plan and research
+
+        `temperature` overrides the model default for this call only (used to
+        vary racing candidates). `components` are library components the
+        model may reference by ID; placeholders are expanded before returning.
+        With `on_code`, the response is streamed and each piece of cleaned
+        code (placeholders not yet expanded) is passed to it as it arrives.
         """
         research_context = f"\n\n## Research Insights:\n{research}" if research else ""
+        component_context = f"\n\n{describe_components(components)}" if components else ""
         
         prompt = f"""{CODER_PROMPT}
 
 ## Original Idea: {idea}
 ## Architecture Plan: {plan}
-{research_context}
+{research_context}{component_context}
 
 Generate a COMPLETE, WORKING HTML file.
 Include a BRIEF comment at the top explaining your technical approach for this specific app (1-2 sentences)."""
 
         try:
             print(f"[CoderAgent] Generating code...")
-            response = self.model.generate_content(prompt)
+            config = {"temperature": temperature} if temperature is not None else None
+            cleaner = CodeCleaner() if on_code is not None else None
+            streamed = []
+
+            def on_text(chunk: str):
+                piece = cleaner.feed(chunk)
+                if piece:
+                    streamed.append(piece)
+                    on_code(piece)
+
+            # Output cut off at max_output_tokens is continued, not regenerated
+            output = generate_document(self.model, prompt, config, on_text=on_text if cleaner else None)
             
-            if not response.text:
+            if not output["text"]:
                 return {"success": False, "code": self._fallback_code(idea), "features": []}
             
-            cleaned_code = self._clean_code(response.text)
+            if cleaner is not None and not output["continuations"]:
+                # The stream already cleaned everything but the tail
+                tail = cleaner.finish()
+                if tail:
+                    streamed.append(tail)
+                    on_code(tail)
+                cleaned_code = ''.join(streamed)
+            else:
+                cleaned_code = clean_code(output["text"])
+            used = [c["id"] for c in components or [] if f'component:{c["id"]}' in cleaned_code]
+            cleaned_code = expand_components(cleaned_code, components)
             thinking = self._extract_thinking(cleaned_code)
             
             return {
@@ -57,44 +90,34 @@ Include a BRIEF comment at the top explaining your technical approach for this s
                 "thinking": thinking or f"Building a responsive {idea} with optimized assets and modern layout.",
                 "code": cleaned_code,
                 "language": "html",
-                "features": self._detect_features(cleaned_code)
+                "features": self._detect_features(cleaned_code),
+                "components": used,
+                "continuations": output["continuations"],
+                "usage": sum_usage(usage_from_response(r) for r in output["responses"])
             }
             
         except Exception as e:
             return {"success": False, "code": self._fallback_code(idea), "features": []}
     
     def _extract_thinking(self, code: str) -> str:
-        # Match the first comment in HTML
-        match = re.search(r'<!--\s*(.*?)\s*-->', code, re.DOTALL)
-        if match:
-            text = match.group(1).strip()
-            if len(text) > 10 and len(text) < 300: return text
+        # The first HTML comment carries the approach note
+        text = get_index(code).first_comment
+        if len(text) > 10 and len(text) < 300: return text
         return ""
 
     def _fallback_code(self, idea: str) -> str:
         return f"<!DOCTYPE html><html><body><h1>{idea}</h1><p>Generation failed.</p></body></html>"
     
-    def _clean_code(self, code: str) -> str:
-        if not code: return ""
-        code = re.sub(r'^```html?\s*\n?', '', code, flags=re.MULTILINE)
-        code = re.sub(r'^```\s*$', '', code, flags=re.MULTILINE)
-        code = re.sub(r'```$', '', code)
-        code = code.strip()
-        html_start = code.lower().find('<!doctype')
-        if html_start == -1: html_start = code.lower().find('<html')
-        if html_start > 0: code = code[html_start:]
-        return code
-    
     def _detect_features(self, code: str) -> list:
         features = []
-        code_lower = code.lower()
+        flags = get_index(code).features
         checks = {
-            "🌙 Dark Mode": "dark" in code_lower,
-            "📱 Responsive": "@media" in code_lower,
-            "✨ Animations": "keyframes" in code_lower,
-            "💾 Data Persistence": "localstorage" in code_lower,
-            "🎨 Custom Themes": "--" in code_lower, 
-            "📝 Dynamic Forms": "addeventlistener" in code_lower and "submit" in code_lower
+            "🌙 Dark Mode": flags["dark"],
+            "📱 Responsive": flags["media_queries"],
+            "✨ Animations": flags["keyframes"],
+            "💾 Data Persistence": flags["local_storage"],
+            "🎨 Custom Themes": flags["css_variables"], 
+            "📝 Dynamic Forms": flags["event_listeners"] and flags["submit"]
         }
         for f, c in checks.items():
             if c: features.append(f)
@@ -3,13 +3,15 @@ VibeBuilder V2 - Debugger Agent
 Uses Gemini for self-correction and refinement
 """
 
-import google.generativeai as genai
 from typing import Dict
-import re
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from prompts import DEBUGGER_PROMPT, REFINER_PROMPT
+from utils.usage import usage_from_response, sum_usage
+from utils.code_cleaner import clean_code
+from utils.continuation import generate_document
+from .client import ModelClient
 
 
 class DebuggerAgent:
@@ -17,14 +19,14 @@ class DebuggerAgent:
     Debugger Agent - Fixes issues and handles refinements
     """
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key, transport='rest')
-        self.model = genai.GenerativeModel(
+    def __init__(self, api_key: str, client: ModelClient = None):
+        self.client = client or ModelClient(api_key)
+        self.model = self.client.model(
             'gemini-2.5-flash',
-            generation_config=genai.GenerationConfig(
-                temperature=0.3,
-                max_output_tokens=16384,
-            )
+            generation_config={
+                "temperature": 0.3,
+                "max_output_tokens": 16384,
+            }
         )
     
     def fix(self, code: str, issues: str) -> Dict:
@@ -45,15 +47,17 @@ Apply the fixes and return the COMPLETE updated HTML code."""
 
         try:
             print(f"[DebuggerAgent] Fixing issues...")
-            response = self.model.generate_content(prompt)
-            if not response.text: return {"success": False, "fixed_code": code}
+            output = generate_document(self.model, prompt)
+            if not output["text"]: return {"success": False, "fixed_code": code}
             
-            fixed_code = self._clean_code(response.text)
+            fixed_code = clean_code(output["text"])
             return {
                 "success": True,
                 "thinking": "Resolving identified issues in layout and functionality.",
                 "fixed_code": fixed_code or code,
-                "changes_made": ["Applied stability fixes"]
+                "changes_made": ["Applied stability fixes"],
+                "continuations": output["continuations"],
+                "usage": sum_usage(usage_from_response(r) for r in output["responses"])
             }
         except:
             return {"success": False, "fixed_code": code}
@@ -80,26 +84,17 @@ Return the COMPLETE updated HTML code."""
 
         try:
             print(f"[DebuggerAgent] Refinement in progress...")
-            response = self.model.generate_content(prompt)
-            if not response.text: return {"success": False, "refined_code": code}
+            output = generate_document(self.model, prompt)
+            if not output["text"]: return {"success": False, "refined_code": code}
             
-            refined_code = self._clean_code(response.text)
+            refined_code = clean_code(output["text"])
             return {
                 "success": True,
                 "thinking": f"Implementing your request: '{feedback[:50]}...'",
                 "refined_code": refined_code or code,
-                "changes_made": [feedback[:100]]
+                "changes_made": [feedback[:100]],
+                "continuations": output["continuations"],
+                "usage": sum_usage(usage_from_response(r) for r in output["responses"])
             }
         except:
             return {"success": False, "refined_code": code}
-    
-    def _clean_code(self, code: str) -> str:
-        if not code: return ""
-        code = re.sub(r'^```html?\s*\n?', '', code, flags=re.MULTILINE)
-        code = re.sub(r'^```\s*$', '', code, flags=re.MULTILINE)
-        code = re.sub(r'```$', '', code)
-        code = code.strip()
-        html_start = code.lower().find('<!doctype')
-        if html_start == -1: html_start = code.lower().find('<html')
-        if html_start > 0: code = code[html_start:]
-        return code
@@ -0,0 +1,198 @@
+"""
+VibeBuilder V2 - API Key Pool
+Spreads model calls over several API keys (one quota each), routing every
+call to the key with the most headroom and cooling down keys that hit 429
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+from .client import ClientModel, DEFAULT_MODEL, ModelClient, ModelResponse, RateLimitError
+from utils.cancellation import BuildCancelled, current_token
+
+# Per-key quota assumed until the API says otherwise (429)
+DEFAULT_RPM = int(os.getenv("VIBEBUILDER_KEY_RPM", "1000"))
+DEFAULT_TPM = int(os.getenv("VIBEBUILDER_KEY_TPM", "1000000"))
+
+WINDOW_SECONDS = 60
+BASE_COOLDOWN = 15.0
+MAX_COOLDOWN = 300.0
+# Longest a call waits for a cooling key before giving up
+MAX_WAIT_SECONDS = 60.0
+
+
+def api_keys_from_env() -> List[str]:
+    """GOOGLE_API_KEYS (comma-separated), falling back to GOOGLE_API_KEY"""
+    keys = [k.strip() for k in os.getenv("GOOGLE_API_KEYS", "").split(',') if k.strip()]
+    if not keys and os.getenv("GOOGLE_API_KEY"):
+        keys = [os.getenv("GOOGLE_API_KEY")]
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(keys))
+
+
+class _KeyState:
+    def __init__(self, number: int, client: ModelClient):
+        self.id = f"key-{number}"
+        # Only ever expose the tail of a real-length key
+        self.suffix = client.api_key[-4:] if len(client.api_key) > 12 else ""
+        self.client = client
+        self.requests = deque()  # call start times
+        self.tokens = deque()    # (time, tokens)
+        self.token_total = 0
+        self.in_flight = 0
+        self.reserved = 0
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def trim(self, now: float):
+        horizon = now - WINDOW_SECONDS
+        while self.requests and self.requests[0] < horizon:
+            self.requests.popleft()
+        while self.tokens and self.tokens[0][0] < horizon:
+            self.token_total -= self.tokens.popleft()[1]
+
+    def headroom(self, rpm: int, tpm: int) -> float:
+        """Fraction of the tighter of the two per-minute quotas still unused"""
+        request_room = 1 - (len(self.requests) + self.in_flight) / rpm
+        token_room = 1 - (self.token_total + self.reserved) / tpm
+        return min(request_room, token_room)
+
+
+class KeyPool:
+    """
+    Drop-in for ModelClient backed by several keys. Each key has its own
+    ModelClient (and connection pool); usage is tracked per key over a
+    sliding minute.
+    """
+
+    def __init__(self, api_keys: List[str], rpm_limit: int = DEFAULT_RPM, tpm_limit: int = DEFAULT_TPM,
+                 **client_options):
+        if not api_keys:
+            raise ValueError("KeyPool needs at least one API key")
+        self.api_key = api_keys[0]
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self._keys = [_KeyState(n, ModelClient(key, **client_options)) for n, key in enumerate(api_keys)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def model(self, name: str = DEFAULT_MODEL, generation_config: Dict = None,
+              tools: List[Dict] = None) -> ClientModel:
+        return ClientModel(self, name, generation_config, tools)
+
+    def generate_content(self, model: str, prompt: str, generation_config: Dict = None,
+                         tools: List[Dict] = None, on_text: Callable[[str], None] = None) -> ModelResponse:
+        # Rough prompt size, held against the key's token budget until the
+        # real count comes back
+        reserve = len(prompt) // 4
+        for attempt in range(2 * len(self._keys) + 1):
+            state = self._acquire(reserve)
+            try:
+                # A rate limit comes back before any text is streamed, so retrying is safe
+                response = state.client.generate_content(model, prompt, generation_config, tools, on_text)
+            except RateLimitError as e:
+                self._cool_down(state, reserve, e.retry_after)
+                continue
+            except BuildCancelled:
+                self._release(state, reserve, 0)
+                raise
+            except Exception:
+                self._release(state, reserve, 0, error=True)
+                raise
+            self._release(state, reserve, response.usage_metadata.total_token_count or reserve)
+            return response
+        raise RateLimitError(429, "Every API key is rate limited")
+
+    def get_model(self, name: str = DEFAULT_MODEL) -> Dict:
+        """Warms one connection per key"""
+        result = {}
+        for state in self._keys:
+            result = state.client.get_model(name)
+        return result
+
+    def stats(self) -> Dict:
+        now = time.time()
+        keys = []
+        with self._lock:
+            for state in self._keys:
+                state.trim(now)
+                keys.append({
+                    "id": state.id,
+                    "key": f"…{state.suffix}",
+                    "requests_per_minute": len(state.requests),
+                    "tokens_per_minute": state.token_total,
+                    "request_utilization": round(len(state.requests) / self.rpm_limit, 4),
+                    "token_utilization": round(state.token_total / self.tpm_limit, 4),
+                    "in_flight": state.in_flight,
+                    "cooling_down_for": round(max(0.0, state.cooldown_until - now), 1),
+                    "calls": state.calls,
+                    "rate_limited": state.rate_limited,
+                    "errors": state.errors,
+                    "connections": state.client.stats()["connections"]
+                })
+        return {
+            "keys": keys,
+            "available": sum(1 for k in keys if not k["cooling_down_for"]),
+            "calls": sum(k["calls"] for k in keys),
+            "rate_limited": sum(k["rate_limited"] for k in keys),
+            "limits": {"rpm": self.rpm_limit, "tpm": self.tpm_limit}
+        }
+
+    def close(self):
+        for state in self._keys:
+            state.client.close()
+
+    def _acquire(self, reserve: int) -> _KeyState:
+        """Key with the most headroom; waits (bounded) while every key cools down"""
+        deadline = time.time() + MAX_WAIT_SECONDS
+        while True:
+            with self._lock:
+                now = time.time()
+                ready = [s for s in self._keys if s.cooldown_until <= now]
+                if ready:
+                    for state in ready:
+                        state.trim(now)
+                    state = max(ready, key=lambda s: (s.headroom(self.rpm_limit, self.tpm_limit), -s.in_flight))
+                    state.in_flight += 1
+                    state.reserved += reserve
+                    state.requests.append(now)
+                    return state
+                wake = min(s.cooldown_until for s in self._keys)
+            if wake > deadline:
+                raise RateLimitError(429, "Every API key is cooling down", wake - time.time())
+            token = current_token()
+            if token is None:
+                time.sleep(max(0.0, wake - time.time()))
+            elif token.wait(max(0.0, wake - time.time())):
+                token.check()
+
+    def _release(self, state: _KeyState, reserve: int, tokens: int, error: bool = False):
+        with self._lock:
+            state.in_flight -= 1
+            state.reserved -= reserve
+            state.calls += 1
+            if error:
+                state.errors += 1
+            else:
+                state.strikes = 0
+                state.tokens.append((time.time(), tokens))
+                state.token_total += tokens
+
+    def _cool_down(self, state: _KeyState, reserve: int, retry_after: float = None):
+        with self._lock:
+            state.in_flight -= 1
+            state.reserved -= reserve
+            state.calls += 1
+            state.rate_limited += 1
+            state.strikes += 1
+            delay = retry_after or min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** (state.strikes - 1))
+            state.cooldown_until = time.time() + delay
+        print(f"[KeyPool] {state.id} rate limited; cooling down for {delay:.0f}s")
@@ -5,8 +5,20 @@ Coordinates agents with conversational "Chat" start
 
 import time
 import json
-from typing import Dict, Generator
-import google.generativeai as genai
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Generator, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.build_optimizer import optimize_build
+from utils.text_utils import cluster_ideas
+from utils.checkpoint_store import BuildCheckpoint, new_build_id
+from utils.html_checks import quick_check
+from utils.build_history import BuildRecorder
+from utils.cancellation import CancelToken, cancel_scope, current_token
+from utils.latency_budget import LatencyBudget, PhaseLatencies, resolve_mode
+from utils.token_ledger import TokenLedger, current_scope, ledger_scope
+from .client import ModelClient
 from .researcher import ResearcherAgent
 from .architect import ArchitectAgent
 from .coder import CoderAgent
@@ -14,29 +26,67 @@ from .tester import TesterAgent
 from .debugger import DebuggerAgent
 
 
+# Sampling temperatures for racing coder candidates, in launch order
+RACE_TEMPERATURES = [0.4, 0.7, 0.2, 0.9]
+
+
 class VibeBuilderOrchestrator:
     """
     Main Orchestrator - Coordinates all agents in 8-step workflow
     """
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, artifact_store=None, delay: float = 1.0,
+                 checkpoint_store=None, race_candidates: int = 1, race_validation: str = "local",
+                 research_corpus=None, component_library=None, client: ModelClient = None,
+                 build_history=None):
         self.api_key = api_key
+        # One HTTP connection pool shared by every agent and concurrent build
+        self.client = client or ModelClient(api_key)
+        # Optional utils.artifact_store.ArtifactStore; when set, versions and
+        # exports are referenced by content hash instead of embedding code
+        self.artifact_store = artifact_store
+        # Optional utils.checkpoint_store.CheckpointStore for resumable builds
+        self.checkpoint_store = checkpoint_store
+        # Coder racing: >1 launches that many generations and keeps the first
+        # one to pass validation ("local" quick check or the "tester")
+        self.race_candidates = race_candidates
+        self.race_validation = race_validation
+        # Optional utils.research_corpus.ResearchCorpus; answers common ideas
+        # locally and learns from searched research of passing builds
+        self.research_corpus = research_corpus
+        # Optional utils.component_library.ComponentLibrary mined from passing
+        # builds; the coder references its components instead of rewriting them
+        self.component_library = component_library
+        # Optional utils.build_history.BuildHistory; finished builds are
+        # recorded with their timings and token usage
+        self.build_history = build_history
+        # Phase latency estimates for builds with a mode or deadline
+        self.latencies = PhaseLatencies(build_history)
         
         # Initialize agents
-        self.researcher = ResearcherAgent(api_key)
-        self.architect = ArchitectAgent(api_key)
-        self.coder = CoderAgent(api_key)
-        self.tester = TesterAgent(api_key)
-        self.debugger = DebuggerAgent(api_key)
+        self.researcher = ResearcherAgent(api_key, corpus=research_corpus, client=self.client)
+        self.architect = ArchitectAgent(api_key, client=self.client)
+        self.coder = CoderAgent(api_key, client=self.client)
+        self.tester = TesterAgent(api_key, client=self.client)
+        self.debugger = DebuggerAgent(api_key, client=self.client)
 
         # Gemini for Chat (Lovable style initial response)
-        self.chat_model = genai.GenerativeModel('gemini-2.5-flash')
+        self.chat_model = self.client.model('gemini-2.5-flash')
         
-        self.delay = 1.0
+        # Pause between phases so the streaming UI can keep up
+        self.delay = delay
+        # Versions of the most recent build. Each build/refine call tracks its
+        # own list so one orchestrator can serve concurrent builds.
         self.version_history = []
     
-    def _wait(self):
-        time.sleep(self.delay)
+    def _wait(self, cancel: CancelToken = None, budget: LatencyBudget = None):
+        if budget is not None and budget.deadline is not None:
+            # Pacing is cosmetic; a build racing a deadline skips it
+            return
+        if cancel is None:
+            time.sleep(self.delay)
+        elif cancel.wait(self.delay):
+            cancel.check()
 
     def _get_chat_response(self, prompt: str, context: str = "") -> str:
         """Respond like a professional AI assistant acknowledging the goal"""
@@ -48,30 +98,101 @@ class VibeBuilderOrchestrator:
         except:
             return "I've received your request and am starting the build process."
 
-    def build(self, idea: str, max_iterations: int = 2) -> Generator[Dict, None, None]:
-        """Full agentic workflow with chat start"""
-        self.version_history = []
+    def build(self, idea: str, max_iterations: int = 2, build_id: str = None,
+              race_candidates: int = None, cancel: CancelToken = None, mode: str = None,
+              deadline: float = None, ledger: TokenLedger = None,
+              on_code: Callable[[str], None] = None) -> Generator[Dict, None, None]:
+        """
+        Full agentic workflow with chat start
+
+        Completed phases are checkpointed under `build_id`; calling build()
+        again with the same ID skips straight to the first incomplete phase.
+        `race_candidates` overrides the orchestrator's racing default.
+        Cancelling `cancel` aborts the model call in flight and ends the
+        build with BuildCancelled.
+
+        A `mode` (see utils.latency_budget.BUILD_MODES) or `deadline` in
+        seconds makes the build skip phases that would not finish in time;
+        the export event then carries a "budget" report listing the cuts.
+        Raises ValueError for an unknown mode.
+
+        Token usage is recorded in `ledger` (see utils.token_ledger) and
+        reported under "tokens" in the export event. A phase only starts
+        while its budget has room: chat, grounded research and planning are
+        skipped, test/fix rounds stop, and a build that cannot afford the
+        code phase ends with an error event instead.
+
+        `on_code` receives the code phase's cleaned output as it streams
+        (a live preview; the code event still carries the final code). It is
+        called on the build's thread and not at all for raced candidates.
+        """
+        resolved = resolve_mode(mode, deadline)
+        budget = LatencyBudget(*resolved, self.latencies) if resolved else None
+        ledger = ledger or TokenLedger()
+        recorder = BuildRecorder(idea, tenant=ledger.tenant)
+        for update in self._build(idea, max_iterations, build_id, race_candidates, cancel or CancelToken(),
+                                  budget, ledger, on_code):
+            recorder.observe(update)
+            if update.get("phase") == "export":
+                # Before the last event goes out, so a client that stops reading there still counts
+                self._record(recorder, update)
+            yield update
+
+    def _build(self, idea: str, max_iterations: int, build_id: str, race_candidates: int,
+               cancel: CancelToken, budget: LatencyBudget = None, ledger: TokenLedger = None,
+               on_code: Callable[[str], None] = None) -> Generator[Dict, None, None]:
+        if race_candidates is None:
+            race_candidates = self.race_candidates
+        versions = self.version_history = []
+        checkpoint = BuildCheckpoint(self.checkpoint_store, build_id or new_build_id(), idea)
         
         # CHAT START (Lovable style)
+        chat = checkpoint.get("chat")
+        skip_chat = False
+        if chat is None and budget is not None and not budget.fits("chat", ("plan", "code")):
+            budget.cut("chat", "deadline")
+            skip_chat = True
+        elif chat is None and ledger is not None and not ledger.affords("chat"):
+            skip_chat = True
+        if skip_chat:
+            chat = {"message": "Got it! I'm starting the build process for your request."}
+        elif chat is None:
+            checkpoint.invalidate_rest()
+            with cancel_scope(cancel), ledger_scope(ledger, "chat"):
+                chat = {"message": self._get_chat_response(idea)}
+            cancel.check()
+            checkpoint.save("chat", chat)
         yield {
             "step": 0,
             "phase": "chat",
             "status": "complete",
-            "message": self._get_chat_response(idea),
-            "agent": "System"
+            "message": chat["message"],
+            "agent": "System",
+            "build_id": checkpoint.build_id,
+            "resumed_phases": checkpoint.resumed_phases
         }
-        self._wait()
+        self._wait(cancel, budget)
 
-        # STEP 1: RESEARCH
-        yield {
+        # STEP 1: RESEARCH (local corpus only when the mode or deadline rules out search)
+        no_search = None
+        if budget is not None and not budget.policy["grounded_research"]:
+            no_search = "mode"
+        elif budget is not None and not budget.fits("research", ("plan", "code")):
+            no_search = "deadline"
+        resumed = checkpoint.get("research") is not None
+        if no_search is None and not resumed and ledger is not None and not ledger.affords("research"):
+            no_search = "tokens"
+        research_result = yield from self._run_phase(checkpoint, "research", {
             "step": 1,
             "phase": "research",
             "status": "starting",
             "message": "🔍 Exploring best practices..."
-        }
-        
-        self._wait()
-        research_result = self.researcher.research(idea)
+        }, lambda: self.researcher.research(idea, grounded=no_search is None), cancel, budget, ledger)
+        # A skip replayed from a checkpoint was reported by the run that decided it;
+        # the ledger records its own refusals
+        if (budget is not None and no_search is not None and not resumed
+                and research_result.get("source") == "skipped"):
+            budget.cut("research", no_search)
         
         yield {
             "step": 1,
@@ -83,16 +204,27 @@ class VibeBuilderOrchestrator:
         
         research_summary = research_result.get("summary", "")
 
-        # STEP 2: PLAN
-        yield {
-            "step": 2,
-            "phase": "plan",
-            "status": "starting",
-            "message": "🧠 Designing system architecture..."
-        }
-        
-        self._wait()
-        plan_result = self.architect.plan(idea, research_summary)
+        # STEP 2: PLAN (without time for it, the coder works from the idea alone)
+        skip_plan = False
+        if budget is not None and checkpoint.get("plan") is None and not budget.fits("plan", ("code",)):
+            budget.cut("plan", "deadline")
+            skip_plan = True
+        elif ledger is not None and checkpoint.get("plan") is None and not ledger.affords("plan"):
+            skip_plan = True
+        if skip_plan:
+            plan_result = {
+                "success": True,
+                "thinking": f"Going straight to code for {idea}.",
+                "plan": f"A single-page {idea}.",
+                "components": []
+            }
+        else:
+            plan_result = yield from self._run_phase(checkpoint, "plan", {
+                "step": 2,
+                "phase": "plan",
+                "status": "starting",
+                "message": "🧠 Designing system architecture..."
+            }, lambda: self.architect.plan(idea, research_summary), cancel, budget, ledger)
         
         yield {
             "step": 2,
@@ -102,18 +234,20 @@ class VibeBuilderOrchestrator:
             "data": plan_result
         }
         
-        # STEP 3: CODE
-        yield {
+        # STEP 3: CODE (there is no build without it, so a spent budget ends the build here)
+        if ledger is not None and checkpoint.get("code") is None and not ledger.affords("code"):
+            yield {"error": "Token budget exhausted; build stopped before code generation.",
+                   "build_id": checkpoint.build_id, "tokens": ledger.report()}
+            return
+        code_result = yield from self._run_phase(checkpoint, "code", {
             "step": 3,
             "phase": "code",
             "status": "starting",
             "message": "💻 Writing production-ready code..."
-        }
-        
-        self._wait()
-        code_result = self.coder.generate(idea, plan_result.get("plan", ""), research_summary[:500])
+        }, lambda: self._generate_code(idea, plan_result.get("plan", ""), research_summary[:500], race_candidates,
+                                       self._select_components(idea, plan_result), on_code), cancel, budget, ledger)
         current_code = code_result.get("code", "")
-        self._add_version(current_code, "Initial generation")
+        self._add_version(versions, current_code, "Initial generation")
         
         yield {
             "step": 3,
@@ -123,18 +257,173 @@ class VibeBuilderOrchestrator:
             "data": code_result
         }
         
-        # STEP 4: TEST LOOP
+        # STEP 4: TEST LOOP (a race validated by the tester already has its first verdict)
+        race_test = code_result.get("race", {}).get("test")
+        if race_test and not checkpoint.get("test_1"):
+            checkpoint.save("test_1", race_test)
+        current_code, passed = yield from self._test_loop(idea, current_code, max_iterations, versions, checkpoint,
+                                                          cancel, budget, ledger)
+        checkpoint.finish()
+        if passed:
+            self._learn(idea, research_result, current_code, plan_result)
+        
+        # STEP 8: EXPORT
+        export = {
+            "step": 8,
+            "phase": "export",
+            "status": "complete",
+            "message": "Success! Your application is live in the preview.",
+            "final_code": current_code,
+            "versions": versions,
+            "artifact": self._optimize(current_code),
+            "build_id": checkpoint.build_id
+        }
+        if budget is not None:
+            export["budget"] = budget.report()
+        if ledger is not None:
+            export["tokens"] = ledger.report()
+        yield export
+    
+    def _run_phase(self, checkpoint: BuildCheckpoint, key: str, starting: Dict,
+                   run: Callable[[], Dict], cancel: CancelToken = None,
+                   budget: LatencyBudget = None, ledger: TokenLedger = None,
+                   paced: bool = True) -> Generator[Dict, None, Dict]:
+        """
+        Run one phase unless the checkpoint already holds its result.
+        Only successful results are saved, so a failed phase is retried.
+        A cancelled build stops before the phase or, if cancelled during
+        it, without saving its (aborted) result. Unpaced phases (batch
+        builds, which have no UI to pace) skip the delay.
+        """
+        cancel = cancel or CancelToken()
+        cancel.check()
+        result = checkpoint.get(key)
+        if result is not None:
+            return result
+        checkpoint.invalidate_rest()
+        yield starting
+        if paced:
+            self._wait(cancel, budget)
+        started = time.time()
+        with cancel_scope(cancel), ledger_scope(ledger, key):
+            result = run()
+        cancel.check()
+        # The phase's own duration, without the pacing delay, for latency estimates
+        result["elapsed"] = round(time.time() - started, 3)
+        if result.get("success", False):
+            checkpoint.save(key, result)
+        return result
+
+    def _select_components(self, idea: str, plan_result: Dict) -> List[Dict]:
+        if self.component_library is None:
+            return []
+        return self.component_library.select(idea, plan_result.get("components", []))
+
+    def _generate_code(self, idea: str, plan: str, research: str, candidates: int,
+                       components: List[Dict] = None, on_code: Callable[[str], None] = None) -> Dict:
+        if candidates <= 1:
+            return self.coder.generate(idea, plan, research, components=components, on_code=on_code)
+        return self._race_coder(idea, plan, research, candidates, components)
+
+    def _race_coder(self, idea: str, plan: str, research: str, candidates: int,
+                    components: List[Dict] = None) -> Dict:
+        """
+        First-valid-wins: run `candidates` coder generations at different
+        temperatures and return the first that passes validation. Candidates
+        still queued are cancelled; ones already in flight are abandoned and
+        their results discarded. If none passes, the candidate with the fewest
+        quick-check issues wins.
+        """
+        started = time.time()
+        temperatures = [RACE_TEMPERATURES[i % len(RACE_TEMPERATURES)] for i in range(candidates)]
+        use_tester = self.race_validation == "tester"
+        # Candidates run on pool threads; they follow the build's token and ledger too
+        token = current_token()
+        ledger, phase = current_scope() or (None, None)
+
+        def attempt(temperature: float) -> Dict:
+            with cancel_scope(token), ledger_scope(ledger, phase):
+                result = self.coder.generate(idea, plan, research, temperature=temperature, components=components)
+                code = result.get("code", "")
+                check = quick_check(code)
+                result["race"] = {"temperature": temperature, "issues": check["issues"]}
+                if result.get("success") and check["passed"] and use_tester:
+                    test_result = self.tester.test(code, idea)
+                    result["race"]["test"] = test_result
+                    check["passed"] = bool(test_result.get("passed"))
+                result["race"]["passed"] = bool(result.get("success")) and check["passed"]
+                return result
+
+        pool = ThreadPoolExecutor(max_workers=candidates, thread_name_prefix="vibe-race")
+        pending = {pool.submit(attempt, t) for t in temperatures}
+        finished = []
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"[Orchestrator] Race candidate failed: {e}")
+                        continue
+                    finished.append(result)
+                    if result["race"]["passed"] and winner is None:
+                        winner = result
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if winner is None:
+            if not finished:
+                return self.coder.generate(idea, plan, research, components=components)
+            winner = min(finished, key=lambda r: (not r.get("success"), len(r["race"]["issues"])))
+        # A tester verdict is only reused when it belongs to a passing winner
+        if not winner["race"]["passed"]:
+            winner["race"].pop("test", None)
+        winner["race"].update({
+            "candidates": candidates,
+            "completed": len(finished),
+            "validation": self.race_validation,
+            "elapsed": round(time.time() - started, 2)
+        })
+        print(f"[Orchestrator] Race won at temperature {winner['race']['temperature']} "
+              f"after {len(finished)}/{candidates} candidates")
+        return winner
+
+    def _test_loop(self, idea: str, current_code: str, max_iterations: int, versions: List[Dict],
+                   checkpoint: BuildCheckpoint = None, cancel: CancelToken = None,
+                   budget: LatencyBudget = None, ledger: TokenLedger = None,
+                   paced: bool = True) -> Generator[Dict, None, tuple]:
+        """
+        STEP 4/6: test, then fix on failure. Returns (final code, passed).
+        With a `budget`, rounds past the mode's limit or the deadline are cut;
+        with a `ledger`, rounds its token budget cannot cover are not started.
+        """
+        if checkpoint is None:
+            checkpoint = BuildCheckpoint(None, new_build_id(), idea)
+        iteration_limit = budget.policy["max_iterations"] if budget is not None else None
         for iteration in range(max_iterations):
-            yield {
+            if budget is not None and checkpoint.get(f"test_{iteration + 1}") is None:
+                if iteration_limit is not None and iteration >= iteration_limit:
+                    budget.cut(f"test_{iteration + 1}", "mode")
+                    break
+                if not budget.fits("test"):
+                    budget.cut(f"test_{iteration + 1}", "deadline")
+                    break
+            if ledger is not None and checkpoint.get(f"test_{iteration + 1}") is None:
+                # A round is expected to cost what the previous one did; the first
+                # reads the whole document, so it is estimated like the code phase
+                estimate = (ledger.spent(f"test_{iteration}") + ledger.spent(f"fix_{iteration}") if iteration
+                            else ledger.spent("code"))
+                if not ledger.affords(f"test_{iteration + 1}", estimate):
+                    break
+            test_result = yield from self._run_phase(checkpoint, f"test_{iteration + 1}", {
                 "step": 4,
                 "phase": "test",
                 "status": "starting",
                 "iteration": iteration + 1,
                 "message": f"🧪 Validating features..."
-            }
-            
-            self._wait()
-            test_result = self.tester.test(current_code, idea)
+            }, lambda: self.tester.test(current_code, idea), cancel, budget, ledger, paced)
             
             if test_result.get("passed"):
                 yield {
@@ -144,7 +433,7 @@ class VibeBuilderOrchestrator:
                     "message": "Verification complete. No issues found.",
                     "data": test_result
                 }
-                break
+                return current_code, True
             else:
                 yield {
                     "step": 4,
@@ -155,16 +444,23 @@ class VibeBuilderOrchestrator:
                 }
                 
                 # STEP 6: FIX
-                yield {
+                if (budget is not None and checkpoint.get(f"fix_{iteration + 1}") is None
+                        and not budget.fits("fix")):
+                    budget.cut(f"fix_{iteration + 1}", "deadline")
+                    break
+                # A fix rewrites the whole document, like the code phase did
+                if (ledger is not None and checkpoint.get(f"fix_{iteration + 1}") is None
+                        and not ledger.affords(f"fix_{iteration + 1}", ledger.spent("code"))):
+                    break
+                fix_result = yield from self._run_phase(checkpoint, f"fix_{iteration + 1}", {
                     "step": 6,
                     "phase": "fix",
                     "status": "starting",
                     "message": "🔧 Refining implementation..."
-                }
-                self._wait()
-                fix_result = self.debugger.fix(current_code, test_result.get("analysis", "")[:1000])
+                }, lambda: self.debugger.fix(current_code, test_result.get("analysis", "")[:1000]), cancel,
+                   budget, ledger, paced)
                 current_code = fix_result.get("fixed_code", current_code)
-                self._add_version(current_code, f"After fix {iteration + 1}")
+                self._add_version(versions, current_code, f"After fix {iteration + 1}")
                 
                 yield {
                     "step": 6,
@@ -173,27 +469,175 @@ class VibeBuilderOrchestrator:
                     "message": "Refinements applied successfully.",
                     "data": fix_result
                 }
-        
-        # STEP 8: EXPORT
+        return current_code, False
+
+    def _record(self, recorder: BuildRecorder, export: Dict):
+        if self.build_history is None:
+            return
+        try:
+            self.build_history.record(recorder, export.get("final_code", ""),
+                                      export.get("artifact", {}).get("sha256"))
+        except Exception as e:
+            print(f"[Orchestrator] Could not record build history: {e}")
+
+    def _learn(self, idea: str, research_result: Dict, code: str, plan_result: Dict):
+        """
+        Keep what a passing build produced: grounded research for similar
+        future ideas, and its components for the library
+        """
+        try:
+            if self.research_corpus is not None and research_result.get("source") == "search":
+                self.research_corpus.add(idea, research_result.get("summary", ""))
+            if self.component_library is not None:
+                self.component_library.mine(code, plan_result.get("components", []))
+        except Exception as e:
+            print(f"[Orchestrator] Could not learn from build: {e}")
+
+    def build_batch(self, ideas: List[str], max_workers: int = 4, max_iterations: int = 1,
+                    similarity: float = 0.5,
+                    open_ledger: Callable[[int], TokenLedger] = None) -> Generator[Dict, None, None]:
+        """
+        Build many ideas at once. Similar ideas are clustered so research and
+        planning run once per cluster; code/test runs per idea on a bounded
+        pool. Results are yielded as they finish, in completion order.
+
+        `open_ledger(index)` returns the ledger idea `index` is charged to,
+        opened when its first job is submitted; a cluster's shared research
+        and plan go to its first idea. Each result reports its "tokens".
+        """
+        started = time.time()
+        open_ledger = open_ledger or (lambda index: TokenLedger())
+        ledgers = {}
+        clusters = cluster_ideas(ideas, similarity)
+        for number, members in enumerate(clusters):
+            yield {
+                "type": "cluster",
+                "cluster": number,
+                "representative": ideas[members[0]],
+                "indices": members
+            }
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vibe-batch") as pool:
+            pending = {}
+            for number, members in enumerate(clusters):
+                ledgers[members[0]] = open_ledger(members[0])
+                pending[pool.submit(self._plan_cluster, ideas[members[0]], ledgers[members[0]])] = ("plan", number)
+
+            try:
+                yield from self._drain_batch(pool, pending, ideas, clusters, max_iterations, ledgers, open_ledger)
+            finally:
+                # Consumer went away: don't start work nobody will read
+                for future in pending:
+                    future.cancel()
+
         yield {
-            "step": 8,
-            "phase": "export",
-            "status": "complete",
-            "message": "Success! Your application is live in the preview.",
-            "final_code": current_code,
-            "versions": self.version_history
+            "type": "summary",
+            "ideas": len(ideas),
+            "clusters": len(clusters),
+            "elapsed": round(time.time() - started, 2)
         }
-    
-    def refine(self, code: str, feedback: str) -> Generator[Dict, None, None]:
+
+    def _drain_batch(self, pool, pending: Dict, ideas: List[str], clusters: List[List[int]],
+                     max_iterations: int, ledgers: Dict[int, TokenLedger],
+                     open_ledger: Callable[[int], TokenLedger]) -> Generator[Dict, None, None]:
+        """Submit per-idea jobs as cluster plans land; yield results as they finish"""
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, key = pending.pop(future)
+                if kind == "plan":
+                    try:
+                        research_result, plan_result = future.result()
+                    except Exception as e:
+                        research_result, plan_result = {}, {"plan": f"Basic plan for: {ideas[clusters[key][0]]}"}
+                        print(f"[Orchestrator] Cluster {key} planning failed: {e}")
+                    for index in clusters[key]:
+                        if index not in ledgers:
+                            ledgers[index] = open_ledger(index)
+                        job = pool.submit(self._build_one, ideas[index], plan_result, research_result, max_iterations,
+                                          ledgers[index])
+                        pending[job] = ("idea", (index, key))
+                    continue
+
+                index, cluster = key
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"type": "error", "error": str(e)}
+                result.update({"index": index, "idea": ideas[index], "cluster": cluster,
+                               "tokens": ledgers[index].report()})
+                yield result
+
+    def _plan_cluster(self, idea: str, ledger: TokenLedger):
+        """Shared research + plan for one cluster of similar ideas"""
+        with ledger_scope(ledger, "research"):
+            research_result = self.researcher.research(idea)
+        with ledger_scope(ledger, "plan"):
+            plan_result = self.architect.plan(idea, research_result.get("summary", ""))
+        return research_result, plan_result
+
+    def _build_one(self, idea: str, plan_result: Dict, research_result: Dict, max_iterations: int,
+                   ledger: TokenLedger) -> Dict:
+        started = time.time()
+        versions = []
+        if not ledger.affords("code"):
+            return {"type": "error", "error": "Token budget exhausted; build skipped."}
+        with ledger_scope(ledger, "code"):
+            code_result = self.coder.generate(idea, plan_result.get("plan", ""),
+                                              research_result.get("summary", "")[:500],
+                                              components=self._select_components(idea, plan_result))
+        current_code = code_result.get("code", "")
+        self._add_version(versions, current_code, "Initial generation")
+
+        # No UI to pace, so the shared orchestrator's delay is skipped
+        loop = self._test_loop(idea, current_code, max_iterations, versions, ledger=ledger, paced=False)
+        while True:
+            try:
+                next(loop)
+            except StopIteration as stop:
+                current_code, passed = stop.value
+                break
+        if passed:
+            self._learn(idea, research_result, current_code, plan_result)
+
+        result = {
+            "type": "result",
+            "success": code_result.get("success", False),
+            "passed": passed,
+            "features": code_result.get("features", []),
+            "versions": versions,
+            "artifact": self._optimize(current_code),
+            "elapsed": round(time.time() - started, 2)
+        }
+        if self.artifact_store is None:
+            result["final_code"] = current_code
+        return result
+
+    def refine(self, code: str, feedback: str, cancel: CancelToken = None,
+               ledger: TokenLedger = None) -> Generator[Dict, None, None]:
+        """
+        Apply `feedback` to `code`. Usage goes to `ledger`; a refine whose
+        ledger has no budget left ends with an error event instead of running.
+        """
+        versions = self.version_history = []
+        cancel = cancel or CancelToken()
+        ledger = ledger or TokenLedger()
+        # The code goes in and a revised copy comes out, at ~4 characters per token each way
+        if not ledger.affords("refine", len(code) // 2):
+            yield {"error": "Token budget exhausted; refinement skipped.", "tokens": ledger.report()}
+            return
         # CHAT START (Refine acknowledgment)
+        with cancel_scope(cancel), ledger_scope(ledger, "chat"):
+            message = self._get_chat_response(feedback, "Current app is already built. Updating with your feedback.")
+        cancel.check()
         yield {
             "step": 0,
             "phase": "chat",
             "status": "complete",
-            "message": self._get_chat_response(feedback, "Current app is already built. Updating with your feedback."),
+            "message": message,
             "agent": "System"
         }
-        self._wait()
+        self._wait(cancel)
 
         yield {
             "step": 7,
@@ -202,10 +646,12 @@ class VibeBuilderOrchestrator:
             "message": "🔄 Updating implementation..."
         }
         
-        self._wait()
-        refine_result = self.debugger.refine(code, feedback)
+        self._wait(cancel)
+        with cancel_scope(cancel), ledger_scope(ledger, "refine"):
+            refine_result = self.debugger.refine(code, feedback)
+        cancel.check()
         refined_code = refine_result.get("refined_code", code)
-        self._add_version(refined_code, f"Refinement: {feedback[:30]}")
+        self._add_version(versions, refined_code, f"Refinement: {feedback[:30]}")
         
         # CRITICAL: Always include 'code' and 'final_code' so frontend reacts
         data_to_send = refine_result.copy()
@@ -218,12 +664,37 @@ class VibeBuilderOrchestrator:
             "message": "Your changes have been applied!",
             "data": data_to_send,
             "final_code": refined_code,
-            "versions": self.version_history
+            "versions": versions,
+            "artifact": self._optimize(refined_code),
+            "tokens": ledger.report()
         }
     
-    def _add_version(self, code: str, description: str):
-        self.version_history.append({
-            "version": len(self.version_history) + 1,
-            "code": code,
+    def _optimize(self, code: str) -> Dict:
+        """Post-export stage: minify and precompress the delivered app"""
+        try:
+            optimized = optimize_build(code)
+        except Exception as e:
+            print(f"[Orchestrator] Optimization skipped: {e}")
+            return {}
+
+        artifact = {
+            "sha256": optimized["sha256"],
+            "stats": optimized["stats"]
+        }
+        if self.artifact_store is not None:
+            self.artifact_store.put(optimized["html"], optimized["variants"])
+            artifact["url"] = f"/preview/{artifact['sha256']}"
+        return artifact
+
+    def _add_version(self, versions: List[Dict], code: str, description: str):
+        version = {
+            "version": len(versions) + 1,
             "description": description
-        })
+        }
+        if self.artifact_store is not None:
+            digest = self.artifact_store.put(code)
+            version["hash"] = digest
+            version["url"] = f"/preview/{digest}"
+        else:
+            version["code"] = code
+        versions.append(version)
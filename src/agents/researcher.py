@@ -3,8 +3,16 @@ VibeBuilder V2 - Researcher Agent
 Uses Gemini for research
 """
 
-import google.generativeai as genai
 from typing import Dict, List
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.usage import usage_from_response
+from utils.response_schemas import RESEARCH_SCHEMA, schema_instructions, try_parse
+from .client import ModelClient
+
+# Local answers below this research_corpus confidence fall back to search
+LOCAL_CONFIDENCE = 0.5
 
 
 class ResearcherAgent:
@@ -12,21 +20,44 @@ class ResearcherAgent:
     Research Agent - Searches for best practices before coding
     """
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key, transport='rest')
-        self.model = genai.GenerativeModel(
+    def __init__(self, api_key: str, corpus=None, min_confidence: float = LOCAL_CONFIDENCE,
+                 client: ModelClient = None):
+        # Optional utils.research_corpus.ResearchCorpus consulted before search
+        self.corpus = corpus
+        self.min_confidence = min_confidence
+        self.client = client or ModelClient(api_key)
+        self.model = self.client.model(
             'gemini-2.5-flash',
             tools=[{'google_search_retrieval': {}}],
-            generation_config=genai.GenerationConfig(
-                temperature=0.3,
-                max_output_tokens=1024,
-            )
+            generation_config={
+                "temperature": 0.3,
+                "max_output_tokens": 1024,
+            }
         )
     
-    def research(self, idea: str) -> Dict:
+    def research(self, idea: str, grounded: bool = True) -> Dict:
         """
         Research best practices for the given app idea
+
+        Answered from the local corpus when it has a confident match;
+        grounded search is only used for ideas it does not cover (and for
+        URLs, which need to be fetched). With `grounded=False` (builds short
+        on time) an idea the corpus does not cover gets no research.
         """
+        local = self._research_locally(idea)
+        if local:
+            return local
+        if not grounded:
+            return {
+                "success": True,
+                "summary": "",
+                "thinking": "Skipping web research to stay within the time budget.",
+                "findings": "Prioritizing mobile-first design and accessibility.",
+                "insights": [],
+                "source": "skipped",
+                "usage": usage_from_response(None)
+            }
+
         prompt = f"""Identify 3-5 critical best practices and UI/UX patterns for a modern '{idea}' application.
 If a URL is provided, please prioritize analyzing and summarizing it to find core themes, color palettes, and specific components.
 
@@ -35,16 +66,33 @@ Focus on:
 2. **Component Analysis** - Breakdown of essential interactive elements.
 3. **Professional UI/UX Patterns** - Modern layouts and accessibility.
 
-Return a structured response with:
-- "Thinking Process": Brief explanation of your analysis strategy.
-- "Key Findings": Actionable bullet points for the architect and coder.
+Return your analysis strategy (thinking) and actionable findings for the architect and coder.
+Be extremely concise and professional. No fluff.
 
-Be extremely concise and professional. No fluff."""
+{schema_instructions(RESEARCH_SCHEMA)}"""
 
         try:
             print(f"[Researcher] Researching: {idea}")
             response = self.model.generate_content(prompt)
             
+            # Grounded search cannot be combined with responseSchema, so the
+            # schema is only requested in the prompt and may not be followed
+            structured = try_parse(response.text, RESEARCH_SCHEMA) if response.text else None
+            if structured is not None:
+                insights = [f.strip()[:150] for f in structured["findings"] if f.strip()]
+                bullets = '\n'.join(f"- {insight}" for insight in insights)
+                # Same sections as a free-text answer, for the corpus and the later prompts
+                summary = f"**Thinking Process**: {structured['thinking'].strip()}\n**Key Findings**:\n{bullets}"
+                return {
+                    "success": True,
+                    "summary": summary,
+                    "thinking": structured["thinking"].strip() or "Analyzing market leaders and UX patterns.",
+                    "findings": bullets or "Prioritizing mobile-first design and accessibility.",
+                    "insights": insights,
+                    "source": "search",
+                    "structured": True,
+                    "usage": usage_from_response(response)
+                }
             if response.text:
                 thinking = self._extract_section(response.text, "Thinking Process")
                 findings = self._extract_section(response.text, "Key Findings")
@@ -54,7 +102,9 @@ Be extremely concise and professional. No fluff."""
                     "summary": response.text,
                     "thinking": thinking or "Analyzing market leaders and UX patterns.",
                     "findings": findings or "Prioritizing mobile-first design and accessibility.",
-                    "insights": self._extract_key_insights(response.text)
+                    "insights": self._extract_key_insights(response.text),
+                    "source": "search",
+                    "usage": usage_from_response(response)
                 }
             else:
                 return {"success": False, "thinking": "No results found.", "findings": "", "insights": []}
@@ -62,6 +112,25 @@ Be extremely concise and professional. No fluff."""
         except Exception as e:
             return {"success": False, "thinking": "Research error.", "findings": "", "insights": []}
     
+    def _research_locally(self, idea: str) -> Dict:
+        if self.corpus is None or '://' in idea:
+            return None
+        hits = self.corpus.search(idea, limit=1)
+        if not hits or hits[0]["confidence"] < self.min_confidence:
+            return None
+        hit = hits[0]
+        print(f"[Researcher] Local match for {idea!r}: {hit['title']} ({hit['confidence']:.2f})")
+        return {
+            "success": True,
+            "summary": hit["text"],
+            "thinking": self._extract_section(hit["text"], "Thinking Process") or "Reusing proven patterns for this app type.",
+            "findings": self._extract_section(hit["text"], "Key Findings") or "Prioritizing mobile-first design and accessibility.",
+            "insights": self._extract_key_insights(hit["text"]),
+            "source": "local",
+            "match": {"title": hit["title"], "confidence": hit["confidence"]},
+            "usage": usage_from_response(None)
+        }
+
     def _extract_section(self, text: str, section_name: str) -> str:
         if section_name not in text: return ""
         lines = text.split('\n')
@@ -83,6 +152,9 @@ Be extremely concise and professional. No fluff."""
         lines = text.split('\n')
         for line in lines:
             line = line.strip()
+            # "**Key Findings**:" is a bold section header, not a "*" bullet
+            if line.startswith('**'):
+                continue
             if line.startswith(('-', '*', '•')) and len(line) > 5:
                 insights.append(line.lstrip('-*• ').strip()[:150])
         return insights[:5]
@@ -3,12 +3,23 @@ VibeBuilder V2 - Tester Agent
 Uses Gemini for code testing/validation
 """
 
-import google.generativeai as genai
 from typing import Dict, List
+import re
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from prompts import TESTER_PROMPT
+from utils.usage import usage_from_response
+from utils.document_index import get_index
+from utils.response_schemas import TEST_SCHEMA, json_config, try_parse
+from .client import ModelClient
+
+# Severities that fail a build; minor issues are reported but do not block it
+BLOCKING_SEVERITIES = ("critical", "major")
+# Handed to the debugger when a build fails without a usable description
+UNSPECIFIED_FAILURE = ("The tester rejected the code without naming specific issues. "
+                       "Review it for broken JavaScript, layout problems on mobile and missing accessibility.")
+_SEVERITY_RE = re.compile(r'\b(critical|major|minor)\b', re.IGNORECASE)
 
 
 class TesterAgent:
@@ -16,17 +27,17 @@ class TesterAgent:
     Tester Agent - Validates code for issues
     """
     
-    def __init__(self, api_key: str):
-        # Force REST transport to avoid gRPC hangs
-        genai.configure(api_key=api_key, transport='rest')
+    def __init__(self, api_key: str, client: ModelClient = None):
+        self.client = client or ModelClient(api_key)
         
         # Use flash model for testing
-        self.model = genai.GenerativeModel(
+        self.model = self.client.model(
             'gemini-2.5-flash',
-            generation_config=genai.GenerationConfig(
-                temperature=0.1,
-                max_output_tokens=2048, # Keep it shorter
-            )
+            generation_config={
+                "temperature": 0.1,
+                "max_output_tokens": 2048, # Keep it shorter
+                **json_config(TEST_SCHEMA)
+            }
         )
     
     def test(self, code: str, requirements: str = "") -> Dict:
@@ -49,34 +60,45 @@ class TesterAgent:
 
 ## Code Snapshot (First 5000 chars):
 ```html
-{code[:5000]}
+{get_index(code).snapshot(5000)}
 ```
 {requirements_context}
 
 Analyze this code for quality, accessibility, and correctness.
-If it is excellent, respond ONLY with: ALL_TESTS_PASSED
-Otherwise, provide a BRIEF list of issues (max 5 bullet points).
-DO NOT include any code blocks in your response."""
+List at most 5 issues, one short sentence each, no code. If it is excellent, return no issues.
+Set passed to false if any issue is critical or major."""
 
         try:
             print(f"[TesterAgent] Validating code...")
             response = self.model.generate_content(prompt)
             
-            analysis = response.text.strip() if response.text else "Validation failed."
-            passed = "ALL_TESTS_PASSED" in analysis.upper()
-            
-            # Clean up analysis: remove raw HTML or long blocks
-            if "```" in analysis:
-                # Emergency cleanup
-                import re
-                analysis = re.sub(r'```.*?```', '[Code snippet omitted for brevity]', analysis, flags=re.DOTALL)
+            verdict = try_parse(response.text, TEST_SCHEMA)
+            if verdict is not None:
+                issues = verdict["issues"]
+                analysis = '\n'.join(f"- {issue['description']} ({issue['severity']})" for issue in issues)
+            else:
+                analysis = response.text.strip() if response.text else ""
+                
+                # Clean up analysis: remove raw HTML or long blocks
+                if "```" in analysis:
+                    analysis = re.sub(r'```.*?```', '[Code snippet omitted for brevity]', analysis, flags=re.DOTALL)
+                issues = self._parse_issues(analysis)
+            # The verdict follows the issues rather than the model's own flag
+            passed = not any(issue["severity"] in BLOCKING_SEVERITIES for issue in issues)
+            if verdict is None and not analysis:
+                # No answer at all is not a pass
+                passed = False
+            if not passed and not analysis:
+                analysis = UNSPECIFIED_FAILURE
 
             result = {
                 "success": True,
                 "passed": passed,
                 "thinking": "Verifying implementation against requirements and web standards.",
                 "analysis": analysis if not passed else "Code meets all quality and feature requirements.",
-                "issues": [] if passed else self._parse_issues(analysis)
+                "issues": [] if passed else issues,
+                "structured": verdict is not None,
+                "usage": usage_from_response(response)
             }
             
             return result
@@ -92,11 +114,18 @@ DO NOT include any code blocks in your response."""
             }
     
     def _parse_issues(self, analysis: str) -> List[Dict]:
-        """Parse issues from analysis text"""
+        """
+        Parse issues from analysis text (answers that are not schema JSON).
+        A bullet that names no severity counts as major.
+        """
         issues = []
         lines = analysis.split('\n')
         for line in lines:
             line = line.strip()
             if line.startswith(('-', '*', '•')) and len(line) > 5:
-                issues.append({"description": line.lstrip('-*• ').strip()})
+                severity = _SEVERITY_RE.search(line)
+                issues.append({
+                    "description": line.lstrip('-*• ').strip(),
+                    "severity": severity.group(1).lower() if severity else "major"
+                })
         return issues[:5]
@@ -4,14 +4,18 @@ VibeBuilder V2 - Fixed Component Error
 
 import streamlit as st
 import streamlit.components.v1 as components
+import hashlib
 import os
 import sys
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 load_dotenv()
 
+from utils.project_export import split_project, stream_archive
+
 st.set_page_config(
     page_title="VibeBuilder",
     page_icon="🔨",
@@ -121,9 +125,114 @@ if 'code' not in st.session_state:
     st.session_state.code = ''
 if 'built' not in st.session_state:
     st.session_state.built = False
+if 'job' not in st.session_state:
+    st.session_state.job = None
 
 API_KEY = os.getenv("GOOGLE_API_KEY", "")
 
+# Builds run on a shared worker pool so reruns never block on or restart them
+MAX_BUILD_WORKERS = int(os.getenv("VIBEBUILDER_BUILD_WORKERS", "8"))
+POLL_INTERVAL = 1.0
+# Tail of the streaming code shown while the coder writes
+LIVE_PREVIEW_CHARS = 2000
+STEP_NAMES = {1: "Research", 2: "Plan", 3: "Code", 4: "Test", 6: "Fix", 7: "Refine", 8: "Complete"}
+
+
+@st.cache_resource
+def get_orchestrator():
+    """One orchestrator (and its Gemini models) per Streamlit server"""
+    from agents.orchestrator import VibeBuilderOrchestrator
+    return VibeBuilderOrchestrator(API_KEY)
+
+
+@st.cache_data(max_entries=8)
+def project_zip(sha256: str, _code: str) -> bytes:
+    """The exported project archive, built once per version of the code"""
+    return b''.join(stream_archive(split_project(_code), "zip", "vibe-app"))
+
+
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=MAX_BUILD_WORKERS, thread_name_prefix="vibe-build")
+
+
+class BuildJob:
+    """
+    Progress of one background build/refine. Written by the worker thread,
+    read by the session's script runs (workers never touch st.session_state).
+    """
+
+    def __init__(self, kind: str, base_code: str = ""):
+        self.kind = kind
+        self.steps = []
+        self.code = base_code
+        # Code as the coder streams it, shown until the code phase completes
+        self.preview = ""
+        self.error = None
+        self.done = False
+        self.applied = False
+        self._lock = threading.Lock()
+
+    def record(self, update: dict):
+        code = _code_from_update(update)
+        with self._lock:
+            if update.get("message"):
+                self.steps.append((STEP_NAMES.get(update.get("step", 0), "Working"), update["message"]))
+            if code:
+                self.code = code
+                self.preview = ""
+
+    def stream_code(self, chunk: str):
+        with self._lock:
+            self.preview += chunk
+
+    def live_preview(self) -> str:
+        with self._lock:
+            return self.preview
+
+    def finish(self, error: str = None):
+        with self._lock:
+            self.error = error
+            self.done = True
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.steps), self.code, self.done, self.error
+
+
+def _code_from_update(update: dict) -> str:
+    data = update.get("data") or {}
+    return update.get("final_code") or data.get("code") or data.get("fixed_code") or data.get("refined_code") or ""
+
+
+def _run_job(job: BuildJob, updates):
+    try:
+        for update in updates:
+            job.record(update)
+        job.finish()
+    except Exception as e:
+        job.finish(str(e)[:200])
+
+
+def start_job(kind: str, **kwargs):
+    """Submit a build or refine to the worker pool and track it in the session"""
+    try:
+        orchestrator = get_orchestrator()
+    except ImportError as e:
+        job = BuildJob(kind)
+        job.finish(f"Import Error: {e}")
+        st.session_state.job = job
+        return
+
+    if kind == "refine":
+        job = BuildJob(kind, kwargs["code"])
+        updates = orchestrator.refine(kwargs["code"], kwargs["feedback"])
+    else:
+        job = BuildJob(kind)
+        updates = orchestrator.build(kwargs["idea"], max_iterations=2, on_code=job.stream_code)
+    st.session_state.job = job
+    get_executor().submit(_run_job, job, updates)
+
 
 def show_welcome():
     """Welcome page"""
@@ -151,6 +260,7 @@ def show_welcome():
             st.session_state.page = 'building'
             st.session_state.code = ''
             st.session_state.built = False
+            st.session_state.job = None
             st.rerun()
     
     st.markdown("<br>", unsafe_allow_html=True)
@@ -163,6 +273,7 @@ def show_welcome():
                 st.session_state.page = 'building'
                 st.session_state.code = ''
                 st.session_state.built = False
+                st.session_state.job = None
                 st.rerun()
 
 
@@ -176,6 +287,7 @@ def show_building():
             st.session_state.page = 'welcome'
             st.session_state.code = ''
             st.session_state.built = False
+            st.session_state.job = None
             st.rerun()
     
     st.divider()
@@ -185,16 +297,21 @@ def show_building():
     with left:
         st.markdown("##### Progress")
         
-        if not st.session_state.built:
-            run_build()
-        else:
-            st.success("✅ Build complete!")
+        if not st.session_state.built and st.session_state.job is None:
+            start_job("build", idea=st.session_state.idea)
+        
+        job = st.session_state.job
+        if job is not None and not job.applied:
+            show_progress()
+        elif job is not None:
+            render_steps(job)
         
         # Refinement
         if st.session_state.code:
             st.divider()
             feedback = st.text_input("Want changes?", placeholder="Make button bigger...")
-            if st.button("Apply") and feedback:
+            busy = job is not None and not job.done
+            if st.button("Apply", disabled=busy) and feedback:
                 apply_changes(feedback)
     
     with right:
@@ -207,86 +324,55 @@ def show_building():
             with tab2:
                 st.code(st.session_state.code, language="html")
                 st.download_button("Download", st.session_state.code, "app.html", "text/html")
+                st.download_button("Download project (.zip)",
+                                   project_zip(hashlib.sha256(st.session_state.code.encode('utf-8')).hexdigest(),
+                                               st.session_state.code),
+                                   "vibe-app.zip", "application/zip")
         else:
             st.info("Your app will appear here...")
 
 
-def run_build():
-    """Execute build"""
-    try:
-        from agents.orchestrator import VibeBuilderOrchestrator
-    except ImportError as e:
-        st.markdown(f'<div class="error-box">Import Error: {e}</div>', unsafe_allow_html=True)
-        st.session_state.built = True
-        return
-    
-    try:
-        orchestrator = VibeBuilderOrchestrator(API_KEY)
-        steps = {1: "Research", 2: "Plan", 3: "Code", 4: "Test", 6: "Fix", 8: "Complete"}
-        
-        for update in orchestrator.build(st.session_state.idea, max_iterations=2):
-            step = update.get("step", 0)
-            phase = update.get("phase", "")
-            status = update.get("status", "")
-            message = update.get("message", "")
-            step_name = steps.get(step, "Working")
-            
-            st.markdown(f'''
-            <div class="step-box">
-                <div class="step-label">{step_name}</div>
-                <div class="step-content">{message}</div>
-            </div>
-            ''', unsafe_allow_html=True)
-            
-            # Capture code
-            if phase == "code" and status == "complete":
-                code = update.get("data", {}).get("code", "")
-                if code:
-                    st.session_state.code = code
-            
-            elif phase == "fix" and status == "complete":
-                code = update.get("data", {}).get("fixed_code", "")
-                if code:
-                    st.session_state.code = code
-            
-            elif phase == "export":
-                code = update.get("final_code", st.session_state.code)
-                if code:
-                    st.session_state.code = code
-        
-        st.session_state.built = True
-        st.success("✅ Build complete!")
-        st.rerun()  # Rerun to show the result
-        
-    except Exception as e:
-        st.markdown(f'<div class="error-box">Error: {str(e)[:200]}</div>', unsafe_allow_html=True)
-        st.session_state.built = True
-
-
-def apply_changes(feedback: str):
-    """Apply refinement"""
-    try:
-        from agents.orchestrator import VibeBuilderOrchestrator
-        
+def render_steps(job: BuildJob):
+    steps, _, done, error = job.snapshot()
+    for step_name, message in steps:
         st.markdown(f'''
         <div class="step-box">
-            <div class="step-label">Refine</div>
-            <div class="step-content">Applying: {feedback[:50]}...</div>
+            <div class="step-label">{step_name}</div>
+            <div class="step-content">{message}</div>
         </div>
         ''', unsafe_allow_html=True)
-        
-        orchestrator = VibeBuilderOrchestrator(API_KEY)
-        
-        for update in orchestrator.refine(st.session_state.code, feedback):
-            if update.get("status") == "complete":
-                code = update.get("refined_code", st.session_state.code)
-                st.session_state.code = code
-        
-        st.success("✅ Changes applied!")
-        st.rerun()
-        
-    except Exception as e:
-        st.markdown(f'<div class="error-box">Error: {str(e)[:100]}</div>', unsafe_allow_html=True)
+    if error:
+        st.markdown(f'<div class="error-box">Error: {error}</div>', unsafe_allow_html=True)
+    elif done:
+        st.success("✅ Changes applied!" if job.kind == "refine" else "✅ Build complete!")
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def show_progress():
+    """Polls the running job; only this fragment reruns while a build is in flight"""
+    job = st.session_state.job
+    render_steps(job)
+    _, code, done, _ = job.snapshot()
+    if not done:
+        preview = job.live_preview()
+        if preview:
+            # The end of what the coder has written so far
+            st.code(preview[-LIVE_PREVIEW_CHARS:], language="html")
+        st.caption("Working...")
+        return
+
+    # Hand the result to the rest of the page once, then stop polling
+    job.applied = True
+    if code:
+        st.session_state.code = code
+    st.session_state.built = True
+    st.rerun()
+
+
+def apply_changes(feedback: str):
+    """Apply refinement in the background"""
+    start_job("refine", code=st.session_state.code, feedback=feedback)
+    st.rerun()
 
 
 # Main router
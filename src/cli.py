@@ -0,0 +1,170 @@
+"""
+VibeBuilder V2 - Headless Build Runner
+Runs many builds in parallel without the web server
+
+Usage:
+    python src/cli.py ideas.txt -o builds -j 4
+    cat ideas.txt | python src/cli.py - --executor process
+    python src/cli.py --idea "Weather Dashboard" --iterations 1
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.build_history import BuildRecorder
+from utils.latency_budget import BUILD_MODES
+from utils.token_ledger import TokenLedger
+from utils.usage import sum_usage
+
+load_dotenv()
+
+# One orchestrator per worker process (threads share it; it is build-safe)
+_orchestrator = None
+_orchestrator_lock = threading.Lock()
+
+
+def _get_orchestrator(api_keys: List[str]):
+    global _orchestrator
+    with _orchestrator_lock:
+        if _orchestrator is None:
+            from agents.key_pool import KeyPool
+            from agents.orchestrator import VibeBuilderOrchestrator
+            _orchestrator = VibeBuilderOrchestrator(api_keys[0], delay=0, client=KeyPool(api_keys))
+        return _orchestrator
+
+
+def read_ideas(source: str, extra: List[str]) -> List[str]:
+    """One idea per line; blank lines and '#' comments are skipped"""
+    lines = list(extra)
+    if source:
+        stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+        with stream:
+            lines.extend(stream.read().splitlines())
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def slugify(text: str, limit: int = 40) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+    return slug[:limit].rstrip('-') or 'build'
+
+
+def run_build(index: int, idea: str, api_keys: List[str], output_dir: str, max_iterations: int,
+              mode: str = None, deadline: float = None, token_budget: int = None) -> Dict:
+    """Run one build and write its files. Executes inside a pool worker."""
+    recorder = BuildRecorder(idea)
+    report = {"index": index, "idea": idea, "success": False}
+
+    try:
+        orchestrator = _get_orchestrator(api_keys)
+        for update in orchestrator.build(idea, max_iterations=max_iterations, mode=mode, deadline=deadline,
+                                         ledger=TokenLedger(token_budget)):
+            recorder.observe(update)
+        final = recorder.final
+
+        build_dir = os.path.join(output_dir, f"{index:04d}-{slugify(idea)}")
+        versions_dir = os.path.join(build_dir, "versions")
+        os.makedirs(versions_dir, exist_ok=True)
+        with open(os.path.join(build_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write(final["final_code"])
+        chain = []
+        for version in final["versions"]:
+            filename = f"v{version['version']}.html"
+            with open(os.path.join(versions_dir, filename), "w", encoding="utf-8") as f:
+                f.write(version["code"])
+            chain.append({"version": version["version"], "description": version["description"], "file": filename})
+        with open(os.path.join(build_dir, "versions.json"), "w", encoding="utf-8") as f:
+            json.dump(chain, f, indent=2)
+
+        report.update({
+            "success": True,
+            "passed": recorder.passed,
+            "output": build_dir,
+            "versions": len(chain),
+            "artifact": final.get("artifact", {}).get("stats"),
+            "budget": final.get("budget"),
+            "tokens": final.get("tokens")
+        })
+    except Exception as e:
+        report["error"] = str(e)
+
+    report["phases"] = recorder.phases
+    report["elapsed"] = recorder.elapsed
+    report["usage"] = recorder.usage
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run VibeBuilder builds headlessly and in parallel.")
+    parser.add_argument("ideas", nargs="?", help="File with one idea per line ('-' for stdin)")
+    parser.add_argument("--idea", action="append", default=[], help="Idea to build (repeatable)")
+    parser.add_argument("-o", "--output-dir", default="builds", help="Where to write builds (default: builds)")
+    parser.add_argument("-j", "--concurrency", type=int, default=2, help="Parallel builds (default: 2)")
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--iterations", type=int, default=2, help="Max test/fix iterations per build")
+    parser.add_argument("--mode", choices=tuple(BUILD_MODES), help="Latency mode; cuts phases to meet its deadline")
+    parser.add_argument("--deadline", type=float, help="Per-build deadline in seconds (overrides the mode's)")
+    parser.add_argument("--token-budget", type=int, help="Max tokens per build; no test/fix rounds past it")
+    parser.add_argument("--report", help="JSON report path (default: <output-dir>/report.json)")
+    args = parser.parse_args(argv)
+
+    from agents.key_pool import api_keys_from_env
+    api_keys = api_keys_from_env()
+    if not api_keys:
+        print("Error: GOOGLE_API_KEY (or GOOGLE_API_KEYS) not found in environment")
+        return 1
+
+    ideas = read_ideas(args.ideas, args.idea)
+    if not ideas:
+        parser.error("no ideas given (pass a file, '-' for stdin, or --idea)")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    pool_class = ProcessPoolExecutor if args.executor == "process" else ThreadPoolExecutor
+    print(f"🔨 Building {len(ideas)} ideas with {args.concurrency} {args.executor} workers")
+
+    started = time.time()
+    reports = []
+    with pool_class(max_workers=max(1, args.concurrency)) as pool:
+        futures = [
+            pool.submit(run_build, index, idea, api_keys, args.output_dir, args.iterations, args.mode, args.deadline,
+                        args.token_budget)
+            for index, idea in enumerate(ideas)
+        ]
+        for future in as_completed(futures):
+            report = future.result()
+            reports.append(report)
+            status = "✅" if report["success"] else "❌"
+            print(f"{status} [{len(reports)}/{len(ideas)}] {report['idea'][:50]} ({report['elapsed']}s)")
+
+    elapsed = time.time() - started
+    reports.sort(key=lambda r: r["index"])
+    summary = {
+        "builds": len(reports),
+        "succeeded": sum(1 for r in reports if r["success"]),
+        "passed": sum(1 for r in reports if r.get("passed")),
+        "concurrency": args.concurrency,
+        "executor": args.executor,
+        "elapsed": round(elapsed, 3),
+        "builds_per_minute": round(len(reports) * 60 / elapsed, 2) if elapsed else None,
+        "usage": sum_usage(r["usage"] for r in reports)
+    }
+
+    report_path = args.report or os.path.join(args.output_dir, "report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "builds": reports}, f, indent=2)
+    print(f"📊 {summary['succeeded']}/{summary['builds']} succeeded in {summary['elapsed']}s → {report_path}")
+    return 0 if summary["succeeded"] == summary["builds"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -77,8 +77,8 @@ AUDIT CATEGORIES:
 5. **Accessibility (A11y)** - ARIA roles, contrast, and focus states.
 6. **Security Baseline** - Path sanitization and CSRF awareness.
 
-If the code is flawless and follows all mandates, respond ONLY with: ALL_TESTS_PASSED
-Otherwise, provide a CRITICAL, numbered list of improvements (max 5). 
+If the code is flawless and follows all mandates, pass it with no issues.
+Otherwise, report the most CRITICAL improvements (max 5) as issues.
 Focus on quality over quantity. Do NOT dump code."""
 
 # =============================================================================
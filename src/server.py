@@ -3,12 +3,18 @@ VibeBuilder V2 - Flask Backend API
 Serves the frontend and handles AI generation requests
 """
 
-from flask import Flask, request, jsonify, send_from_directory, Response
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import os
 import sys
 import json
-import time
+import hashlib
+import select
+import socket
+import threading
 from dotenv import load_dotenv
 
 # Add parent directory to path
@@ -17,36 +23,253 @@ sys.path.insert(0, current_dir)
 
 load_dotenv()
 
-# Configure static folder explicitly
+from utils.build_optimizer import negotiate_encoding
+from utils.static_assets import StaticAssets, IMMUTABLE_CACHE
+from utils.artifact_store import ArtifactStore
+from utils.checkpoint_store import CheckpointStore, is_valid_build_id, new_build_id
+from utils import sse_protocol
+from utils.warmup import StartupState
+from utils.research_corpus import ResearchCorpus
+from utils.component_library import ComponentLibrary
+from utils.single_flight import SingleFlight, flight_key, normalize_feedback
+from utils.cancellation import BuildCancelled
+from utils.latency_budget import resolve_mode
+from utils.token_ledger import TenantBudgets
+from utils.build_history import DEFAULT_TENANT, BuildHistory
+from utils.project_export import ARCHIVE_FORMATS, split_project, stream_archive
+
+startup = StartupState()
+
+# Static files are served from memory (see utils/static_assets.py),
+# so Flask's own static route is disabled
 static_folder = os.path.join(current_dir, 'static')
-app = Flask(__name__, static_folder=static_folder)
+app = Flask(__name__, static_folder=None)
 CORS(app)
 
-API_KEY = os.getenv("GOOGLE_API_KEY", "")
+with startup.measure("import_client"):
+    from agents.key_pool import KeyPool, api_keys_from_env
 
-# Configure Gemini globally with REST transport to avoid gRPC hangs
-if API_KEY:
-    import google.generativeai as genai
-    genai.configure(api_key=API_KEY, transport='rest')
+# GOOGLE_API_KEYS=key1,key2,... (or a single GOOGLE_API_KEY). Each key keeps
+# its own quota and connection pool; calls go to the key with most headroom.
+API_KEYS = api_keys_from_env()
+API_KEY = API_KEYS[0] if API_KEYS else ""
+model_client = KeyPool(API_KEYS) if API_KEYS else None
 
 print(f"📂 Serving static files from: {static_folder}")
+static_assets = StaticAssets(static_folder)
+
+# Generated apps, stored once per content hash (see utils/artifact_store.py)
+DATA_DIR = os.getenv("VIBEBUILDER_DATA_DIR", os.path.join(os.path.dirname(current_dir), '.vibebuilder'))
+artifact_store = ArtifactStore(os.path.join(DATA_DIR, 'artifacts'))
+# Per-phase build checkpoints, so a retried build resumes where it failed
+checkpoint_store = CheckpointStore(os.path.join(DATA_DIR, 'checkpoints'))
+# Curated notes plus research learned from passing builds (see utils/research_corpus.py)
+research_corpus = ResearchCorpus(os.path.join(DATA_DIR, 'research.json'))
+# Markup + CSS mined from passing builds (see utils/component_library.py)
+component_library = ComponentLibrary(os.path.join(DATA_DIR, 'components.json'))
+# Finished builds, searchable (see utils/build_history.py)
+build_history = BuildHistory(os.path.join(DATA_DIR, 'history.db'))
+# Identical concurrent builds share one pipeline (see utils/single_flight.py)
+build_flights = SingleFlight()
+# Token budgets per build/refine and per tenant per UTC day (see utils/token_ledger.py); 0 disables
+BUILD_TOKEN_BUDGET = int(os.getenv("VIBEBUILDER_BUILD_TOKEN_BUDGET", "0")) or None
+TENANT_DAILY_TOKENS = int(os.getenv("VIBEBUILDER_TENANT_DAILY_TOKENS", "0")) or None
+# Set by the gateway in front of the server; requests without it share one tenant
+TENANT_HEADER = 'X-VibeBuilder-Tenant'
+tenant_budgets = TenantBudgets(build_history, TENANT_DAILY_TOKENS, BUILD_TOKEN_BUDGET)
+
+
+# Built once by the warmup thread and shared by all requests (builds keep
+# their state per call, so this is safe)
+_orchestrator = None
+_orchestrator_lock = threading.Lock()
+READY_WAIT_SECONDS = 30
+# Coder racing (see VibeBuilderOrchestrator._race_coder); 1 disables it
+RACE_CANDIDATES = int(os.getenv("VIBEBUILDER_RACE_CANDIDATES", "1"))
+RACE_VALIDATION = os.getenv("VIBEBUILDER_RACE_VALIDATION", "local")
+MAX_RACE_CANDIDATES = 4
+# Pause between phases so the UI can animate; load tests set it to 0
+PHASE_DELAY = float(os.getenv("VIBEBUILDER_PHASE_DELAY", "1.0"))
+# SSE comment sent when a stream has been quiet this long, so proxies keep it open
+HEARTBEAT_SECONDS = float(os.getenv("VIBEBUILDER_SSE_HEARTBEAT", "15"))
+# How often an idle stream checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+def get_orchestrator():
+    """Shared orchestrator; a request arriving mid-warmup waits for it"""
+    startup.wait(READY_WAIT_SECONDS)
+    return _build_orchestrator()
+
+
+def _build_orchestrator():
+    global _orchestrator
+    with _orchestrator_lock:
+        if _orchestrator is None:
+            from agents.orchestrator import VibeBuilderOrchestrator
+            _orchestrator = VibeBuilderOrchestrator(API_KEY, artifact_store=artifact_store,
+                                                    delay=PHASE_DELAY,
+                                                    checkpoint_store=checkpoint_store,
+                                                    race_candidates=RACE_CANDIDATES,
+                                                    race_validation=RACE_VALIDATION,
+                                                    research_corpus=research_corpus,
+                                                    component_library=component_library,
+                                                    client=model_client,
+                                                    build_history=build_history)
+        return _orchestrator
+
+
+def _warm_imports():
+    # Pulls in all five agents and the prompt templates
+    import agents.orchestrator
+    import prompts
+
+
+def _warm_connection():
+    # Resolves DNS and completes the TLS handshake before the first build
+    model_client.get_model('gemini-2.5-flash')
+
+
+def _warm_code_paths():
+    from utils.build_optimizer import optimize_build
+    optimize_build("<!DOCTYPE html><html><head><style>a { color: red; }</style></head>"
+                   "<body><script>let a = 1; // warm\n</script></body></html>")
+
+
+def _encoded_response(body: bytes, variants, etag: str, mimetype: str,
+                      cache_control: str = None, ranges: bool = False):
+    """Build a cacheable response, using a precompressed variant when accepted"""
+    # Byte ranges always refer to the identity encoding
+    if ranges and request.range is not None:
+        variants = {}
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), variants)
+    payload = variants[encoding] if encoding else body
+    response = Response(payload, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    response.set_etag(f"{etag}-{encoding or 'identity'}")
+    if ranges:
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(payload))
+    return response.make_conditional(request)
+
+
+def _asset_response(path: str):
+    asset = static_assets.get(path)
+    if asset is None:
+        return f"Not found: {path}", 404
+    return _encoded_response(asset["body"], asset["variants"], asset["etag"],
+                             asset["mimetype"], asset["cache_control"])
+
+
+def _negotiate_encoder(data):
+    """Legacy JSON events unless the client asks for the compact protocol"""
+    return sse_protocol.negotiate(
+        request.headers.get(sse_protocol.PROTOCOL_HEADER),
+        data,
+        request.headers.get('Accept-Encoding', '')
+    )
+
+
+def _client_gone(environ) -> bool:
+    """
+    True once the client closed its connection. Only possible where the
+    server exposes the socket (werkzeug, gunicorn sync/gthread); elsewhere
+    a disconnect shows up as a failed write instead.
+    """
+    sock = environ.get('werkzeug.socket') or environ.get('gunicorn.socket')
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        # Readable with nothing to read means the peer sent FIN
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b''
+    except ValueError:
+        # SSL sockets refuse MSG_PEEK
+        return False
+    except OSError:
+        return True
+
+
+def _stream_flight(flight, encoder, environ):
+    """
+    Encoded events of `flight`, a heartbeat comment whenever it has been
+    quiet for HEARTBEAT_SECONDS, and an early end if the client goes away
+    (the caller's leave() then cancels the build if nobody else watches)
+    """
+    last_sent = time.monotonic()
+    for update in flight.subscribe(tick=DISCONNECT_POLL_SECONDS):
+        if update is not None:
+            last_sent = time.monotonic()
+            yield encoder.encode(update)
+            continue
+        if _client_gone(environ):
+            print(f"🔌 Client disconnected from flight {flight.key[:8]}")
+            return
+        if time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+            last_sent = time.monotonic()
+            yield encoder.comment('heartbeat')
+    yield encoder.close()
+    print(f"📊 Stream: {encoder.bytes_out} bytes, {encoder.events} events (protocol v{encoder.protocol})")
+
+
+def _flight_response(flight, encoder):
+    environ = request.environ
+    response = _event_stream(_stream_flight(flight, encoder, environ), encoder)
+    # Runs when the stream ends for any reason, including a failed write
+    response.call_on_close(lambda: build_flights.leave(flight))
+    return response
+
+
+def _tenant() -> str:
+    return (request.headers.get(TENANT_HEADER) or '').strip()[:64] or DEFAULT_TENANT
+
+
+def _tenant_budget(data):
+    """
+    (tenant, requested token budget or None)
+
+    Raises:
+        ValueError: token_budget is not a positive integer
+    """
+    tenant = _tenant()
+    budget = data.get('token_budget')
+    if budget is not None:
+        budget = int(budget)
+        if budget <= 0:
+            raise ValueError("token_budget must be positive")
+    return tenant, budget
+
+
+def _tenant_exhausted(tenant: str):
+    """A 429 response if the tenant has spent its daily tokens, else None"""
+    if tenant_budgets.remaining(tenant) != 0:
+        return None
+    return jsonify({"error": "Daily token budget exhausted", "usage": tenant_budgets.usage(tenant)}), 429
+
+
+def _event_stream(events, encoder):
+    response = Response(events, mimetype='text/event-stream')
+    response.headers[sse_protocol.PROTOCOL_HEADER] = str(encoder.protocol)
+    response.headers['Cache-Control'] = 'no-cache'
+    if encoder.content_encoding:
+        response.headers['Content-Encoding'] = encoder.content_encoding
+    return response
+
 
 @app.route('/')
 def index():
     """Serve the main HTML page"""
-    try:
-        return send_from_directory(static_folder, 'index.html')
-    except Exception as e:
-        return f"Error serving index.html: {e}", 500
+    return _asset_response('index.html')
 
 
+@app.route('/static/<path:path>')
 @app.route('/<path:path>')
 def serve_static(path):
-    """Serve static files"""
-    try:
-        return send_from_directory(static_folder, path)
-    except Exception as e:
-        return f"Error serving {path}: {e}", 404
+    """Serve static files from the in-memory asset cache"""
+    return _asset_response(path)
 
 
 @app.route('/api/build', methods=['POST'])
@@ -63,24 +286,111 @@ def build():
         print("❌ API Key missing")
         return jsonify({"error": "API key not configured"}), 500
     
-    def generate():
+    # Clients retry a dropped build by sending back the build_id they were given
+    requested_id = data.get('build_id')
+    build_id = requested_id if is_valid_build_id(requested_id) else new_build_id()
+    race = data.get('race')
+    # Latency SLO: a mode (fast/balanced/quality) and/or a deadline in seconds
+    mode, deadline = data.get('mode'), data.get('deadline')
+    try:
+        race = max(1, min(int(race), MAX_RACE_CANDIDATES)) if race else None
+        resolve_mode(mode, deadline)
+        tenant, token_budget = _tenant_budget(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    exhausted = _tenant_exhausted(tenant)
+    if exhausted:
+        return exhausted
+    encoder = _negotiate_encoder(data)
+
+    def run_build(cancel):
+        ledger = tenant_budgets.open(tenant, token_budget)
         try:
-            print(f"🔨 Starting build for: {idea[:50]}...")
-            from agents.orchestrator import VibeBuilderOrchestrator
-            orchestrator = VibeBuilderOrchestrator(API_KEY)
+            print(f"🔨 Starting build {build_id} for: {idea[:50]}...")
+            orchestrator = get_orchestrator()
             
             # Send initial ping
-            yield f"data: {json.dumps({'step': 0, 'status': 'starting', 'message': 'Initializing...'})}\n\n"
+            yield {'step': 0, 'status': 'starting', 'message': 'Initializing...', 'build_id': build_id}
             
-            for update in orchestrator.build(idea, max_iterations=2):
+            for update in orchestrator.build(idea, max_iterations=2, build_id=build_id,
+                                              race_candidates=race, cancel=cancel, mode=mode,
+                                              deadline=deadline, ledger=ledger):
                 print(f"📤 Sending update: {update.get('status')} - {update.get('message')}")
-                yield f"data: {json.dumps(update)}\n\n"
+                yield update
                 
+        except BuildCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error during build: {e}")
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
-    
-    return Response(generate(), mimetype='text/event-stream')
+            yield {'error': str(e)}
+        finally:
+            # Cancelled and failed builds are charged for what they spent too
+            tenant_budgets.settle(ledger)
+
+    # A retry only joins the same retry; a new build joins any identical new build
+    options = {"race": race, "resume": build_id if is_valid_build_id(requested_id) else None,
+               "mode": mode, "deadline": deadline, "tenant": tenant, "token_budget": token_budget}
+    flight, started = build_flights.join(flight_key(idea, options), run_build)
+    if not started:
+        print(f"🔗 Joining in-flight build for: {idea[:50]} ({flight.subscribers} already watching)")
+
+    # Replays what the build has emitted so far, then follows it live
+    return _flight_response(flight, encoder)
+
+
+MAX_BATCH_IDEAS = 500
+MAX_BATCH_WORKERS = 16
+
+
+@app.route('/api/build/batch', methods=['POST'])
+def build_batch():
+    """Build many ideas in one request, streamed back as NDJSON"""
+    data = request.json or {}
+    ideas = [i.strip() for i in data.get('ideas', []) if isinstance(i, str) and i.strip()]
+
+    if not ideas:
+        return jsonify({"error": "No ideas provided"}), 400
+    if len(ideas) > MAX_BATCH_IDEAS:
+        return jsonify({"error": f"At most {MAX_BATCH_IDEAS} ideas per batch"}), 400
+    if not API_KEY:
+        return jsonify({"error": "API key not configured"}), 500
+
+    try:
+        max_workers = max(1, min(int(data.get('max_workers', 4)), MAX_BATCH_WORKERS))
+        max_iterations = max(0, min(int(data.get('max_iterations', 1)), 2))
+        similarity = float(data.get('similarity', 0.5))
+        # token_budget applies to each idea, like a single build's
+        tenant, token_budget = _tenant_budget(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid batch option: {e}"}), 400
+    exhausted = _tenant_exhausted(tenant)
+    if exhausted:
+        return exhausted
+    print(f"📦 Batch build: {len(ideas)} ideas, {max_workers} workers")
+
+    def generate():
+        # One ledger per idea, settled as its result goes out so later ideas see the spend
+        ledgers = {}
+
+        def open_ledger(index):
+            ledgers[index] = tenant_budgets.open(tenant, token_budget)
+            return ledgers[index]
+
+        try:
+            orchestrator = get_orchestrator()
+            for result in orchestrator.build_batch(ideas, max_workers, max_iterations, similarity, open_ledger):
+                if "index" in result:
+                    tenant_budgets.settle(ledgers.pop(result["index"]))
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            print(f"❌ Error during batch build: {e}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+        finally:
+            # Ideas the batch never finished (error, client gone) are charged for what they spent
+            for ledger in ledgers.values():
+                tenant_budgets.settle(ledger)
+
+    return Response(generate(), mimetype='application/x-ndjson')
 
 
 @app.route('/api/refine', methods=['POST'])
@@ -93,20 +403,154 @@ def refine():
     
     if not code or not feedback:
         return jsonify({"error": "Missing code or feedback"}), 400
+    try:
+        tenant, token_budget = _tenant_budget(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    exhausted = _tenant_exhausted(tenant)
+    if exhausted:
+        return exhausted
     
-    def generate():
+    encoder = _negotiate_encoder(data)
+    # The client already has `code`, so the refined version can go out as a delta
+    encoder.seed(code)
+
+    def run_refine(cancel):
+        ledger = tenant_budgets.open(tenant, token_budget)
         try:
-            from agents.orchestrator import VibeBuilderOrchestrator
-            orchestrator = VibeBuilderOrchestrator(API_KEY)
+            orchestrator = get_orchestrator()
             
-            for update in orchestrator.refine(code, feedback):
-                yield f"data: {json.dumps(update)}\n\n"
+            for update in orchestrator.refine(code, feedback, cancel=cancel, ledger=ledger):
+                yield update
             
+        except BuildCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error during refine: {e}")
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
-    
-    return Response(generate(), mimetype='text/event-stream')
+            yield {'error': str(e)}
+        finally:
+            tenant_budgets.settle(ledger)
+
+    # Runs as a flight too, so a disconnect cancels it and a double submit shares it
+    code_hash = hashlib.sha256(code.encode('utf-8')).hexdigest()
+    options = {"refine": code_hash, "tenant": tenant, "token_budget": token_budget}
+    flight, _ = build_flights.join(flight_key(feedback, options, normalize_feedback), run_refine)
+    return _flight_response(flight, encoder)
+
+
+@app.route('/api/builds')
+def list_builds():
+    """The tenant's build history, newest first; ?cursor=<next_cursor>&limit=&passed=0|1"""
+    passed = request.args.get('passed')
+    return jsonify(build_history.list(
+        cursor=request.args.get('cursor', type=int),
+        limit=request.args.get('limit', type=int),
+        passed=None if passed is None else passed not in ('0', 'false'),
+        tenant=_tenant()
+    ))
+
+
+@app.route('/api/builds/search')
+def search_builds():
+    """Full-text search over the tenant's ideas, plan components and features; ?q=&cursor=&limit="""
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({"error": "No query provided"}), 400
+    return jsonify(build_history.search(
+        query,
+        cursor=request.args.get('cursor', type=int),
+        limit=request.args.get('limit', type=int),
+        tenant=_tenant()
+    ))
+
+
+@app.route('/api/builds/<build_id>')
+def get_build(build_id):
+    """One of the tenant's recorded builds, with its code unless ?code=0"""
+    build = build_history.get(build_id, include_code=request.args.get('code') != '0', tenant=_tenant())
+    if build is None:
+        return jsonify({"error": "Build not found"}), 404
+    return jsonify(build)
+
+
+@app.route('/preview/<sha256>')
+def preview(sha256):
+    """Serve a stored app by content hash; the URL never changes meaning"""
+    artifact = artifact_store.get(sha256)
+    if artifact is None:
+        return jsonify({"error": "Artifact not found"}), 404
+
+    response = _encoded_response(artifact["body"], artifact["variants"], sha256, 'text/html',
+                                 cache_control=IMMUTABLE_CACHE, ranges=True)
+    filename = request.args.get('download')
+    if filename:
+        filename = os.path.basename(filename) if filename != '1' else 'vibe-app.html'
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@app.route('/api/export/<sha256>')
+def export_project(sha256):
+    """Stream a stored app as index.html + hashed CSS/JS + manifest; ?format=zip|tar.gz"""
+    archive_format = request.args.get('format', 'zip')
+    if archive_format not in ARCHIVE_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(ARCHIVE_FORMATS)}"}), 400
+    code = artifact_store.get_text(sha256)
+    if code is None:
+        return jsonify({"error": "Artifact not found"}), 404
+
+    name = f"vibe-app-{sha256[:8]}"
+    response = Response(stream_archive(split_project(code), archive_format, root=name),
+                        mimetype=ARCHIVE_FORMATS[archive_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.{archive_format}"'
+    # Same hash, same project
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
+
+
+@app.route('/api/health/live')
+def health_live():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({"status": "ok", "uptime": startup.report()["uptime"]})
+
+
+@app.route('/api/health/ready')
+def health_ready():
+    """Readiness: 503 until imports, agents and connections are warm"""
+    report = startup.report()
+    return jsonify(dict(report, status="ready" if report["ready"] else "warming")), (200 if report["ready"] else 503)
+
+
+@app.route('/api/keys')
+def key_utilization():
+    """Per-key request/token utilization and cooldowns (keys are masked)"""
+    if model_client is None:
+        return jsonify({"error": "API key not configured"}), 500
+    return jsonify(model_client.stats())
+
+
+@app.route('/api/usage')
+def tenant_usage():
+    """The calling tenant's token spend today and what its budget leaves"""
+    return jsonify(tenant_budgets.usage(_tenant()))
+
+
+def _rss_bytes():
+    """Resident memory of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
 
 
 @app.route('/api/health')
@@ -114,13 +558,30 @@ def health():
     """Health check"""
     return jsonify({
         "status": "ok",
+        "ready": startup.ready,
+        "startup": startup.report(),
         "api_configured": bool(API_KEY),
-        "static_folder": static_folder
+        "static_folder": static_folder,
+        "artifacts": artifact_store.stats(),
+        "research": research_corpus.stats(),
+        "components": component_library.stats(),
+        "api_keys": len(API_KEYS),
+        "rss_bytes": _rss_bytes(),
+        "builds": dict(build_flights.stats(), history=build_history.stats())
     })
 
 
+startup.record("server_import", time.perf_counter() - _import_started)
+_warmup_steps = [("import_agents", _warm_imports), ("optimizer", _warm_code_paths)]
+if API_KEY:
+    _warmup_steps.append(("orchestrator", _build_orchestrator))
+    if os.getenv("VIBEBUILDER_PREWARM_CONNECTION", "1") != "0":
+        _warmup_steps.append(("connection", _warm_connection))
+startup.start(_warmup_steps)
+
+
 if __name__ == '__main__':
     print("🔨 VibeBuilder V2 Starting...")
-    print(f"   API Key: {'Configured ✓' if API_KEY else 'Missing ✗'}")
+    print(f"   API Keys: {len(API_KEYS)} configured {'✓' if API_KEYS else '✗'}")
     print("   Open: http://localhost:5000")
     app.run(debug=True, port=5000, host='0.0.0.0')
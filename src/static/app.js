@@ -5,10 +5,21 @@
 
 const API_BASE = window.location.origin;
 
+// Compact event protocol (see src/utils/sse_protocol.py)
+const PROTOCOL_HEADERS = {
+    'Content-Type': 'application/json',
+    'X-VibeBuilder-Protocol': '2'
+};
+
 // State
 let currentCode = '';
+let currentArtifact = null; // /preview/<sha256> URL of the optimized build
+let currentBuildId = null;  // lets a dropped build resume from its checkpoints
+let buildFinished = false;
 let isBuilding = false;
 
+const MAX_BUILD_ATTEMPTS = 3;
+
 // DOM Elements
 const views = {
     welcome: document.getElementById('welcome-view'),
@@ -107,18 +118,30 @@ async function startBuild() {
     // Initial Status
     updateStatus('Initializing project...', true);
 
-    try {
-        const response = await fetch(`${API_BASE}/api/build`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ idea })
-        });
-
-        if (!response.ok) throw new Error(`Server connection failed`);
-        await readStream(response);
-    } catch (error) {
-        addMessage('System', `Connection error: ${error.message}`, 'error');
-        updateStatus('', false);
+    currentBuildId = null;
+    buildFinished = false;
+    for (let attempt = 1; attempt <= MAX_BUILD_ATTEMPTS && !buildFinished; attempt++) {
+        try {
+            const response = await fetch(`${API_BASE}/api/build`, {
+                method: 'POST',
+                headers: PROTOCOL_HEADERS,
+                body: JSON.stringify({ idea, deflate: true, build_id: currentBuildId })
+            });
+
+            if (!response.ok) throw new Error(`Server connection failed`);
+            await readStream(response);
+        } catch (error) {
+            if (!currentBuildId || attempt === MAX_BUILD_ATTEMPTS) {
+                addMessage('System', `Connection error: ${error.message}`, 'error');
+                break;
+            }
+        }
+        if (buildFinished || !currentBuildId) break;
+        if (attempt < MAX_BUILD_ATTEMPTS) {
+            // The resumed stream replays completed phases from their checkpoints
+            updateStatus('Connection lost, resuming build...', true);
+            if (display.chat) display.chat.innerHTML = '';
+        }
     }
 
     isBuilding = false;
@@ -126,9 +149,11 @@ async function startBuild() {
 }
 
 // Stream Reader (Shared)
-async function readStream(response) {
+async function readStream(response, inputCode = '') {
     const reader = response.body.getReader();
     const decoder = new TextDecoder();
+    const documents = new Map(); // sha256 -> HTML, per stream
+    if (inputCode) documents.set('input', inputCode);
     let buffer = '';
 
     while (true) {
@@ -143,13 +168,43 @@ async function readStream(response) {
             if (line.startsWith('data: ')) {
                 try {
                     const data = JSON.parse(line.slice(6));
-                    handleUpdate(data);
+                    handleUpdate(data.v === 2 ? decodeCompact(data, documents) : data);
                 } catch (e) { console.warn('Stream parse warning'); }
             }
         }
     }
 }
 
+// Compact protocol: register new documents, then swap {$doc: hash} refs for text
+function decodeCompact(event, documents) {
+    const { docs, v, ...rest } = event;
+    for (const [hash, def] of Object.entries(docs || {})) {
+        documents.set(hash, def.body !== undefined ? def.body : applyDelta(documents.get(def.base) || '', def.delta));
+    }
+    const resolve = (value) => {
+        if (Array.isArray(value)) return value.map(resolve);
+        if (value && typeof value === 'object') {
+            if (typeof value.$doc === 'string') return documents.get(value.$doc) || '';
+            return Object.fromEntries(Object.entries(value).map(([k, item]) => [k, resolve(item)]));
+        }
+        return value;
+    };
+    return resolve(rest);
+}
+
+// [n] keeps n lines, "text" inserts, [-n] skips n lines (mirrors line_delta)
+function applyDelta(base, delta) {
+    const lines = base.match(/[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$/g) || [];
+    let pos = 0;
+    let out = '';
+    for (const op of delta) {
+        if (typeof op === 'string') out += op;
+        else if (op[0] >= 0) { out += lines.slice(pos, pos + op[0]).join(''); pos += op[0]; }
+        else pos -= op[0];
+    }
+    return out;
+}
+
 // Update Handler
 function handleUpdate(data) {
     if (data.error) {
@@ -158,6 +213,8 @@ function handleUpdate(data) {
     }
 
     const { step, phase, status, message, data: payload } = data;
+    if (data.build_id) currentBuildId = data.build_id;
+    if (phase === 'export') buildFinished = true;
     
     // Phase mapping to Agents
     let agentName = 'System';
@@ -197,6 +254,12 @@ function handleUpdate(data) {
         updatePreview(newCode);
         if (data.final_code && btns.download) btns.download.style.display = 'flex';
     }
+
+    // Final builds are served minified + precompressed by the server
+    if (data.final_code && data.artifact?.url) {
+        currentArtifact = `${API_BASE}${data.artifact.url}`;
+        if (display.preview) display.preview.src = currentArtifact;
+    }
 }
 
 // UI Helpers
@@ -293,9 +356,11 @@ function updateStatus(text, show) {
 function updatePreview(code) {
     if (!code || code === currentCode) return;
     currentCode = code;
+    currentArtifact = null;
 
     if (display.preview) {
         display.preview.style.display = 'block';
+        display.preview.removeAttribute('src');
         const doc = display.preview.contentWindow.document;
         doc.open();
         doc.write(code);
@@ -312,8 +377,10 @@ function switchView(name) {
 
 function resetState() {
     currentCode = '';
+    currentArtifact = null;
     if (display.chat) display.chat.innerHTML = '';
     if (display.preview) {
+        display.preview.removeAttribute('src');
         const doc = display.preview.contentWindow.document;
         doc.open(); doc.write(''); doc.close();
     }
@@ -338,10 +405,10 @@ async function applyRefine() {
     try {
         const response = await fetch(`${API_BASE}/api/refine`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ code: currentCode, feedback })
+            headers: PROTOCOL_HEADERS,
+            body: JSON.stringify({ code: currentCode, feedback, deflate: true })
         });
-        await readStream(response);
+        await readStream(response, currentCode);
     } catch (e) {
         addMessage('System', 'Failed to update code', 'error');
     } finally {
@@ -362,6 +429,10 @@ function switchTab(el) {
 
 function downloadCode() {
     if (!currentCode) return;
+    if (currentArtifact) {
+        window.location.href = `${currentArtifact}?download=vibe-app.html`;
+        return;
+    }
     const blob = new Blob([currentCode], { type: 'text/html' });
     const url = URL.createObjectURL(blob);
     const a = document.createElement('a');
@@ -0,0 +1 @@
+# VibeBuilder V2 Tools
@@ -0,0 +1,346 @@
+"""
+VibeBuilder V2 - Fake Gemini
+Local stand-in for the generateContent REST API, for load tests that
+must not spend quota
+
+Usage:
+    python src/tools/fake_gemini.py --port 8765 --latency lognormal:0.7,0.4 --error-rate 0.02
+    VIBEBUILDER_GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta GOOGLE_API_KEY=fake python src/server.py
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.continuation import CONTINUATION_MARKER
+from utils.response_schemas import JSON_INSTRUCTION
+
+# Canned answers, keyed by the agent a prompt comes from
+RESEARCH_TEXT = """**Thinking Process**: Looking at leading apps of this kind and current UI patterns.
+**Key Findings**:
+- Mobile-first layout with a clear primary action.
+- Persist user data in localStorage.
+- Accessible contrast, focus states and keyboard support.
+- Subtle motion that respects prefers-reduced-motion."""
+
+PLAN_TEXT = """**Architect Thoughts**: A single-page app with a header, main workspace and modal editor.
+**Core Components**:
+- Navigation Bar
+- Theme Toggle
+- Main Workspace
+- Modal Dialog
+**Plan**: Semantic HTML shell, CSS custom properties for theming, one ES module for state."""
+
+ISSUES_TEXT = """- Buttons lack visible focus styles.
+- The form does not validate empty input.
+- Contrast of secondary text is below 4.5:1."""
+
+# The same answers for calls that ask for schema JSON (see utils/response_schemas.py)
+RESEARCH_JSON = {
+    "thinking": "Looking at leading apps of this kind and current UI patterns.",
+    "findings": ["Mobile-first layout with a clear primary action.", "Persist user data in localStorage.",
+                 "Accessible contrast, focus states and keyboard support.",
+                 "Subtle motion that respects prefers-reduced-motion."]
+}
+PLAN_JSON = {
+    "thoughts": "A single-page app with a header, main workspace and modal editor.",
+    "components": ["Navigation Bar", "Theme Toggle", "Main Workspace", "Modal Dialog"],
+    "plan": "Semantic HTML shell, CSS custom properties for theming, one ES module for state."
+}
+ISSUES_JSON = [
+    {"description": "Buttons lack visible focus styles.", "severity": "major"},
+    {"description": "The form does not validate empty input.", "severity": "major"},
+    {"description": "Contrast of secondary text is below 4.5:1.", "severity": "minor"}
+]
+
+CHAT_TEXT = "Great idea! I'll design and build a polished, responsive app for you."
+
+_ROW = '      <li class="item"><span class="title">Item {n}</span><button class="remove" aria-label="Remove item {n}">×</button></li>\n'
+
+
+def sample_document(size_kb: int = 20) -> str:
+    """A plausible generated app padded to roughly `size_kb`"""
+    head = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <!-- Load-test app: glassmorphism list with localStorage persistence and a dark mode toggle. -->
+  <title>Load Test App</title>
+  <style>
+    :root { --bg: #0f172a; --fg: #e2e8f0; --accent: #38bdf8; }
+    body { margin: 0; font-family: Inter, sans-serif; background: var(--bg); color: var(--fg); }
+    .navbar { display: flex; justify-content: space-between; padding: 1rem 2rem; }
+    .item { display: flex; justify-content: space-between; padding: .5rem 1rem; }
+    @media (max-width: 600px) { .navbar { flex-direction: column; } }
+    @keyframes fade { from { opacity: 0; } to { opacity: 1; } }
+  </style>
+</head>
+<body>
+  <nav class="navbar"><strong>Load Test</strong><button id="themeToggle">🌙</button></nav>
+  <main>
+    <ul class="list">
+"""
+    tail = """    </ul>
+  </main>
+  <script>
+    const items = JSON.parse(localStorage.getItem('items') || '[]');
+    document.getElementById('themeToggle').addEventListener('click', () => document.body.classList.toggle('dark'));
+    document.addEventListener('submit', e => e.preventDefault());
+  </script>
+</body>
+</html>"""
+    rows = []
+    budget = max(0, size_kb * 1024 - len(head) - len(tail))
+    n = 0
+    while budget > 0:
+        row = _ROW.format(n=n)
+        rows.append(row)
+        budget -= len(row)
+        n += 1
+    return head + ''.join(rows) + tail
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """
+    'fixed:S', 'uniform:LOW,HIGH' or 'lognormal:MU,SIGMA' (of ln seconds)
+    -> a function returning one delay in seconds, drawn from `rng`
+    """
+    kind, _, args = (spec or 'fixed:0').partition(':')
+    values = [float(v) for v in args.split(',') if v]
+    if kind == 'fixed':
+        return lambda: values[0] if values else 0.0
+    if kind == 'uniform':
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def classify(prompt: str) -> str:
+    """Which agent a prompt comes from, by the markers in our prompt templates"""
+    if CONTINUATION_MARKER in prompt:
+        return 'continue'
+    if 'QA Automation' in prompt:
+        return 'test'
+    if 'Creative Developer' in prompt:
+        return 'code'
+    if 'rapid debugging' in prompt or 'Product Engineer' in prompt:
+        return 'fix'
+    if 'Software Architect' in prompt:
+        return 'plan'
+    if 'best practices and UI/UX patterns' in prompt:
+        return 'research'
+    return 'chat'
+
+
+class FakeGemini:
+    """Behaviour knobs and counters shared by all request handlers"""
+
+    def __init__(self, latency: str = 'fixed:0', code_latency: str = None, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, pass_rate: float = 1.0, code_kb: int = 20,
+                 truncate_rate: float = 0.0, seed: int = None):
+        # Every draw comes from one seeded generator, so a seed reproduces a run
+        self.random = random.Random(seed)
+        self.latency = parse_latency(latency, self.random)
+        # Code generation is by far the longest call; it can get its own distribution
+        self.code_latency = parse_latency(code_latency, self.random) if code_latency else self.latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.pass_rate = pass_rate
+        self.truncate_rate = truncate_rate
+        self.document = sample_document(code_kb)
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def count(self, key: str):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def respond(self, prompt: str, json_output: bool = False):
+        """
+        (status, body dict, extra headers) for one generateContent call.
+        `json_output`: the call set responseMimeType application/json.
+        """
+        kind = classify(prompt)
+        json_output = json_output or JSON_INSTRUCTION in prompt
+        self.count(kind)
+        # Handlers run on many threads; a call takes all its draws at once so
+        # the draws of concurrent calls never interleave
+        with self._lock:
+            delay = self.code_latency() if kind in ('code', 'fix', 'continue') else self.latency()
+            roll, chance, cut = self.random.random(), self.random.random(), self.random.random()
+        time.sleep(delay)
+
+        if roll < self.rate_limit_rate:
+            self.count('429')
+            return 429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}, {"Retry-After": "1"}
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.count('500')
+            return 500, {"error": {"code": 500, "message": "Internal error", "status": "INTERNAL"}}, {}
+
+        finish_reason = "STOP"
+        if kind == 'test':
+            passed = chance < self.pass_rate
+            if json_output:
+                text = json.dumps({"issues": [] if passed else ISSUES_JSON, "passed": passed})
+            else:
+                text = 'No issues found.' if passed else ISSUES_TEXT
+        elif kind in ('code', 'fix'):
+            text = f"```html\n{self.document}\n```"
+            if chance < self.truncate_rate:
+                # Cut somewhere in the middle, as max_output_tokens would
+                text = text[:len(text) // 4 + int(cut * (len(text) // 2))]
+                finish_reason = "MAX_TOKENS"
+                self.count('truncated')
+        elif kind == 'continue':
+            text = self._rest_of_document(prompt)
+        elif json_output and kind in ('research', 'plan'):
+            text = json.dumps(RESEARCH_JSON if kind == 'research' else PLAN_JSON)
+        else:
+            text = {'research': RESEARCH_TEXT, 'plan': PLAN_TEXT, 'chat': CHAT_TEXT}[kind]
+        prompt_tokens = math.ceil(len(prompt) / 4)
+        output_tokens = math.ceil(len(text) / 4)
+        return 200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": finish_reason}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens
+            }
+        }, {}
+
+
+    def _rest_of_document(self, prompt: str) -> str:
+        """What follows the partial output in the canned document, repeating a little like real models do"""
+        partial = prompt.split(CONTINUATION_MARKER, 1)[1]
+        partial = partial[:partial.rfind('\n\nYour previous answer was cut off')]
+        tail = partial[-200:]
+        cut = self.document.rfind(tail)
+        if cut < 0:
+            return f"```html\n{self.document}\n```"
+        return self.document[max(0, cut + len(tail) - 40):] + "\n```"
+
+
+_GENERATE_RE = re.compile(r'^/v1beta/models/[\w.-]+:(generateContent|streamGenerateContent)$')
+# Text per server-sent event of a streamed response
+STREAM_CHUNK_CHARS = 2048
+_MODEL_RE = re.compile(r'^/v1beta/models/[\w.-]+$')
+
+
+def make_handler(fake: FakeGemini):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, like the real endpoint
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: Dict, headers: Dict = None):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_stream(self, body: Dict):
+            """A 200 answer as server-sent events; finish reason and usage ride on the last one"""
+            candidate = body["candidates"][0]
+            text = candidate["content"]["parts"][0]["text"]
+            pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+            events = []
+            for number, piece in enumerate(pieces):
+                event = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]}
+                if number == len(pieces) - 1:
+                    event["candidates"][0]["finishReason"] = candidate["finishReason"]
+                    event["usageMetadata"] = body["usageMetadata"]
+                events.append(f"data: {json.dumps(event)}\r\n\r\n".encode('utf-8'))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Content-Length', str(sum(len(e) for e in events)))
+            self.end_headers()
+            for event in events:
+                self.wfile.write(event)
+                self.wfile.flush()
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/stats':
+                return self._send(200, dict(fake.counts))
+            if _MODEL_RE.match(path):
+                return self._send(200, {"name": path[len('/v1beta/'):], "displayName": "Fake Gemini"})
+            self._send(404, {"error": {"code": 404, "message": "Not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length)
+            match = _GENERATE_RE.match(self.path.split('?')[0])
+            if not match:
+                return self._send(404, {"error": {"code": 404, "message": "Not found"}})
+            if not self.headers.get('x-goog-api-key'):
+                return self._send(403, {"error": {"code": 403, "message": "API key missing"}})
+            try:
+                body = json.loads(raw)
+                prompt = ''.join(p.get('text', '') for c in body['contents'] for p in c.get('parts', []))
+                config = body.get('generationConfig') or {}
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, {"error": {"code": 400, "message": "Invalid request"}})
+            status, answer, headers = fake.respond(prompt, config.get('responseMimeType') == 'application/json')
+            if status == 200 and match.group(1) == 'streamGenerateContent':
+                return self._send_stream(answer)
+            self._send(status, answer, headers)
+
+    return Handler
+
+
+def serve(fake: FakeGemini, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """Start serving on a daemon thread (port 0 picks a free port)"""
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generateContent API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:-0.7,0.5",
+                        help="fixed:S | uniform:LOW,HIGH | lognormal:MU,SIGMA (default: lognormal:-0.7,0.5, ~0.5s)")
+    parser.add_argument("--code-latency", help="Separate distribution for code/fix calls")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--pass-rate", type=float, default=1.0, help="Fraction of test calls that pass")
+    parser.add_argument("--code-kb", type=int, default=20, help="Size of the canned app (default: 20)")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="Fraction of code/fix answers cut off with finishReason MAX_TOKENS")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    fake = FakeGemini(args.latency, args.code_latency, args.error_rate, args.rate_limit_rate,
+                      args.pass_rate, args.code_kb, args.truncate_rate, args.seed)
+    server = serve(fake, args.host, args.port)
+    print(f"🤖 Fake Gemini on http://{args.host}:{server.server_address[1]}/v1beta (stats at /stats)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
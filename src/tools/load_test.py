@@ -0,0 +1,230 @@
+"""
+VibeBuilder V2 - SSE Load Generator
+Opens concurrent /api/build and /api/refine streams against a running
+server and reports time-to-first-event, time-to-final-code, event rate
+and server memory per concurrency level
+
+Usage (against a server backed by tools/fake_gemini.py):
+    python src/tools/load_test.py --concurrency 1,4,16 --requests 32 --refine-ratio 0.25
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.fake_gemini import sample_document
+
+DEFAULT_IDEAS = [
+    "A todo list with dark mode",
+    "A pomodoro timer with statistics",
+    "A recipe gallery with search",
+    "A personal finance dashboard",
+]
+REFINE_FEEDBACK = "Make the header sticky and add a footer"
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(values: List[float]) -> Dict:
+    return {
+        "p50": _round(percentile(values, 0.5)),
+        "p95": _round(percentile(values, 0.95)),
+        "max": _round(max(values) if values else None)
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+class MemorySampler:
+    """Polls the server's /api/health for its resident set size"""
+
+    def __init__(self, base_url: str, interval: float = 0.5):
+        self.url = f"{base_url}/api/health"
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def read(self) -> Optional[int]:
+        try:
+            return requests.get(self.url, timeout=5).json().get("rss_bytes")
+        except (requests.RequestException, ValueError):
+            return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> List[int]:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = self.read()
+            if rss:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+
+def run_stream(base_url: str, kind: str, payload: Dict, protocol: int, timeout: float) -> Dict:
+    """One SSE request, timed from send to the last byte"""
+    url = f"{base_url}/api/{kind}"
+    headers = {"X-VibeBuilder-Protocol": str(protocol)} if protocol > 1 else {}
+    result = {"kind": kind, "events": 0, "bytes": 0, "ttfe": None, "ttfc": None, "error": None}
+    started = time.perf_counter()
+    try:
+        with requests.post(url, json=payload, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                result["error"] = f"HTTP {response.status_code}"
+                return result
+            for line in response.iter_lines(chunk_size=None):
+                result["bytes"] += len(line) + 1
+                if not line.startswith(b"data:"):
+                    continue
+                now = time.perf_counter() - started
+                result["events"] += 1
+                if result["ttfe"] is None:
+                    result["ttfe"] = now
+                event = json.loads(line[5:])
+                if event.get("error"):
+                    result["error"] = str(event["error"])[:200]
+                if result["ttfc"] is None and event.get("final_code"):
+                    result["ttfc"] = now
+    except (requests.RequestException, ValueError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"[:200]
+    result["duration"] = time.perf_counter() - started
+    if result["ttfc"] is None and result["error"] is None:
+        result["error"] = "stream ended without final code"
+    return result
+
+
+def run_level(base_url: str, concurrency: int, total: int, refine_ratio: float, ideas: List[str],
+              protocol: int, timeout: float, refine_code: str) -> Dict:
+    """`total` streams with at most `concurrency` open at once"""
+    jobs = []
+    refine_every = round(1 / refine_ratio) if refine_ratio > 0 else 0
+    for n in range(total):
+        if refine_every and n % refine_every == refine_every - 1:
+            # Distinct feedback too, or the server coalesces the refines into one pipeline
+            jobs.append(("refine", {"code": refine_code, "feedback": f"{REFINE_FEEDBACK} (#{concurrency}-{n})"}))
+        else:
+            # Distinct ideas, so builds are not served from one another's caches
+            jobs.append(("build", {"idea": f"{ideas[n % len(ideas)]} #{concurrency}-{n}"}))
+
+    sampler = MemorySampler(base_url)
+    rss_before = sampler.read()
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda job: run_stream(base_url, job[0], job[1], protocol, timeout), jobs))
+    wall = time.perf_counter() - started
+    samples = sampler.stop()
+    rss_after = sampler.read()
+
+    ok = [r for r in results if not r["error"]]
+    events = sum(r["events"] for r in results)
+    report = {
+        "concurrency": concurrency,
+        "streams": len(results),
+        "builds": sum(1 for r in results if r["kind"] == "build"),
+        "refines": sum(1 for r in results if r["kind"] == "refine"),
+        "errors": len(results) - len(ok),
+        "wall_seconds": round(wall, 3),
+        "streams_per_second": round(len(results) / wall, 3) if wall else None,
+        "events_per_second": round(events / wall, 2) if wall else None,
+        "mb_received": round(sum(r["bytes"] for r in results) / 1e6, 3),
+        "time_to_first_event": summarize([r["ttfe"] for r in results if r["ttfe"] is not None]),
+        "time_to_final_code": {
+            kind: summarize([r["ttfc"] for r in ok if r["kind"] == kind])
+            for kind in ("build", "refine")
+        },
+        "rss_mb": {
+            "before": _mb(rss_before),
+            "peak": _mb(max(samples) if samples else None),
+            "after": _mb(rss_after)
+        },
+        "error_samples": sorted({r["error"] for r in results if r["error"]})[:5]
+    }
+    return report
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / 2 ** 20, 1) if value else None
+
+
+def print_report(report: Dict):
+    ttfe = report["time_to_first_event"]
+    build = report["time_to_final_code"]["build"]
+    refine = report["time_to_final_code"]["refine"]
+    rss = report["rss_mb"]
+    print(f"\n=== concurrency {report['concurrency']}: {report['streams']} streams "
+          f"({report['builds']} build / {report['refines']} refine), {report['errors']} errors, "
+          f"{report['wall_seconds']}s ===")
+    print(f"  first event      p50 {ttfe['p50']}s  p95 {ttfe['p95']}s  max {ttfe['max']}s")
+    print(f"  build final code p50 {build['p50']}s  p95 {build['p95']}s  max {build['max']}s")
+    if report["refines"]:
+        print(f"  refine final     p50 {refine['p50']}s  p95 {refine['p95']}s  max {refine['max']}s")
+    print(f"  throughput       {report['streams_per_second']} streams/s, {report['events_per_second']} events/s, "
+          f"{report['mb_received']} MB received")
+    print(f"  server RSS       {rss['before']} MB before, {rss['peak']} MB peak, {rss['after']} MB after")
+    for error in report["error_samples"]:
+        print(f"  ❌ {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent SSE load test for the VibeBuilder server.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Server base URL")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, help="Streams per level (default: 2x the concurrency)")
+    parser.add_argument("--refine-ratio", type=float, default=0.25, help="Fraction of streams that are refines")
+    parser.add_argument("--ideas", help="File with one idea per line")
+    parser.add_argument("--protocol", type=int, default=1, choices=(1, 2), help="SSE protocol to request")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-stream timeout in seconds")
+    parser.add_argument("--report", help="Write the full JSON report here")
+    args = parser.parse_args()
+
+    ideas = DEFAULT_IDEAS
+    if args.ideas:
+        with open(args.ideas, encoding='utf-8') as f:
+            ideas = [line.strip() for line in f if line.strip()] or DEFAULT_IDEAS
+    base_url = args.url.rstrip('/')
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    refine_code = sample_document(20)
+
+    reports = []
+    for concurrency in levels:
+        total = args.requests or 2 * concurrency
+        print(f"🚦 {total} streams at concurrency {concurrency}...")
+        report = run_level(base_url, concurrency, total, args.refine_ratio, ideas,
+                           args.protocol, args.timeout, refine_code)
+        print_report(report)
+        reports.append(report)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"url": base_url, "protocol": args.protocol, "levels": reports}, f, indent=2)
+        print(f"\n📄 Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+VibeBuilder V2 - Artifact Store
+Content-addressed storage for generated apps: files on local disk,
+fronted by an in-memory LRU
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# On-disk suffix for each precompressed variant
+VARIANT_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def is_valid_hash(value: str) -> bool:
+    return bool(value) and bool(_SHA256_RE.match(value))
+
+
+class ArtifactStore:
+    """
+    Stores blobs under their sha256. Identical content is written once.
+
+    Layout: <root>/<first 2 hex chars>/<sha256>[.gz|.br]
+    """
+
+    def __init__(self, root: str, memory_items: int = 128):
+        self.root = root
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, data: Union[str, bytes], variants: Optional[Dict[str, bytes]] = None) -> str:
+        """Store content (and optional precompressed variants); returns its sha256"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        variants = {k: v for k, v in (variants or {}).items() if k in VARIANT_SUFFIXES}
+
+        with self._lock:
+            cached = self._memory.get(digest)
+            if cached is not None and set(variants) <= set(cached["variants"]):
+                self._memory.move_to_end(digest)
+                return digest
+
+        path = self._path(digest)
+        self._write_once(path, data)
+        for encoding, blob in variants.items():
+            self._write_once(path + VARIANT_SUFFIXES[encoding], blob)
+
+        entry = self._load(digest) or {"body": data, "variants": variants}
+        self._remember(digest, entry)
+        return digest
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """Returns {'body': bytes, 'variants': {encoding: bytes}} or None"""
+        if not is_valid_hash(digest):
+            return None
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry is not None:
+                self._memory.move_to_end(digest)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = self._load(digest)
+        if entry is not None:
+            self._remember(digest, entry)
+        return entry
+
+    def get_text(self, digest: str) -> Optional[str]:
+        entry = self.get(digest)
+        return entry["body"].decode('utf-8') if entry else None
+
+    def __contains__(self, digest: str) -> bool:
+        return is_valid_hash(digest) and os.path.exists(self._path(digest))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"memory_items": len(self._memory), "hits": self.hits, "misses": self.misses}
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _load(self, digest: str) -> Optional[Dict]:
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        variants = {}
+        for encoding, suffix in VARIANT_SUFFIXES.items():
+            try:
+                with open(path + suffix, 'rb') as f:
+                    variants[encoding] = f.read()
+            except FileNotFoundError:
+                pass
+        return {"body": body, "variants": variants}
+
+    def _remember(self, digest: str, entry: Dict):
+        with self._lock:
+            self._memory[digest] = entry
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _write_once(path: str, data: bytes):
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see partial content
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
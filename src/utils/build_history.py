@@ -0,0 +1,351 @@
+"""
+VibeBuilder V2 - Build History
+Every finished build in SQLite: idea, plan components, feature tags,
+phase timings and token usage, full-text indexed, with the code stored
+zlib-compressed in a side table so listings never read it. Also keeps
+each tenant's token spend per day.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import closing
+from typing import Dict, List, Optional
+
+from utils.text_utils import normalize_idea
+from utils.usage import USAGE_FIELDS, sum_usage
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Owner of builds made without a tenant (CLI, rows from before tenants existed)
+DEFAULT_TENANT = "default"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY,
+    build_id TEXT NOT NULL UNIQUE,
+    idea TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    passed INTEGER NOT NULL,
+    elapsed REAL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    tenant TEXT,
+    tokens TEXT NOT NULL DEFAULT '{}',
+    components TEXT NOT NULL DEFAULT '[]',
+    features TEXT NOT NULL DEFAULT '[]',
+    phases TEXT NOT NULL DEFAULT '{}',
+    versions INTEGER NOT NULL DEFAULT 0,
+    code_size INTEGER NOT NULL DEFAULT 0,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS builds_passed ON builds (passed, id);
+CREATE TABLE IF NOT EXISTS build_code (
+    id INTEGER PRIMARY KEY,
+    code BLOB NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS builds_fts USING fts5 (
+    idea, components, features, content='builds', content_rowid='id',
+    detail=column, prefix='2 3 4 5 6'
+);
+CREATE TABLE IF NOT EXISTS build_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    builds INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO build_totals VALUES (1, 0, 0, 0);
+CREATE TABLE IF NOT EXISTS tenant_usage (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    PRIMARY KEY (tenant, day)
+);
+"""
+# Columns added after the first release, for databases created before them
+_ADDED_COLUMNS = {
+    "cached_tokens": "INTEGER NOT NULL DEFAULT 0",
+    "tenant": "TEXT",
+    "tokens": "TEXT NOT NULL DEFAULT '{}'",
+}
+# Longest prefix with its own FTS index; longer search words are cut to it,
+# because an unindexed prefix scan reads every matching term's full doclist
+MAX_PREFIX = 6
+
+_SUMMARY_COLUMNS = ("id", "build_id", "idea", "created_at", "passed", "elapsed", "prompt_tokens",
+                    "output_tokens", "cached_tokens", "total_tokens", "tenant", "tokens", "components",
+                    "features", "phases", "versions", "code_size", "sha256")
+_JSON_COLUMNS = ("components", "features", "phases", "tokens")
+
+
+class BuildRecorder:
+    """Phase timings, token usage and outcome of one build, read off its events"""
+
+    def __init__(self, idea: str, tenant: str = None):
+        self.idea = idea
+        self.tenant = tenant
+        self.started = time.time()
+        self.build_id = None
+        self.passed = False
+        self.phases: Dict[str, float] = {}
+        self.components: List[str] = []
+        self.features: List[str] = []
+        self.final: Optional[Dict] = None
+        self._phase_started: Dict[str, float] = {}
+        self._usages = []
+
+    def observe(self, update: Dict):
+        phase = update.get("phase", "")
+        data = update.get("data") or {}
+        if update.get("status") == "starting":
+            self._phase_started[phase] = time.time()
+        elif phase in self._phase_started:
+            started = self._phase_started.pop(phase)
+            # Prefer the time the phase itself took (the orchestrator's pacing delay excluded)
+            elapsed = data.get("elapsed") if isinstance(data.get("elapsed"), (int, float)) else time.time() - started
+            key = phase
+            # Corpus answers take milliseconds; kept apart so they do not skew grounded search timings
+            if phase == "research" and data.get("source") not in (None, "search"):
+                key = f"research_{data['source']}"
+            self.phases[key] = round(self.phases.get(key, 0.0) + elapsed, 3)
+        self._usages.append(data.get("usage"))
+        self.build_id = update.get("build_id") or self.build_id
+        if phase == "plan" and update.get("status") == "complete":
+            self.components = data.get("components", [])
+        if phase == "code" and update.get("status") == "complete":
+            self.features = data.get("features", [])
+        if phase == "test" and update.get("status") == "passed":
+            self.passed = True
+        if phase == "export":
+            self.final = update
+
+    @property
+    def usage(self) -> Dict:
+        # The build's token ledger counts every call; phase results miss some (chat, race losers)
+        tokens = (self.final or {}).get("tokens")
+        if tokens:
+            return {field: tokens["totals"][field] for field in USAGE_FIELDS}
+        return sum_usage(self._usages)
+
+    @property
+    def elapsed(self) -> float:
+        return round(time.time() - self.started, 3)
+
+
+class BuildHistory:
+    """
+    SQLite (WAL) store of finished builds. Listing and search page by
+    descending row id (keyset pagination), so a page costs the same at any
+    depth and any table size.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._write_lock = threading.Lock()
+        with self._write_lock, self._db() as db:
+            # Persistent in the database file, so connections opened later inherit it
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            existing = {row[1] for row in db.execute("PRAGMA table_info(builds)")}
+            for column, declaration in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    db.execute(f"ALTER TABLE builds ADD COLUMN {column} {declaration}")
+            # Listings are per tenant; the index needs the column added above
+            db.execute("CREATE INDEX IF NOT EXISTS builds_tenant ON builds (tenant, id)")
+            db.execute("UPDATE builds SET tenant = ? WHERE tenant IS NULL", (DEFAULT_TENANT,))
+            db.commit()
+
+    def record(self, recorder: BuildRecorder, code: str, sha256: str = None) -> Optional[int]:
+        """Store a finished build (a rebuilt build_id replaces its row)"""
+        if not recorder.build_id:
+            return None
+        usage = recorder.usage
+        final = recorder.final or {}
+        row = {
+            "build_id": recorder.build_id,
+            "idea": recorder.idea,
+            "created_at": time.time(),
+            "passed": int(recorder.passed),
+            "elapsed": recorder.elapsed,
+            "prompt_tokens": usage["prompt_tokens"],
+            "output_tokens": usage["output_tokens"],
+            "cached_tokens": usage["cached_tokens"],
+            "total_tokens": usage["total_tokens"],
+            "tenant": recorder.tenant or DEFAULT_TENANT,
+            "tokens": json.dumps((final.get("tokens") or {}).get("phases", {})),
+            "components": json.dumps(recorder.components),
+            "features": json.dumps(recorder.features),
+            "phases": json.dumps(recorder.phases),
+            "versions": len(final.get("versions", [])),
+            "code_size": len(code.encode('utf-8')),
+            "sha256": sha256
+        }
+        compressed = zlib.compress(code.encode('utf-8'), 6)
+        with self._write_lock, self._db() as db:
+            with db:
+                self._delete(db, recorder.build_id)
+                columns = ', '.join(row)
+                cursor = db.execute(f"INSERT INTO builds ({columns}) VALUES ({', '.join('?' * len(row))})",
+                                    list(row.values()))
+                row_id = cursor.lastrowid
+                db.execute("INSERT INTO build_code (id, code) VALUES (?, ?)", (row_id, compressed))
+                db.execute("INSERT INTO builds_fts (rowid, idea, components, features) VALUES (?, ?, ?, ?)",
+                           (row_id, row["idea"], ' '.join(recorder.components), ' '.join(recorder.features)))
+                self._count(db, 1, row["passed"], row["total_tokens"])
+        return row_id
+
+    def list(self, cursor: int = None, limit: int = DEFAULT_PAGE_SIZE, passed: bool = None,
+             tenant: str = None) -> Dict:
+        """
+        Newest first, of one `tenant` (None: all); pass the returned
+        next_cursor to get the following page
+        """
+        limit = _page_size(limit)
+        where, params = [], []
+        if tenant is not None:
+            where.append("tenant = ?")
+            params.append(tenant)
+        if cursor:
+            where.append("id < ?")
+            params.append(int(cursor))
+        if passed is not None:
+            where.append("passed = ?")
+            params.append(int(passed))
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._db() as db:
+            rows = db.execute(
+                f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM builds {clause} ORDER BY id DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+        return self._page(rows, limit)
+
+    def search(self, query: str, cursor: int = None, limit: int = DEFAULT_PAGE_SIZE,
+               tenant: str = None) -> Dict:
+        """
+        Builds of `tenant` (None: all) whose idea, plan components or
+        features contain every word of `query` (prefix match on at most
+        MAX_PREFIX characters), newest first
+        """
+        limit = _page_size(limit)
+        # One-letter words match nearly everything and have no prefix index
+        words = [word for word in normalize_idea(query).split() if len(word) > 1]
+        if not words:
+            return {"builds": [], "next_cursor": None}
+        # Words are [a-z0-9]+ only, so quoting them is all the escaping needed
+        match = ' '.join(f'"{word[:MAX_PREFIX]}"*' for word in words)
+        params = [match]
+        clause = ""
+        if cursor:
+            clause = "AND builds_fts.rowid < ?"
+            params.append(int(cursor))
+        # In the WHERE with the MATCH, so other tenants' rows never take up the LIMIT
+        if tenant is not None:
+            clause += " AND b.tenant = ?"
+            params.append(tenant)
+        columns = ', '.join(f"b.{column}" for column in _SUMMARY_COLUMNS)
+        with self._db() as db:
+            rows = db.execute(
+                f"SELECT {columns} FROM builds_fts JOIN builds b ON b.id = builds_fts.rowid "
+                f"WHERE builds_fts MATCH ? {clause} ORDER BY builds_fts.rowid DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+        return self._page(rows, limit)
+
+    def get(self, build_id: str, include_code: bool = True, tenant: str = None) -> Optional[Dict]:
+        """The build, or None if there is none (or it belongs to another `tenant`)"""
+        clause, params = "WHERE build_id = ?", [build_id]
+        if tenant is not None:
+            clause += " AND tenant = ?"
+            params.append(tenant)
+        with self._db() as db:
+            row = db.execute(f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM builds {clause}", params).fetchone()
+            if row is None:
+                return None
+            build = self._summary(row)
+            if include_code:
+                blob = db.execute("SELECT code FROM build_code WHERE id = ?", (build["id"],)).fetchone()
+                build["code"] = zlib.decompress(blob[0]).decode('utf-8') if blob else ""
+        return build
+
+    def charge(self, tenant: str, tokens: int, day: str):
+        """Add `tokens` to the tenant's spend for `day` (YYYY-MM-DD)"""
+        with self._write_lock, self._db() as db:
+            with db:
+                db.execute("INSERT INTO tenant_usage (tenant, day, tokens) VALUES (?, ?, ?) "
+                           "ON CONFLICT (tenant, day) DO UPDATE SET tokens = tokens + excluded.tokens",
+                           (tenant, day, int(tokens)))
+
+    def tenant_spend(self, tenant: str, day: str) -> int:
+        with self._db() as db:
+            row = db.execute("SELECT tokens FROM tenant_usage WHERE tenant = ? AND day = ?",
+                             (tenant, day)).fetchone()
+        return row[0] if row else 0
+
+    def phase_samples(self, limit: int = 200) -> List[Dict]:
+        """Phase timings of the `limit` most recent builds"""
+        with self._db() as db:
+            rows = db.execute("SELECT phases FROM builds ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def stats(self) -> Dict:
+        # Kept up to date by record(), since COUNT(*) scans the whole table
+        with self._db() as db:
+            count, passed, tokens = db.execute(
+                "SELECT builds, passed, total_tokens FROM build_totals WHERE id = 1"
+            ).fetchone()
+        return {"builds": count, "passed": passed, "total_tokens": tokens}
+
+    def _page(self, rows, limit: int) -> Dict:
+        builds = [self._summary(row) for row in rows[:limit]]
+        next_cursor = builds[-1]["id"] if len(rows) > limit else None
+        return {"builds": builds, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _summary(row) -> Dict:
+        build = dict(zip(_SUMMARY_COLUMNS, row))
+        for column in _JSON_COLUMNS:
+            build[column] = json.loads(build[column])
+        build["passed"] = bool(build["passed"])
+        return build
+
+    @staticmethod
+    def _delete(db, build_id: str):
+        old = db.execute("SELECT id, idea, components, features, passed, total_tokens FROM builds "
+                         "WHERE build_id = ?", (build_id,)).fetchone()
+        if old is None:
+            return
+        # External-content FTS rows are removed by replaying their indexed values
+        db.execute("INSERT INTO builds_fts (builds_fts, rowid, idea, components, features) "
+                   "VALUES ('delete', ?, ?, ?, ?)",
+                   (old[0], old[1], ' '.join(json.loads(old[2])), ' '.join(json.loads(old[3]))))
+        db.execute("DELETE FROM build_code WHERE id = ?", (old[0],))
+        db.execute("DELETE FROM builds WHERE id = ?", (old[0],))
+        BuildHistory._count(db, -1, -old[4], -old[5])
+
+    @staticmethod
+    def _count(db, builds: int, passed: int, tokens: int):
+        db.execute("UPDATE build_totals SET builds = builds + ?, passed = passed + ?, "
+                   "total_tokens = total_tokens + ? WHERE id = 1", (builds, passed, tokens))
+
+    def _db(self) -> closing:
+        """
+        A connection for one call, closed when its `with` block ends (server
+        threads come and go, so none is kept per thread). WAL lets readers
+        run alongside the writer.
+        """
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute("PRAGMA synchronous=NORMAL")
+        return closing(db)
+
+
+def _page_size(limit) -> int:
+    try:
+        return max(1, min(int(limit), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
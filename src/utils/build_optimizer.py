@@ -0,0 +1,387 @@
+"""
+VibeBuilder V2 - Build Optimizer
+Minifies generated apps and produces precompressed artifacts
+"""
+
+import gzip
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always produced
+    brotli = None
+
+
+# Elements whose text content must survive byte-for-byte
+_PRESERVE_TAGS = ('pre', 'textarea')
+_JS_TYPES = ('', 'text/javascript', 'application/javascript', 'module')
+
+_BLOCK_RE = re.compile(
+    r'<(style|script|pre|textarea)\b([^>]*)>(.*?)</\1\s*>',
+    re.DOTALL | re.IGNORECASE
+)
+_COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+_TYPE_ATTR_RE = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]*)', re.IGNORECASE)
+# Spaces next to these JS punctuators are never significant
+_JS_TIGHT = set('{}()[];,=:<>?!&|*%^~')
+# ...except where dropping one would spell an HTML-like comment (<!-- or -->),
+# which browsers treat as the start of a comment inside scripts
+_JS_COMMENT_JOINS = {('<', '!'), ('!', '-'), ('-', '>')}
+# No space is needed after these in CSS
+_CSS_TIGHT_AFTER = '{};,>('
+# At-rules whose blocks hold rules rather than declarations
+_CSS_RULE_BLOCKS = ('@media', '@supports', '@container', '@layer', '@document', '@scope',
+                    '@starting-style', '@keyframes', '@-webkit-keyframes')
+_CSS_STATEMENT_END_RE = re.compile(r'[{};]')
+
+
+def minify_css(css: str) -> str:
+    """
+    Minify a stylesheet: drop comments, collapse whitespace and trim
+    spacing around punctuation. String literals are left untouched.
+    Spaces around ':' are only dropped in declarations; in selectors
+    (`div :hover`) they are significant.
+    """
+    out = []
+    i, n = 0, len(css)
+    pending_space = False
+    # Per open block: whether it holds declarations (not nested rules)
+    blocks: List[bool] = []
+    statement_start = 0
+    tight_colon = False
+
+    def space_needed() -> bool:
+        return pending_space and out and out[-1][-1:] not in _CSS_TIGHT_AFTER and not tight_colon
+
+    while i < n:
+        ch = css[i]
+        if ch == '/' and css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if ch in '"\'':
+            end = _string_end(css, i, ch)
+            if space_needed():
+                out.append(' ')
+            pending_space = tight_colon = False
+            out.append(css[i:end])
+            i = end
+            continue
+        if ch.isspace():
+            pending_space = True
+            i += 1
+            continue
+        if ch == ':' and blocks and blocks[-1] and _css_declaration_colon(css, i):
+            # property: value
+            pending_space = False
+            out.append(ch)
+            tight_colon = True
+            i += 1
+            continue
+        if ch in '{};,>)':
+            # No space is ever needed before these
+            pending_space = False
+            if ch == '}' and out and out[-1] == ';':
+                out.pop()
+            if ch == '{':
+                prelude = ''.join(out[statement_start:]).strip().lower()
+                blocks.append(not prelude.startswith(_CSS_RULE_BLOCKS))
+            elif ch == '}' and blocks:
+                blocks.pop()
+            out.append(ch)
+            if ch in '{};':
+                statement_start = len(out)
+        else:
+            if space_needed():
+                out.append(' ')
+            pending_space = False
+            out.append(ch)
+        tight_colon = False
+        i += 1
+
+    return ''.join(out).strip()
+
+
+def minify_js(js: str) -> str:
+    """
+    Conservative JavaScript minifier.
+
+    Removes comments and indentation and drops blank lines. Line breaks are
+    kept so automatic semicolon insertion behaves exactly as before; strings,
+    template literals and regex literals are copied verbatim.
+    """
+    out: List[str] = []
+    i, n = 0, len(js)
+    last_sig = ''        # last significant (non-space) character emitted
+    last_word = ''       # last identifier emitted, for regex detection
+    template_depth: List[int] = []  # brace depth per open template `${`
+    brace_depth = 0
+    pending_space = False
+
+    def emit(text: str):
+        nonlocal last_sig, pending_space
+        if pending_space and out and out[-1] != '\n':
+            if ((out[-1][-1] not in _JS_TIGHT and text[0] not in _JS_TIGHT)
+                    or (out[-1][-1], text[0]) in _JS_COMMENT_JOINS):
+                out.append(' ')
+        pending_space = False
+        out.append(text)
+        stripped = text.rstrip()
+        if stripped:
+            last_sig = stripped[-1]
+
+    while i < n:
+        ch = js[i]
+
+        # Template literal (or its continuation after `${ ... }`)
+        if ch == '`' or (ch == '}' and template_depth and template_depth[-1] == brace_depth):
+            if ch == '}':
+                template_depth.pop()
+            start = i
+            i += 1
+            while i < n:
+                c = js[i]
+                if c == '\\':
+                    i += 2
+                    continue
+                if c == '`':
+                    i += 1
+                    break
+                if c == '$' and js.startswith('${', i):
+                    i += 2
+                    template_depth.append(brace_depth)
+                    break
+                i += 1
+            emit(js[start:i])
+            last_word = ''
+            continue
+
+        if ch in '"\'':
+            end = _string_end(js, i, ch)
+            emit(js[i:end])
+            last_word = ''
+            i = end
+            continue
+
+        if ch == '/':
+            nxt = js[i + 1] if i + 1 < n else ''
+            if nxt == '/':
+                end = js.find('\n', i)
+                i = n if end == -1 else end
+                continue
+            if nxt == '*':
+                end = js.find('*/', i + 2)
+                comment = js[i:n if end == -1 else end + 2]
+                i += len(comment)
+                # A block comment still separates tokens (and lines)
+                if '\n' in comment and out and out[-1] != '\n':
+                    out.append('\n')
+                    pending_space = False
+                else:
+                    pending_space = True
+                continue
+            if _regex_allowed(last_sig, last_word):
+                end = _regex_end(js, i)
+                emit(js[i:end])
+                last_word = ''
+                i = end
+                continue
+
+        if ch == '\n' or ch == '\r':
+            # Collapse the run of blank lines/indentation into one newline
+            while i < n and js[i].isspace():
+                i += 1
+            if out and out[-1] != '\n':
+                out.append('\n')
+            pending_space = False
+            continue
+
+        if ch.isspace():
+            while i < n and js[i] in ' \t\f\v':
+                i += 1
+            pending_space = True
+            continue
+
+        if ch.isalnum() or ch in '_$':
+            start = i
+            while i < n and (js[i].isalnum() or js[i] in '_$'):
+                i += 1
+            last_word = js[start:i]
+            emit(last_word)
+            continue
+
+        if ch == '{':
+            brace_depth += 1
+        elif ch == '}':
+            brace_depth -= 1
+        last_word = ''
+        emit(ch)
+        i += 1
+
+    return ''.join(out).strip()
+
+
+def minify_html(html: str) -> str:
+    """
+    Minify an HTML document including its inline <style> and <script> blocks.
+
+    Whitespace runs are collapsed rather than removed so inline layout is
+    unchanged. <pre> and <textarea> content is preserved exactly.
+    """
+    if not html:
+        return ""
+
+    parts = []
+    last = 0
+    for match in _BLOCK_RE.finditer(html):
+        parts.append(_minify_markup(html[last:match.start()]))
+        tag, attrs, body = match.group(1), match.group(2), match.group(3)
+        tag_lower = tag.lower()
+        open_tag = f"<{tag}{_collapse(attrs)}>"
+
+        if tag_lower in _PRESERVE_TAGS:
+            parts.append(match.group(0))
+        elif tag_lower == 'style':
+            parts.append(f"{open_tag}{minify_css(body)}</{tag}>")
+        else:
+            type_match = _TYPE_ATTR_RE.search(attrs)
+            script_type = type_match.group(1).lower() if type_match else ''
+            if script_type in _JS_TYPES and body.strip():
+                parts.append(f"{open_tag}{minify_js(body)}</{tag}>")
+            else:
+                parts.append(f"{open_tag}{body.strip()}</{tag}>")
+        last = match.end()
+
+    parts.append(_minify_markup(html[last:]))
+    return ''.join(parts).strip()
+
+
+def compress_variants(data: bytes) -> Dict[str, bytes]:
+    """
+    Precompress a payload. Always returns 'gzip'; adds 'br' when the
+    brotli package is installed.
+    """
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+def negotiate_encoding(accept_encoding: str, available) -> Optional[str]:
+    """
+    Pick the best content-coding from `available` that the client accepts.
+    Brotli is preferred over gzip when both are acceptable.
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+
+    for encoding in ('br', 'gzip'):
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in available and q > 0:
+            return encoding
+    return None
+
+
+def optimize_build(code: str) -> Dict:
+    """
+    Post-process a finished build
+
+    Returns:
+        Dict with 'html' (minified), 'sha256', 'variants' (encoding -> bytes)
+        and JSON-safe 'stats'
+    """
+    minified = minify_html(code)
+    raw_bytes = code.encode('utf-8')
+    min_bytes = minified.encode('utf-8')
+    variants = compress_variants(min_bytes)
+
+    stats = {
+        "original_bytes": len(raw_bytes),
+        "minified_bytes": len(min_bytes),
+        "gzip_bytes": len(variants["gzip"]),
+        "brotli_bytes": len(variants["br"]) if "br" in variants else None,
+    }
+    smallest = min(len(v) for v in variants.values())
+    stats["savings_percent"] = round(100 * (1 - smallest / len(raw_bytes)), 1) if raw_bytes else 0.0
+
+    return {
+        "html": minified,
+        "sha256": hashlib.sha256(min_bytes).hexdigest(),
+        "variants": variants,
+        "stats": stats
+    }
+
+
+def _minify_markup(fragment: str) -> str:
+    fragment = _COMMENT_RE.sub('', fragment)
+    return _collapse(fragment)
+
+
+def _collapse(text: str) -> str:
+    # Keep a newline where one existed so line-sensitive content stays readable
+    return _WHITESPACE_RE.sub(lambda m: '\n' if '\n' in m.group(0) else ' ', text)
+
+
+def _css_declaration_colon(css: str, start: int) -> bool:
+    """Whether the ':' at `start` separates a property from its value rather than starting a nested selector"""
+    end = _CSS_STATEMENT_END_RE.search(css, start)
+    return end is None or end.group() != '{'
+
+
+def _string_end(text: str, start: int, quote: str) -> int:
+    i = start + 1
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == quote or c == '\n':
+            return i + 1
+        i += 1
+    return n
+
+
+def _regex_allowed(last_sig: str, last_word: str) -> bool:
+    if last_word in ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'yield', 'await', 'delete', 'throw', 'new'):
+        return True
+    if last_word:
+        return False
+    return last_sig == '' or last_sig in '(,=:[!&|?{};+-*%<>~^'
+
+
+def _regex_end(text: str, start: int) -> int:
+    i = start + 1
+    n = len(text)
+    in_class = False
+    while i < n:
+        c = text[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '\n':
+            return i
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < n and (text[i].isalnum() or text[i] == '_'):
+                i += 1
+            return i
+        i += 1
+    return n
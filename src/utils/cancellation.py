@@ -0,0 +1,81 @@
+"""
+VibeBuilder V2 - Cancellation
+Cancel tokens for builds whose client went away. The orchestrator checks
+its token between phases and installs it for the calls a phase makes, so
+the model client can abort a request that is already in flight.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class BuildCancelled(Exception):
+    """Raised inside a build once its token is cancelled"""
+
+
+class CancelToken:
+    def __init__(self):
+        self.reason = ""
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._next_id = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Idempotent; runs every registered abort callback once"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[Cancel] Abort callback failed: {e}")
+
+    def check(self):
+        if self._event.is_set():
+            raise BuildCancelled(self.reason)
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to `seconds`; True if cancelled meanwhile"""
+        return self._event.wait(seconds)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call `callback` when cancelled (right away if already cancelled).
+        Returns a function that unregisters it.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+                return lambda: self._callbacks.pop(callback_id, None)
+        callback()
+        return lambda: None
+
+
+_current = threading.local()
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]):
+    """Make `token` the current thread's token for the duration of the block"""
+    previous = getattr(_current, "token", None)
+    _current.token = token
+    try:
+        yield token
+    finally:
+        _current.token = previous
+
+
+def current_token() -> Optional[CancelToken]:
+    return getattr(_current, "token", None)
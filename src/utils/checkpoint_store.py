@@ -0,0 +1,122 @@
+"""
+VibeBuilder V2 - Build Checkpoints
+Persists each completed phase of a build so a retried build resumes at the
+first incomplete phase instead of starting over
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+_BUILD_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+# Checkpoints older than this are removed when the store opens
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+def new_build_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_valid_build_id(build_id: str) -> bool:
+    return bool(build_id) and bool(_BUILD_ID_RE.match(build_id))
+
+
+class CheckpointStore:
+    """One JSON file per build ID under `root`"""
+
+    def __init__(self, root: str, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.prune()
+
+    def load(self, build_id: str) -> Optional[Dict]:
+        if not is_valid_build_id(build_id):
+            return None
+        try:
+            with open(self._path(build_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, build_id: str, state: Dict):
+        if not is_valid_build_id(build_id):
+            return
+        state["updated_at"] = time.time()
+        # Write to a temp file and rename so a crash never leaves half a checkpoint
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp, self._path(build_id))
+
+    def delete(self, build_id: str):
+        if is_valid_build_id(build_id):
+            try:
+                os.remove(self._path(build_id))
+            except FileNotFoundError:
+                pass
+
+    def prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _path(self, build_id: str) -> str:
+        return os.path.join(self.root, f"{build_id}.json")
+
+
+class BuildCheckpoint:
+    """
+    Phase results for one build. Without a store it only lives in memory,
+    so callers do not need to special-case checkpointing being off.
+    """
+
+    def __init__(self, store: Optional[CheckpointStore], build_id: str, idea: str):
+        self.store = store
+        self.build_id = build_id
+        state = store.load(build_id) if store is not None else None
+        # A checkpoint for a different idea is never reused
+        if not state or state.get("idea") != idea:
+            state = {"idea": idea, "phases": {}}
+        self.state = state
+        self.resumed_phases = list(state["phases"])
+        self._used = set()
+
+    def get(self, phase: str) -> Optional[Dict]:
+        result = self.state["phases"].get(phase)
+        if result is not None:
+            self._used.add(phase)
+        return result
+
+    def invalidate_rest(self):
+        """
+        A phase is about to be re-run, so every checkpoint not yet replayed in
+        this run was derived from stale inputs and must not be reused.
+        """
+        phases = self.state["phases"]
+        for phase in [p for p in phases if p not in self._used]:
+            del phases[phase]
+
+    def save(self, phase: str, result: Dict):
+        self.state["phases"][phase] = result
+        self._used.add(phase)
+        if self.store is not None:
+            self.store.save(self.build_id, self.state)
+
+    def finish(self):
+        self.state["complete"] = True
+        if self.store is not None:
+            self.store.save(self.build_id, self.state)
@@ -0,0 +1,96 @@
+"""
+VibeBuilder V2 - Code Cleaner
+Strips markdown fences and leading prose from model output, incrementally
+"""
+
+import re
+
+_FENCE_OPEN_RE = re.compile(r'^```html?\s*\n?', re.MULTILINE)
+_FENCE_LINE_RE = re.compile(r'^```\s*$', re.MULTILINE)
+_FENCE_END_RE = re.compile(r'```$')
+_DOCTYPE_RE = re.compile(r'<!doctype', re.IGNORECASE | re.ASCII)
+_HTML_RE = re.compile(r'<html', re.IGNORECASE | re.ASCII)
+_DOCTYPE_LENGTH = len('<!doctype')
+
+# Characters a fence match can consume. Output is only released up to a
+# character outside this set, so no fence match ever straddles a cut.
+_FENCE_CHARS = frozenset('`html')
+
+
+def _strip_fences(text: str) -> str:
+    if '`' not in text:
+        return text
+    text = _FENCE_OPEN_RE.sub('', text)
+    return _FENCE_LINE_RE.sub('', text)
+
+
+class CodeCleaner:
+    """
+    Incremental cleaner for generated HTML.
+
+    feed() takes raw chunks and returns whatever cleaned output is final;
+    finish() returns the rest. The concatenated output equals clean_code()
+    on the whole text, and every character is cleaned once, however the
+    text is split. Nothing is released until a <!DOCTYPE is seen, because
+    everything before it is dropped (a document that only has <html is
+    released by finish()). Markers are searched case-insensitively instead
+    of in a lowercased copy.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._started = False
+        self._searched = 0
+
+    def feed(self, chunk: str) -> str:
+        if not chunk:
+            return ""
+        self._buffer += chunk
+        if not self._started:
+            # A match may straddle chunks, so back up by the marker length
+            match = _DOCTYPE_RE.search(self._buffer, max(0, self._searched - _DOCTYPE_LENGTH))
+            self._searched = len(self._buffer)
+            if match is None:
+                return ""
+            self._started = True
+            self._buffer = self._buffer[match.start():]
+        return self._release()
+
+    def finish(self) -> str:
+        text, self._buffer = self._buffer, ""
+        if not self._started:
+            return _clean_whole(text)
+        # The buffer starts at the doctype or a safe cut, so only the tail
+        # rules apply: the trailing fence and trailing whitespace
+        return _FENCE_END_RE.sub('', _strip_fences(text)).rstrip()
+
+    def _release(self) -> str:
+        buffer = self._buffer
+        cut = len(buffer) - 1
+        while cut > 0 and (buffer[cut] in _FENCE_CHARS or buffer[cut].isspace()):
+            cut -= 1
+        if cut <= 0:
+            return ""
+        # Clean through the cut character so fence rules see what follows
+        # it, then hold that character back as the start of the next round
+        self._buffer = buffer[cut:]
+        return _strip_fences(buffer[:cut + 1])[:-1]
+
+
+def clean_code(code: str) -> str:
+    """Clean a complete model response"""
+    if not code:
+        return ""
+    cleaner = CodeCleaner()
+    return cleaner.feed(code) + cleaner.finish()
+
+
+def _clean_whole(code: str) -> str:
+    """Whole-string cleaning, for text with no <!DOCTYPE before its fences are removed"""
+    if not code:
+        return ""
+    code = _FENCE_END_RE.sub('', _strip_fences(code)).strip()
+    match = _DOCTYPE_RE.search(code) or _HTML_RE.search(code)
+    if match and match.start() > 0:
+        code = code[match.start():]
+    return code
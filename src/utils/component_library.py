@@ -0,0 +1,280 @@
+"""
+VibeBuilder V2 - Component Library
+Reusable markup + CSS mined from builds that passed testing. The coder
+references components by ID and they are expanded locally afterwards, so
+common pieces (nav bars, headers, footers, forms, modals, theme toggles)
+are not re-generated token by token.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from utils.document_index import DocumentIndex, get_index, parse_attributes
+from utils.text_utils import tokenize
+
+MAX_COMPONENTS = 500
+MAX_COMPONENT_CHARS = 6000
+MIN_COMPONENT_CHARS = 80
+
+# Component kind -> words in an idea or plan component name that ask for it
+KIND_WORDS = {
+    # Not "menu": a restaurant menu is content, not navigation
+    "nav": {"nav", "navigation", "navbar", "menubar", "hamburger"},
+    "header": {"header", "hero", "banner"},
+    "footer": {"footer"},
+    "form": {"form", "contact", "signup", "login", "subscribe"},
+    "modal": {"modal", "dialog", "popup", "lightbox"},
+    "toggle": {"theme", "toggle", "dark"},
+}
+# Feature flag (utils.document_index.FEATURE_PATTERNS) -> words in an idea that call for it
+FEATURE_WORDS = {
+    "dark": {"dark", "night", "theme"},
+    "media_queries": {"responsive", "mobile"},
+    "keyframes": {"animated", "animation", "animations", "motion"},
+    "local_storage": {"save", "saved", "persist", "persistent", "offline", "storage", "remember"},
+    "event_listeners": {"interactive", "click", "drag", "keyboard"},
+    "submit": {"form", "contact", "signup", "login", "subscribe", "submit"},
+}
+_LANDMARK_KINDS = {"nav": "nav", "header": "header", "footer": "footer", "form": "form", "dialog": "modal"}
+
+PLACEHOLDER_RE = re.compile(r'<!--\s*component:([a-z]+-[0-9a-f]{8})\s*-->')
+_SELECTOR_NAME_RE = re.compile(r'[.#]([A-Za-z_][\w-]*)')
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_KEYFRAMES_RE = re.compile(r'@(?:-webkit-)?keyframes\s+([\w-]+)', re.IGNORECASE)
+_HEAD_CLOSE_RE = re.compile(r'</head\s*>', re.IGNORECASE)
+
+
+def _css_rules(css: str):
+    """Top-level (prelude, body, text) rules of a stylesheet"""
+    position, length = 0, len(css)
+    while position < length:
+        brace = css.find('{', position)
+        if brace < 0:
+            return
+        depth, end = 1, brace + 1
+        while end < length and depth:
+            if css[end] == '{':
+                depth += 1
+            elif css[end] == '}':
+                depth -= 1
+            end += 1
+        yield css[position:brace].strip(), css[brace + 1:end - 1], css[position:end].strip()
+        position = end
+
+
+def _matching_css(css: str, names: set) -> str:
+    """Rules whose selectors use one of the component's classes or ids"""
+    kept, keyframes = [], {}
+    for prelude, body, text in _css_rules(css):
+        if prelude.startswith('@'):
+            frames = _KEYFRAMES_RE.match(prelude)
+            if frames:
+                keyframes[frames.group(1)] = text
+            elif '{' in body:
+                inner = _matching_css(body, names)
+                if inner:
+                    kept.append(f"{prelude} {{\n{inner}\n}}")
+            continue
+        if names & set(_SELECTOR_NAME_RE.findall(prelude)):
+            kept.append(text)
+    result = '\n'.join(kept)
+    # Animations the kept rules rely on
+    used = [text for name, text in keyframes.items() if re.search(rf'\b{re.escape(name)}\b', result)]
+    return '\n'.join(kept + used)
+
+
+def expand_components(code: str, components: List[Dict]) -> str:
+    """
+    Replace <!-- component:ID --> placeholders with the component markup and
+    add each used component's CSS before </head>. Unknown IDs are left as-is.
+    """
+    if not components or 'component:' not in code:
+        return code
+    by_id = {c["id"]: c for c in components}
+    used = []
+
+    def replace(match):
+        component = by_id.get(match.group(1))
+        if component is None:
+            return match.group(0)
+        if component["id"] not in used:
+            used.append(component["id"])
+        return component["html"]
+
+    code = PLACEHOLDER_RE.sub(replace, code)
+    styles = ''.join(
+        f'<style data-component="{cid}">\n{by_id[cid]["css"]}\n</style>\n'
+        for cid in used if by_id[cid]["css"]
+    )
+    if styles:
+        head = _HEAD_CLOSE_RE.search(code)
+        code = code[:head.start()] + styles + code[head.start():] if head else styles + code
+    return code
+
+
+def describe_components(components: List[Dict]) -> str:
+    """Prompt section telling the coder which components it may reference"""
+    lines = [
+        f'- {c["id"]} ({c["kind"]}): {", ".join(c["names"][:3]) or c["kind"]}; '
+        f'classes {", ".join(c["classes"][:6]) or "none"}'
+        for c in components
+    ]
+    return (
+        "## Reusable Components:\n"
+        "Instead of writing these, insert the placeholder <!-- component:ID --> where the component "
+        "belongs; it is expanded with tested markup and CSS afterwards. Style the rest of the page to match "
+        "and wire any behaviour in your own script using the listed classes.\n" + '\n'.join(lines)
+    )
+
+
+class ComponentLibrary:
+    """Components indexed by kind, feature flags and plan component names"""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict] = {}
+        for component in self._load():
+            self._components[component["id"]] = component
+
+    def mine(self, code: str, names: List[str] = None) -> List[str]:
+        """Extract components from a passing build; returns the IDs stored"""
+        index = get_index(code)
+        css = _CSS_COMMENT_RE.sub('', '\n'.join(
+            index.block_text('style', n) for n in range(len(index.blocks['style']))
+        ))
+        plan_tokens = {name: set(tokenize(name)) for name in names or []}
+        stored = []
+        covered = {}
+        for number, tag in enumerate(index.tags):
+            if tag["closing"]:
+                continue
+            kind = self._kind(tag)
+            # Parts of a component already taken (e.g. a modal's inner box) are not separate ones
+            if kind is None or tag["start"] < covered.get(kind, 0):
+                continue
+            end = index.element_end(number)
+            if end is None or not MIN_COMPONENT_CHARS <= end - tag["start"] <= MAX_COMPONENT_CHARS:
+                continue
+            covered[kind] = end
+            html = code[tag["start"]:end]
+            classes = self._class_names(html)
+            component_css = _matching_css(css, set(classes)) if classes else ""
+            if len(component_css) > MAX_COMPONENT_CHARS:
+                continue
+            words = KIND_WORDS[kind] | set(tokenize(' '.join(classes)))
+            component = {
+                "id": f"{kind}-{hashlib.sha256((html + component_css).encode('utf-8')).hexdigest()[:8]}",
+                "kind": kind,
+                "html": html,
+                "css": component_css,
+                "classes": classes,
+                "names": [name for name, tokens in plan_tokens.items() if tokens & words],
+                "features": [f for f, on in DocumentIndex(html + component_css).features.items() if on],
+                "uses": 1,
+                "updated_at": time.time()
+            }
+            with self._lock:
+                existing = self._components.get(component["id"])
+                if existing:
+                    existing["uses"] += 1
+                    existing["updated_at"] = component["updated_at"]
+                    existing["names"] = sorted(set(existing["names"]) | set(component["names"]))
+                else:
+                    self._components[component["id"]] = component
+            stored.append(component["id"])
+        if stored:
+            self._save()
+        return stored
+
+    def select(self, idea: str, names: List[str] = None, limit: int = 3) -> List[Dict]:
+        """
+        Best component per kind the idea or plan asks for: the one sharing
+        the most of the idea's features, then plan names, then the most used
+        """
+        wanted = set(tokenize(' '.join([idea] + list(names or []))))
+        wanted_features = {feature for feature, words in FEATURE_WORDS.items() if wanted & words}
+        chosen = []
+        with self._lock:
+            components = list(self._components.values())
+        for kind, words in KIND_WORDS.items():
+            if not wanted & words:
+                continue
+            candidates = [c for c in components if c["kind"] == kind]
+            if not candidates:
+                continue
+            best = max(candidates, key=lambda c: (
+                len(wanted_features.intersection(c["features"])),
+                len(wanted & set(tokenize(' '.join(c["names"] + c["classes"])))),
+                c["uses"],
+                c["updated_at"]
+            ))
+            chosen.append(best)
+            if len(chosen) >= limit:
+                break
+        return chosen
+
+    def get(self, component_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._components.get(component_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            kinds = {}
+            for component in self._components.values():
+                kinds[component["kind"]] = kinds.get(component["kind"], 0) + 1
+            return {"components": len(self._components), "kinds": kinds}
+
+    @staticmethod
+    def _kind(tag: Dict) -> Optional[str]:
+        if tag["name"] in _LANDMARK_KINDS:
+            return _LANDMARK_KINDS[tag["name"]]
+        if tag["name"] not in ("div", "section", "button", "aside"):
+            return None
+        attributes = parse_attributes(tag["attrs"])
+        label = f'{attributes.get("class", "")} {attributes.get("id", "")}'.lower()
+        if 'modal' in label or 'dialog' in label:
+            return "modal"
+        if 'theme' in label and 'toggle' in label:
+            return "toggle"
+        return None
+
+    @staticmethod
+    def _class_names(html: str) -> List[str]:
+        names = []
+        for tag in DocumentIndex(html).tags:
+            attributes = parse_attributes(tag["attrs"])
+            for name in attributes.get("class", "").split() + [attributes.get("id", "")]:
+                if name and name not in names:
+                    names.append(name)
+        return names
+
+    def _load(self) -> List[Dict]:
+        if not self.path:
+            return []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            # Keep the most used, most recent components
+            components = sorted(self._components.values(), key=lambda c: (c["uses"], c["updated_at"]), reverse=True)
+            for component in components[MAX_COMPONENTS:]:
+                del self._components[component["id"]]
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(components[:MAX_COMPONENTS], f)
+            os.replace(tmp, self.path)
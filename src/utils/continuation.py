@@ -0,0 +1,98 @@
+"""
+VibeBuilder V2 - Continuation Stitching
+Recovers documents cut off at max_output_tokens by asking the model to
+resume from the cut point and joining the pieces, instead of regenerating
+"""
+
+import re
+from typing import Callable, Dict
+
+from utils.code_cleaner import clean_code
+
+MAX_CONTINUATIONS = 2
+# Longest repeated text looked for where two pieces meet, and the shortest
+# that counts as a repeat rather than a coincidence
+MAX_OVERLAP = 2000
+MIN_OVERLAP = 16
+
+CONTINUATION_MARKER = "## Output So Far (cut off):"
+
+_LEADING_FENCE_RE = re.compile(r'^\s*```(?:html?)?[ \t]*\n', re.IGNORECASE)
+_DOC_START_RE = re.compile(r'\s*(?:```(?:html?)?\s*)?(?:<!doctype html|<html\b)', re.IGNORECASE)
+_DOC_CLOSE_RE = re.compile(r'</html\s*>', re.IGNORECASE)
+
+
+def is_truncated(text: str, finish_reason: str = "") -> bool:
+    """
+    Output stopped at the token limit. Without a finish reason, a document
+    that was started but never closed counts as cut off too; prose after the
+    closing tag (which clean_code keeps) does not.
+    """
+    if finish_reason == "MAX_TOKENS":
+        return True
+    if finish_reason == "STOP":
+        return False
+    code = clean_code(text or "")
+    return bool(_DOC_START_RE.match(code)) and not _DOC_CLOSE_RE.search(code)
+
+
+def continuation_prompt(prompt: str, partial: str) -> str:
+    """The original request plus the output so far, asking for the rest only"""
+    return f"""{prompt}
+
+{CONTINUATION_MARKER}
+{partial}
+
+Your previous answer was cut off at the end of the output above.
+Continue EXACTLY from the last character. Do not repeat anything already written,
+do not restart the document, and add no commentary or code fences at the start."""
+
+
+def stitch(partial: str, continuation: str) -> str:
+    """
+    Join a cut-off output and its continuation. A restated opening fence is
+    dropped, and text the model repeated from before the cut is only kept once.
+    """
+    continuation = _LEADING_FENCE_RE.sub('', continuation, count=1)
+    # The model started over despite the instructions: the new text stands alone
+    if _DOC_START_RE.match(continuation) and _DOC_START_RE.match(partial):
+        return continuation
+    longest = min(len(partial), len(continuation), MAX_OVERLAP)
+    for size in range(longest, MIN_OVERLAP - 1, -1):
+        if partial.endswith(continuation[:size]):
+            return partial + continuation[size:]
+    return partial + continuation
+
+
+def generate_document(model, prompt: str, generation_config: Dict = None,
+                      max_continuations: int = MAX_CONTINUATIONS,
+                      on_text: Callable[[str], None] = None) -> Dict:
+    """
+    generate_content, continued while the output is truncated. With
+    `on_text`, the first response is streamed to it as it arrives;
+    continuations are not, since stitching may rewrite where they join.
+
+    Returns:
+        Dict with 'text' (stitched raw output), 'responses' (every call, for
+        usage accounting), 'continuations' and 'truncated' (still incomplete
+        after the last continuation)
+    """
+    stream = {"on_text": on_text} if on_text is not None else {}
+    response = model.generate_content(prompt, generation_config=generation_config, **stream)
+    responses = [response]
+    text = response.text or ""
+    truncated = bool(text) and is_truncated(text, response.finish_reason)
+    while truncated and len(responses) <= max_continuations:
+        print(f"[Continuation] Output cut off at {len(text)} chars ({response.finish_reason or 'unclosed'}); continuing...")
+        response = model.generate_content(continuation_prompt(prompt, text), generation_config=generation_config)
+        responses.append(response)
+        if not response.text:
+            break
+        text = stitch(text, response.text)
+        truncated = is_truncated(text, response.finish_reason)
+    return {
+        "text": text,
+        "responses": responses,
+        "continuations": len(responses) - 1,
+        "truncated": truncated
+    }
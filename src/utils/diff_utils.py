@@ -6,6 +6,8 @@ For showing visual differences between code versions
 import difflib
 from typing import List, Dict
 
+from utils.document_index import get_index
+
 
 def generate_diff(old_code: str, new_code: str) -> Dict:
     """
@@ -14,8 +16,8 @@ def generate_diff(old_code: str, new_code: str) -> Dict:
     Returns:
         Dict with 'html_diff', 'added_lines', 'removed_lines', 'summary'
     """
-    old_lines = old_code.splitlines(keepends=True)
-    new_lines = new_code.splitlines(keepends=True)
+    old_lines = get_index(old_code).lines(keepends=True)
+    new_lines = get_index(new_code).lines(keepends=True)
     
     # Create unified diff
     diff = list(difflib.unified_diff(
@@ -68,8 +70,8 @@ def generate_side_by_side_diff(old_code: str, new_code: str) -> List[Dict]:
     
     Returns list of dicts with 'left', 'right', 'type'
     """
-    old_lines = old_code.splitlines()
-    new_lines = new_code.splitlines()
+    old_lines = get_index(old_code).lines()
+    new_lines = get_index(new_code).lines()
     
     matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
     result = []
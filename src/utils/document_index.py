@@ -0,0 +1,224 @@
+"""
+VibeBuilder V2 - Document Index
+Parses a generated HTML document once and caches the result by content hash
+"""
+
+import bisect
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+_TAG_RE = re.compile(r'<(/?)([a-zA-Z][\w:-]*)([^>]*)>|<!--(.*?)-->|<![^>]*>', re.DOTALL)
+_ATTR_RE = re.compile(r'([a-zA-Z_:][\w:.-]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+_RAW_TEXT_TAGS = ('script', 'style')
+_RAW_TEXT_CLOSE_RE = {tag: re.compile(rf'</{tag}\s*>', re.IGNORECASE) for tag in _RAW_TEXT_TAGS}
+_EXTERNAL_URL_RE = re.compile(r'^(?:https?:)?//', re.IGNORECASE)
+
+LANDMARK_TAGS = {'header', 'nav', 'main', 'section', 'article', 'aside', 'footer', 'form'}
+
+# Feature flag -> pattern, matched case-insensitively anywhere in the document
+FEATURE_PATTERNS = {
+    "dark": re.compile(r'dark', re.IGNORECASE),
+    "media_queries": re.compile(r'@media', re.IGNORECASE),
+    "keyframes": re.compile(r'keyframes', re.IGNORECASE),
+    "local_storage": re.compile(r'localstorage', re.IGNORECASE),
+    "css_variables": re.compile(r'--'),
+    "event_listeners": re.compile(r'addeventlistener', re.IGNORECASE),
+    "submit": re.compile(r'submit', re.IGNORECASE),
+}
+
+CACHE_SIZE = 64
+
+
+def parse_attributes(text: str) -> Dict[str, str]:
+    """Attributes of a tag from the text between its name and '>'"""
+    if not text or '=' not in text:
+        return {}
+    return {
+        m.group(1).lower(): next(v for v in m.group(2, 3, 4) if v is not None)
+        for m in _ATTR_RE.finditer(text)
+    }
+
+
+class DocumentIndex:
+    """
+    Offsets into one document: lines, tags, <style>/<script> blocks,
+    landmark sections, external dependencies and feature flags.
+
+    Spans are (start, end) offsets into `code`. Use get_index() rather than
+    constructing this directly so each version is only parsed once.
+    """
+
+    def __init__(self, code: str, sha256: str = None):
+        self.code = code
+        self.sha256 = sha256 or hashlib.sha256(code.encode('utf-8')).hexdigest()
+        self.tags: List[Dict] = []
+        self.blocks: Dict[str, List[Dict]] = {tag: [] for tag in _RAW_TEXT_TAGS}
+        self.landmarks: List[Dict] = []
+        self.dependencies: List[Dict] = []
+        self.doctype: Optional[tuple] = None
+        self.first_comment = ""
+        self._lines = None
+        self._bare_lines = None
+        self._line_offsets = None
+        self._features = None
+        self._parse()
+
+    def _parse(self):
+        code = self.code
+        comment_seen = False
+        pos = 0
+        while True:
+            match = _TAG_RE.search(code, pos)
+            if match is None:
+                break
+            pos = match.end()
+            closing, name, attrs, comment = match.groups()
+            if name is None:
+                if comment is not None:
+                    if not comment_seen:
+                        self.first_comment = comment.strip()
+                        comment_seen = True
+                elif self.doctype is None and code[match.start() + 2:match.start() + 9].lower() == 'doctype':
+                    self.doctype = match.span()
+                continue
+
+            name = name.lower()
+            tag = {"name": name, "start": match.start(), "end": match.end(), "closing": bool(closing), "attrs": attrs}
+            self.tags.append(tag)
+            if closing:
+                continue
+
+            attributes = parse_attributes(attrs)
+            if name in _RAW_TEXT_TAGS:
+                # Raw text: skip to the matching close tag without parsing the body
+                close = _RAW_TEXT_CLOSE_RE[name].search(code, pos)
+                block = {
+                    "start": match.start(),
+                    "content_start": pos,
+                    "content_end": close.start() if close else len(code),
+                    "end": close.end() if close else len(code),
+                    "closed": close is not None,
+                    "attributes": attributes
+                }
+                self.blocks[name].append(block)
+                if close:
+                    self.tags.append({"name": name, "start": close.start(), "end": close.end(), "closing": True, "attrs": ""})
+                pos = block["end"]
+
+            url = attributes.get('src') if name in ('script', 'img', 'iframe') else \
+                attributes.get('href') if name == 'link' else None
+            if url and _EXTERNAL_URL_RE.match(url):
+                self.dependencies.append({"tag": name, "url": url})
+            if name in LANDMARK_TAGS:
+                self.landmarks.append({
+                    "tag": name,
+                    "id": attributes.get('id', ''),
+                    "start": match.start(),
+                    "line": self.line_at(match.start()) + 1
+                })
+
+    # Lines
+
+    def lines(self, keepends: bool = False) -> List[str]:
+        """Same as str.splitlines(keepends), computed once"""
+        if keepends:
+            if self._lines is None:
+                self._lines = self.code.splitlines(True)
+            return self._lines
+        if self._bare_lines is None:
+            self._bare_lines = self.code.splitlines()
+        return self._bare_lines
+
+    @property
+    def line_offsets(self) -> List[int]:
+        """Start offset of each line"""
+        if self._line_offsets is None:
+            offsets, position = [], 0
+            for line in self.lines(keepends=True):
+                offsets.append(position)
+                position += len(line)
+            self._line_offsets = offsets
+        return self._line_offsets
+
+    def line_at(self, offset: int) -> int:
+        """0-based line number containing `offset`"""
+        return max(0, bisect.bisect_right(self.line_offsets, offset) - 1)
+
+    def snapshot(self, limit: int) -> str:
+        """The document cut to at most `limit` chars, at a line boundary when possible"""
+        if len(self.code) <= limit:
+            return self.code
+        offsets = self.line_offsets
+        cut = offsets[max(0, bisect.bisect_right(offsets, limit) - 1)]
+        return self.code[:cut or limit]
+
+    # Blocks and tags
+
+    def block_text(self, tag: str, number: int = 0) -> str:
+        """Body of the `number`-th <style> or <script> block ('' if absent)"""
+        blocks = self.blocks[tag]
+        if number >= len(blocks):
+            return ""
+        block = blocks[number]
+        return self.code[block["content_start"]:block["content_end"]]
+
+    def has_tag(self, name: str) -> bool:
+        return any(tag["name"] == name and not tag["closing"] for tag in self.tags)
+
+    def count_tags(self, name: str, closing: bool = False) -> int:
+        return sum(1 for tag in self.tags if tag["name"] == name and tag["closing"] == closing)
+
+    def element_end(self, number: int) -> Optional[int]:
+        """End offset of the element opened by tags[number] (None if never closed)"""
+        opening = self.tags[number]
+        depth = 0
+        for tag in self.tags[number:]:
+            if tag["name"] != opening["name"]:
+                continue
+            depth += -1 if tag["closing"] else 1
+            if depth == 0:
+                return tag["end"]
+        return None
+
+    def without(self, spans: List[tuple]) -> str:
+        """The document with the given (start, end) spans removed"""
+        parts, position = [], 0
+        for start, end in sorted(spans):
+            if end <= position:
+                continue
+            parts.append(self.code[position:max(start, position)])
+            position = end
+        parts.append(self.code[position:])
+        return ''.join(parts)
+
+    # Features
+
+    @property
+    def features(self) -> Dict[str, bool]:
+        if self._features is None:
+            self._features = {name: bool(p.search(self.code)) for name, p in FEATURE_PATTERNS.items()}
+        return self._features
+
+
+_cache: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_index(code: str) -> DocumentIndex:
+    """Index for `code`, shared by every caller looking at the same content"""
+    code = code or ""
+    digest = hashlib.sha256(code.encode('utf-8')).hexdigest()
+    with _cache_lock:
+        index = _cache.get(digest)
+        if index is not None:
+            _cache.move_to_end(digest)
+            return index
+    index = DocumentIndex(code, digest)
+    with _cache_lock:
+        _cache[digest] = index
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
@@ -6,11 +6,19 @@ For downloading and deploying generated code
 import base64
 import urllib.parse
 
+from utils.document_index import get_index
 
-def generate_download_link(code: str, filename: str = "vibebuilder_app.html") -> str:
+
+def generate_download_link(code: str, filename: str = "vibebuilder_app.html", store=None) -> str:
     """
     Generate a download link for the code
+
+    With an ArtifactStore the code is stored once and the link references its
+    hash; otherwise the whole document is embedded as a base64 data URL.
     """
+    if store is not None:
+        digest = store.put(code)
+        return f"/preview/{digest}?download={urllib.parse.quote(filename)}"
     b64 = base64.b64encode(code.encode()).decode()
     return f"data:text/html;base64,{b64}"
 
@@ -21,30 +29,26 @@ def generate_codepen_form(code: str) -> dict:
     
     Returns dict with html, css, js separated
     """
-    # Parse the HTML to extract CSS and JS
-    html_content = code
-    css_content = ""
-    js_content = ""
-    
-    # Extract style content
-    import re
-    
-    style_match = re.search(r'<style[^>]*>(.*?)</style>', code, re.DOTALL | re.IGNORECASE)
-    if style_match:
-        css_content = style_match.group(1).strip()
-    
-    script_match = re.search(r'<script[^>]*>(.*?)</script>', code, re.DOTALL | re.IGNORECASE)
-    if script_match:
-        js_content = script_match.group(1).strip()
+    # Separate CSS and JS using the shared document index
+    index = get_index(code)
+    css_content = index.block_text('style').strip()
+    js_content = index.block_text('script').strip()
     
-    # Remove style and script from HTML for CodePen
-    html_only = re.sub(r'<style[^>]*>.*?</style>', '', code, flags=re.DOTALL | re.IGNORECASE)
-    html_only = re.sub(r'<script[^>]*>.*?</script>', '', html_only, flags=re.DOTALL | re.IGNORECASE)
-    html_only = re.sub(r'<!DOCTYPE[^>]*>', '', html_only, flags=re.IGNORECASE)
-    html_only = re.sub(r'<html[^>]*>|</html>', '', html_only, flags=re.IGNORECASE)
-    html_only = re.sub(r'<head[^>]*>.*?</head>', '', html_only, flags=re.DOTALL | re.IGNORECASE)
-    html_only = re.sub(r'<body[^>]*>|</body>', '', html_only, flags=re.IGNORECASE)
-    html_only = html_only.strip()
+    # Remove style, script, head and document wrappers from HTML for CodePen
+    spans = [(b["start"], b["end"]) for tag in ('style', 'script') for b in index.blocks[tag]]
+    if index.doctype:
+        spans.append(index.doctype)
+    head_start = None
+    for tag in index.tags:
+        if tag["name"] in ('html', 'body'):
+            spans.append((tag["start"], tag["end"]))
+        elif tag["name"] == 'head':
+            if not tag["closing"] and head_start is None:
+                head_start = tag["start"]
+            elif tag["closing"] and head_start is not None:
+                spans.append((head_start, tag["end"]))
+                head_start = None
+    html_only = index.without(spans).strip()
     
     return {
         "html": html_only,
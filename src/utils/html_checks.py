@@ -0,0 +1,43 @@
+"""
+VibeBuilder V2 - Local HTML Checks
+Fast, model-free sanity checks for generated documents
+"""
+
+import re
+from typing import Dict
+
+from utils.document_index import get_index
+
+_DOC_START_RE = re.compile(r'<!doctype html|<html\b', re.IGNORECASE)
+_DOC_END_RE = re.compile(r'</html\s*>\s*$', re.IGNORECASE)
+
+MIN_DOCUMENT_CHARS = 500
+
+
+def quick_check(code: str) -> Dict:
+    """
+    Structural checks that catch the usual failures (truncation, empty or
+    fallback output) in microseconds. Not a substitute for the TesterAgent.
+
+    Returns:
+        Dict with 'passed' and 'issues' (list of strings)
+    """
+    issues = []
+    if not code or len(code) < MIN_DOCUMENT_CHARS:
+        issues.append("Document is missing or too short")
+        return {"passed": False, "issues": issues}
+
+    if not _DOC_START_RE.match(code.lstrip()):
+        issues.append("Document does not start with <!DOCTYPE html> or <html>")
+    if not _DOC_END_RE.search(code):
+        issues.append("Document does not end with </html> (possibly truncated)")
+    index = get_index(code)
+    if not index.has_tag('body'):
+        issues.append("No <body> element")
+    for tag in ('script', 'style'):
+        if any(not block["closed"] for block in index.blocks[tag]):
+            issues.append(f"Unclosed <{tag}> block")
+    if "Generation failed." in code:
+        issues.append("Fallback document")
+
+    return {"passed": not issues, "issues": issues}
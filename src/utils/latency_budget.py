@@ -0,0 +1,143 @@
+"""
+VibeBuilder V2 - Latency Budgets
+Build modes and deadlines: each optional phase runs only if its expected
+latency (from recent builds in the history) still fits before the deadline
+after reserving time for the phases every build needs
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Per-mode policy. `deadline` is in seconds (None: no deadline);
+# `max_iterations` caps test/fix rounds; `grounded_research` allows the
+# search-grounded researcher call (otherwise only the local corpus is used).
+BUILD_MODES = {
+    "fast": {"deadline": 20.0, "max_iterations": 1, "grounded_research": False},
+    "balanced": {"deadline": 60.0, "max_iterations": 2, "grounded_research": True},
+    "quality": {"deadline": None, "max_iterations": None, "grounded_research": True},
+}
+
+# Used until the history has enough builds to estimate a phase
+DEFAULT_PHASE_SECONDS = {
+    "chat": 1.5,
+    # Grounded search; answers from the local corpus are sampled apart
+    "research": 6.0,
+    "research_local": 0.2,
+    "plan": 4.0,
+    "code": 15.0,
+    "test": 5.0,
+    "fix": 12.0,
+}
+# Phases are budgeted at this percentile of their recent latencies
+ESTIMATE_PERCENTILE = 0.75
+MIN_SAMPLES = 5
+HISTORY_SAMPLE = 200
+REFRESH_SECONDS = 60.0
+
+
+class PhaseLatencies:
+    """
+    Expected seconds per phase, from the most recent builds in an optional
+    utils.build_history.BuildHistory (refreshed at most once a minute).
+    Samples exclude the orchestrator's pacing delay. Test and fix times are
+    recorded per build, across iterations, so their estimates err on the
+    long side.
+    """
+
+    def __init__(self, history=None):
+        self.history = history
+        self._estimates = dict(DEFAULT_PHASE_SECONDS)
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def estimate(self, phase: str) -> float:
+        self._refresh()
+        return self._estimates.get(phase, 0.0)
+
+    def estimates(self) -> Dict[str, float]:
+        self._refresh()
+        return dict(self._estimates)
+
+    def _refresh(self):
+        if self.history is None or time.time() - self._loaded_at < REFRESH_SECONDS:
+            return
+        with self._lock:
+            if time.time() - self._loaded_at < REFRESH_SECONDS:
+                return
+            self._loaded_at = time.time()
+            try:
+                samples = self.history.phase_samples(HISTORY_SAMPLE)
+            except Exception as e:
+                print(f"[Budget] Could not read phase latencies: {e}")
+                return
+            estimates = dict(DEFAULT_PHASE_SECONDS)
+            for phase in estimates:
+                values = sorted(s[phase] for s in samples if s.get(phase))
+                if len(values) >= MIN_SAMPLES:
+                    estimates[phase] = round(values[int(ESTIMATE_PERCENTILE * (len(values) - 1))], 3)
+            self._estimates = estimates
+
+
+class LatencyBudget:
+    """
+    Time left for one build and the phases it gave up. Without a deadline
+    every phase fits; the mode's fixed cuts still apply.
+    """
+
+    def __init__(self, mode: str, deadline: Optional[float], latencies: PhaseLatencies):
+        self.mode = mode
+        self.deadline = deadline
+        self.latencies = latencies
+        self.policy = BUILD_MODES[mode]
+        self.started = time.time()
+        self.cuts: List[Dict] = []
+
+    def elapsed(self) -> float:
+        return time.time() - self.started
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return float('inf')
+        return self.deadline - self.elapsed()
+
+    def fits(self, phase: str, reserve: tuple = ()) -> bool:
+        """Whether `phase` and then the `reserve` phases can still finish in time"""
+        needed = sum(self.latencies.estimate(p) for p in (phase,) + tuple(reserve))
+        return needed <= self.remaining()
+
+    def cut(self, phase: str, reason: str):
+        print(f"[Budget] Cutting {phase} ({reason}, {self.remaining():.1f}s left)")
+        self.cuts.append({"phase": phase, "reason": reason, "at": round(self.elapsed(), 3)})
+
+    def report(self) -> Dict:
+        elapsed = self.elapsed()
+        return {
+            "mode": self.mode,
+            "deadline": self.deadline,
+            "elapsed": round(elapsed, 3),
+            "met": self.deadline is None or elapsed <= self.deadline,
+            "cut": self.cuts
+        }
+
+
+def resolve_mode(mode: str = None, deadline: float = None) -> Optional[tuple]:
+    """
+    (mode, deadline) for a build, or None for the unbudgeted default shape.
+    An explicit deadline overrides the mode's; a deadline alone means "balanced".
+
+    Raises:
+        ValueError: unknown mode or a non-positive deadline
+    """
+    if mode is None and deadline is None:
+        return None
+    mode = mode or "balanced"
+    if mode not in BUILD_MODES:
+        raise ValueError(f"Unknown build mode: {mode} (expected one of {', '.join(BUILD_MODES)})")
+    if deadline is not None:
+        deadline = float(deadline)
+        if deadline <= 0:
+            raise ValueError("Deadline must be positive")
+    else:
+        deadline = BUILD_MODES[mode]["deadline"]
+    return mode, deadline
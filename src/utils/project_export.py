@@ -0,0 +1,181 @@
+"""
+VibeBuilder V2 - Project Export
+Splits a generated app into index.html plus content-hashed CSS/JS files
+and a manifest, streamed out as a ZIP or tar.gz archive
+"""
+
+import hashlib
+import html
+import io
+import json
+import re
+import tarfile
+import time
+import zipfile
+from typing import Dict, Iterator, List
+
+from utils.document_index import get_index
+from utils.static_assets import IMMUTABLE_CACHE, REVALIDATE_CACHE
+
+ASSET_DIR = "assets"
+ARCHIVE_FORMATS = {
+    "zip": "application/zip",
+    "tar.gz": "application/gzip",
+}
+CHUNK_SIZE = 64 * 1024
+
+# Script types the browser executes; anything else (JSON data, templates) stays inline
+_JS_TYPES = ('', 'text/javascript', 'application/javascript', 'module')
+_CONTENT_TYPES = {".html": "text/html", ".css": "text/css", ".js": "application/javascript",
+                  ".json": "application/json"}
+
+# Relative url(...) references in CSS, which move one directory down with the stylesheet
+_RELATIVE_URL_RE = re.compile(r'url\(\s*([\'"]?)(?![a-z][a-z0-9+.-]*:|/|#)', re.IGNORECASE)
+
+# Relative ES module specifiers resolve against the script's own URL, so
+# modules using them stay inline
+_RELATIVE_IMPORT_RE = re.compile(r'(?:\bfrom|\bimport)\s*\(?\s*[\'"]\.{1,2}/')
+
+
+def _hashed_name(base: str, ext: str, data: bytes) -> str:
+    # Same fingerprint scheme as the static asset cache: name.<12 hex><ext>
+    return f"{ASSET_DIR}/{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def split_project(code: str) -> List[Dict]:
+    """
+    Files of the exported project, in archive order: hashed assets, then
+    index.html, manifest.json and a `_headers` file (the Netlify /
+    Cloudflare Pages format) giving assets a long-lived cache.
+
+    Each inline <style> becomes a <link> to a CSS file and each inline
+    executable <script> a <script src>, at the same position, so load and
+    execution order are unchanged.
+    """
+    index = get_index(code)
+    assets, replacements, names = [], [], {}
+
+    def extract(block: Dict, kind: str, ext: str) -> str:
+        text = code[block["content_start"]:block["content_end"]].strip()
+        if ext == ".css":
+            text = _RELATIVE_URL_RE.sub(lambda m: f"url({m.group(1)}../", text)
+        data = text.encode('utf-8')
+        if data not in names:
+            count = sum(1 for a in assets if a["path"].endswith(ext)) + 1
+            base = kind if count == 1 else f"{kind}-{count}"
+            names[data] = _hashed_name(base, ext, data)
+            assets.append({"path": names[data], "data": data, "cache_control": IMMUTABLE_CACHE})
+        return names[data]
+
+    for block in index.blocks['style']:
+        if not block["closed"] or not code[block["content_start"]:block["content_end"]].strip():
+            continue
+        path = extract(block, "style", ".css")
+        media = block["attributes"].get('media')
+        media_attr = f' media="{html.escape(media)}"' if media else ''
+        replacements.append((block["start"], block["end"], f'<link rel="stylesheet" href="{path}"{media_attr}>'))
+
+    for block in index.blocks['script']:
+        attributes = block["attributes"]
+        script_type = attributes.get('type', '').lower()
+        text = code[block["content_start"]:block["content_end"]]
+        if (not block["closed"] or 'src' in attributes or script_type not in _JS_TYPES or not text.strip()
+                or (script_type == 'module' and _RELATIVE_IMPORT_RE.search(text))):
+            continue
+        path = extract(block, "app", ".js")
+        type_attr = ' type="module"' if script_type == 'module' else ''
+        replacements.append((block["start"], block["end"], f'<script{type_attr} src="{path}"></script>'))
+
+    parts, position = [], 0
+    for start, end, text in sorted(replacements):
+        parts.append(code[position:start])
+        parts.append(text)
+        position = end
+    parts.append(code[position:])
+    document = ''.join(parts).encode('utf-8')
+
+    files = assets + [{"path": "index.html", "data": document, "cache_control": REVALIDATE_CACHE}]
+    manifest = {
+        "entry": "index.html",
+        "generated_at": int(time.time()),
+        "files": [
+            {
+                "path": f["path"],
+                "sha256": hashlib.sha256(f["data"]).hexdigest(),
+                "bytes": len(f["data"]),
+                "content_type": _CONTENT_TYPES.get(f["path"][f["path"].rfind('.'):], "application/octet-stream"),
+                "cache_control": f["cache_control"]
+            }
+            for f in files
+        ]
+    }
+    headers = (f"/{ASSET_DIR}/*\n  Cache-Control: {IMMUTABLE_CACHE}\n"
+               f"/index.html\n  Cache-Control: {REVALIDATE_CACHE}\n")
+    files.append({"path": "manifest.json", "data": json.dumps(manifest, indent=2).encode('utf-8'),
+                  "cache_control": REVALIDATE_CACHE})
+    files.append({"path": "_headers", "data": headers.encode('utf-8'), "cache_control": REVALIDATE_CACHE})
+    return files
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that hands written bytes to the caller in batches"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def stream_archive(files: List[Dict], archive_format: str = "zip", root: str = "") -> Iterator[bytes]:
+    """
+    Archive bytes, yielded as each file is written; only one file's
+    compressed output is ever held, never the whole archive
+    """
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format: {archive_format}")
+    prefix = f"{root.strip('/')}/" if root.strip('/') else ""
+    sink = _ChunkSink()
+    if archive_format == "zip":
+        # An unseekable sink makes zipfile write sizes in data descriptors after each file
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+            for f in files:
+                info = zipfile.ZipInfo(prefix + f["path"], time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with archive.open(info, 'w') as entry:
+                    for offset in range(0, len(f["data"]), CHUNK_SIZE):
+                        entry.write(f["data"][offset:offset + CHUNK_SIZE])
+                        chunk = sink.drain()
+                        if chunk:
+                            yield chunk
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+    else:
+        with tarfile.open(fileobj=sink, mode='w|gz') as archive:
+            for f in files:
+                info = tarfile.TarInfo(prefix + f["path"])
+                info.size = len(f["data"])
+                info.mtime = int(time.time())
+                info.mode = 0o644
+                archive.addfile(info, io.BytesIO(f["data"]))
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
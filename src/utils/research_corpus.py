@@ -0,0 +1,338 @@
+"""
+VibeBuilder V2 - Research Corpus
+Local BM25 retrieval over curated best-practice notes and past research,
+so common app types do not need a grounded search call
+"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List
+
+from utils.text_utils import normalize_idea, tokenize
+
+# Okapi BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Learned entries kept in the index and on disk; the oldest are evicted beyond this
+MAX_LEARNED = 2000
+
+# Written in the researcher's own output format so its section extraction
+# works the same on local and grounded answers
+CURATED_NOTES = [
+    {
+        "title": "Todo list task manager",
+        "tags": "todo task checklist to-do reminders productivity",
+        "text": """**Thinking Process**: Task apps live or die on input speed and trust that nothing is lost.
+**Key Findings**:
+- Single always-focused input; Enter adds, Escape clears, inline double-click to edit.
+- Persist every change to localStorage immediately; never require a save button.
+- Filters (All / Active / Done) and a remaining-count badge; clear-completed action.
+- Strike-through plus reduced opacity for done items; undo toast after delete.
+- Large touch targets (44px), visible focus rings, aria-live region for list changes."""
+    },
+    {
+        "title": "Analytics dashboard admin panel",
+        "tags": "dashboard analytics admin metrics charts kpi stats panel",
+        "text": """**Thinking Process**: Dashboards are scanned, not read; hierarchy and density matter most.
+**Key Findings**:
+- KPI cards first (value, delta vs previous period, sparkline), charts below.
+- CSS grid with auto-fit/minmax so cards reflow from 4 columns down to 1.
+- Canvas or SVG charts with accessible data tables or aria-labels as fallback.
+- Collapsible sidebar navigation; sticky header with date-range selector.
+- Skeleton loaders instead of spinners; tabular numerals for figures."""
+    },
+    {
+        "title": "Landing page for a product or startup",
+        "tags": "landing startup product saas marketing hero homepage launch",
+        "text": """**Thinking Process**: A landing page has one job: move the visitor to a single call to action.
+**Key Findings**:
+- Hero with a one-line value proposition, supporting sentence and one primary CTA.
+- Social proof (logos, testimonials) directly under the hero.
+- Feature grid of 3-6 benefit-led cards with icons; pricing table with a highlighted tier.
+- Sticky header CTA on scroll; smooth-scroll anchors; FAQ accordion.
+- Respect prefers-reduced-motion for entrance animations; fast LCP with no blocking assets."""
+    },
+    {
+        "title": "Calculator",
+        "tags": "calculator calc arithmetic math scientific",
+        "text": """**Thinking Process**: Calculators need predictable input handling more than visual flair.
+**Key Findings**:
+- Grid keypad with clear operator colouring; display shows expression and result.
+- Full keyboard support (digits, operators, Enter, Backspace, Escape).
+- Evaluate with a small parser, never eval(); guard division by zero and float rounding.
+- Calculation history panel persisted in localStorage.
+- Large display font with overflow handling for long numbers."""
+    },
+    {
+        "title": "Weather forecast app",
+        "tags": "weather forecast temperature climate city",
+        "text": """**Thinking Process**: Weather apps answer "what is it like now and later" at a glance.
+**Key Findings**:
+- Current conditions card (temperature, icon, feels-like, wind, humidity) above an hourly strip and 5-7 day list.
+- City search with recent searches in localStorage; optional geolocation.
+- Without an API key, ship realistic mock data behind the same fetch interface.
+- Background or accent colour that follows conditions or time of day.
+- °C/°F toggle and clear loading and error states."""
+    },
+    {
+        "title": "Personal portfolio website",
+        "tags": "portfolio resume cv personal developer designer showcase",
+        "text": """**Thinking Process**: Portfolios sell a person; the work samples must carry the page.
+**Key Findings**:
+- Short intro hero with name, role and primary contact link.
+- Project grid with thumbnail, title, tech tags and hover reveal; filter by category.
+- About, skills and experience timeline sections; downloadable resume link.
+- Contact form with client-side validation and success state.
+- Dark/light theme toggle using CSS custom properties, remembered in localStorage."""
+    },
+    {
+        "title": "E-commerce online store",
+        "tags": "ecommerce shop store cart checkout product catalog",
+        "text": """**Thinking Process**: Store UIs are conversion funnels: browse, compare, add to cart, check out.
+**Key Findings**:
+- Product grid with image, price, rating and quick add-to-cart.
+- Search, category filters and sort controls above the grid.
+- Slide-over cart drawer with quantity steppers and running subtotal; cart persisted in localStorage.
+- Product detail modal with image gallery and variant selection.
+- Multi-step checkout form with inline validation and order summary."""
+    },
+    {
+        "title": "Blog or content site",
+        "tags": "blog article posts magazine news content writing",
+        "text": """**Thinking Process**: Reading comfort and discoverability drive content sites.
+**Key Findings**:
+- Readable measure (60-75 characters), generous line height, system or variable fonts.
+- Post list with cover, excerpt, reading time and tags; tag filtering and search.
+- Article view with table of contents and reading progress bar.
+- Semantic markup: article, header, time, nav; proper heading order.
+- Dark mode and font-size controls."""
+    },
+    {
+        "title": "Chat messaging interface",
+        "tags": "chat messaging messenger conversation chatbot inbox",
+        "text": """**Thinking Process**: Chat UIs must feel instant and keep the latest message in view.
+**Key Findings**:
+- Conversation list plus message pane; collapses to one pane on mobile.
+- Bubbles aligned by sender with timestamps and grouped consecutive messages.
+- Composer pinned to the bottom; Enter sends, Shift+Enter adds a newline; auto-grow textarea.
+- Auto-scroll to newest unless the user scrolled up; typing indicator.
+- aria-live="polite" on the message log; messages persisted in localStorage."""
+    },
+    {
+        "title": "Browser game",
+        "tags": "game arcade puzzle snake tetris memory tic-tac-toe score",
+        "text": """**Thinking Process**: Games need a tight loop, clear feedback and instant restart.
+**Key Findings**:
+- requestAnimationFrame loop with fixed-timestep updates; canvas for action games, DOM grid for board games.
+- Start, pause and game-over screens; keyboard and touch controls.
+- Score, level and high score persisted in localStorage.
+- Short sound or visual feedback on actions; respect reduced-motion.
+- Difficulty ramps gradually; restart in one keypress."""
+    },
+    {
+        "title": "Pomodoro timer and stopwatch",
+        "tags": "timer pomodoro stopwatch countdown focus clock",
+        "text": """**Thinking Process**: Timers must be accurate and glanceable from across the room.
+**Key Findings**:
+- Compute remaining time from timestamps, not by counting intervals, so background tabs stay accurate.
+- Large circular progress ring with the time in tabular numerals.
+- Work/break presets with editable durations saved in localStorage.
+- Notification and sound at completion; document.title shows the countdown.
+- Start/pause with Space, reset with R."""
+    },
+    {
+        "title": "Quiz and flashcards",
+        "tags": "quiz trivia flashcards study learning test questions",
+        "text": """**Thinking Process**: Learning apps should keep momentum and show progress.
+**Key Findings**:
+- One question per view with progress bar and question counter.
+- Immediate right/wrong feedback with explanation before moving on.
+- Results screen with score, review of missed questions and retry.
+- Flip animation for flashcards; spaced repetition buckets in localStorage.
+- Keyboard shortcuts for answers (1-4) and next (Enter)."""
+    },
+    {
+        "title": "Expense tracker and budget",
+        "tags": "expense budget finance money spending tracker income",
+        "text": """**Thinking Process**: Finance apps need fast entry and an honest summary.
+**Key Findings**:
+- Quick-add form: amount, category, date (defaults to today), note.
+- Balance, income and expense summary cards; category breakdown chart.
+- Transaction list with filters by month and category; edit and delete.
+- Format currency with Intl.NumberFormat; store amounts as integer cents.
+- Persist in localStorage with CSV export."""
+    },
+    {
+        "title": "Kanban board",
+        "tags": "kanban board trello tasks project columns drag drop",
+        "text": """**Thinking Process**: Boards are about moving work between states with minimal friction.
+**Key Findings**:
+- Columns (To do / In progress / Done) with counts; add-card inline at column bottom.
+- Native HTML drag and drop plus keyboard move buttons for accessibility.
+- Card modal with description, labels and due date.
+- Board state persisted in localStorage; add and rename columns.
+- Horizontal scroll for columns on mobile."""
+    },
+    {
+        "title": "Notes and markdown editor",
+        "tags": "notes notepad markdown editor writing journal diary",
+        "text": """**Thinking Process**: Note apps must never lose text and should get out of the way.
+**Key Findings**:
+- Sidebar of notes sorted by last edit with search; editor fills the rest.
+- Autosave (debounced) to localStorage with a subtle saved indicator.
+- Markdown preview toggle or split view; sanitize rendered HTML.
+- Keyboard shortcuts for new note and search; pin and delete with undo.
+- Distraction-free mode and dark theme."""
+    },
+    {
+        "title": "Music player",
+        "tags": "music player audio playlist songs podcast",
+        "text": """**Thinking Process**: Media players centre on the now-playing state and transport controls.
+**Key Findings**:
+- Now-playing card with artwork, title, progress scrubber and time.
+- Play/pause, previous/next, shuffle, repeat and volume using the HTML audio element.
+- Playlist with the active track highlighted; keyboard shortcuts (Space, arrows).
+- Media Session API for OS-level controls.
+- Visualizer with Web Audio API analyser as an optional flourish."""
+    },
+]
+
+
+class ResearchCorpus:
+    """
+    BM25 index over curated notes plus research learned from past builds.
+    Learned entries are persisted to `path` (JSON) when one is given; past
+    `max_learned` of them, the oldest are evicted from the index and file.
+    """
+
+    def __init__(self, path: str = None, notes: List[Dict] = None, max_learned: int = MAX_LEARNED):
+        self.path = path
+        self.max_learned = max_learned
+        self._lock = threading.Lock()
+        # Keyed by a running number, so evicting an entry leaves the others' keys alone
+        self._documents: Dict[int, Dict] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+        self._next = 0
+        self._learned = deque()
+        self._titles = set()
+        for note in CURATED_NOTES if notes is None else notes:
+            self._index(dict(note, source="curated"))
+        for entry in self._load():
+            self._index(entry)
+
+    def search(self, query: str, limit: int = 3) -> List[Dict]:
+        """
+        Best matches for `query`, each with its BM25 `score` and a
+        `confidence` in [0, 1]: the IDF-weighted share of query terms the
+        entry contains, so queries with words the corpus has never seen
+        score low.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            total = len(self._documents)
+            if not total:
+                return []
+            average = self._total_length / total
+            idf = {}
+            for term in terms:
+                df = len(self._postings.get(term, ()))
+                idf[term] = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            weight = sum(idf.values())
+
+            scores: Dict[int, float] = {}
+            covered: Dict[int, float] = {}
+            for term in terms:
+                for doc, tf in self._postings.get(term, {}).items():
+                    norm = K1 * (1 - B + B * self._lengths[doc] / average)
+                    scores[doc] = scores.get(doc, 0.0) + idf[term] * tf * (K1 + 1) / (tf + norm)
+                    covered[doc] = covered.get(doc, 0.0) + idf[term]
+
+            ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+            return [{
+                "title": self._documents[doc]["title"],
+                "text": self._documents[doc]["text"],
+                "source": self._documents[doc]["source"],
+                "score": round(scores[doc], 4),
+                "confidence": round(covered[doc] / weight, 4)
+            } for doc in ranked]
+
+    def add(self, title: str, text: str, tags: str = "", source: str = "build") -> bool:
+        """Learn a research summary; ideas already in the corpus are skipped"""
+        if not title or not text:
+            return False
+        entry = {"title": title, "tags": tags, "text": text, "source": source, "added_at": time.time()}
+        with self._lock:
+            if normalize_idea(title) in self._titles:
+                return False
+            self._index(entry)
+            while len(self._learned) > self.max_learned:
+                self._unindex(self._learned.popleft())
+        self._save()
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sources = {}
+            for doc in self._documents.values():
+                sources[doc["source"]] = sources.get(doc["source"], 0) + 1
+            return {"documents": len(self._documents), "terms": len(self._postings), "sources": sources}
+
+    @staticmethod
+    def _tokens(entry: Dict) -> List[str]:
+        # Title and tags count twice: they say what the entry is about
+        return tokenize(f'{entry["title"]} {entry.get("tags", "")}') * 2 + tokenize(entry["text"])
+
+    def _index(self, entry: Dict):
+        number = self._next
+        self._next += 1
+        tokens = self._tokens(entry)
+        for term, tf in Counter(tokens).items():
+            self._postings.setdefault(term, {})[number] = tf
+        self._documents[number] = entry
+        self._lengths[number] = len(tokens)
+        self._total_length += len(tokens)
+        self._titles.add(normalize_idea(entry["title"]))
+        if entry["source"] != "curated":
+            self._learned.append(number)
+
+    def _unindex(self, number: int):
+        """Drop an entry and its term statistics"""
+        entry = self._documents.pop(number)
+        for term in set(self._tokens(entry)):
+            postings = self._postings[term]
+            del postings[number]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(number)
+        self._titles.discard(normalize_idea(entry["title"]))
+
+    def _load(self) -> List[Dict]:
+        if not self.path:
+            return []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)[-self.max_learned:]
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            learned = [self._documents[number] for number in self._learned]
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(learned, f)
+            os.replace(tmp, self.path)
@@ -0,0 +1,144 @@
+"""
+VibeBuilder V2 - Response Schemas
+JSON schemas for the agents whose answers are data rather than code
+(researcher, architect, tester), sent as the model's responseSchema, and
+the parser that validates what comes back
+"""
+
+import json
+import re
+from typing import Dict, Optional
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib parser is used otherwise
+    orjson = None
+    _loads = json.loads
+
+# Gemini's OpenAPI subset: type names are upper case, propertyOrdering fixes
+# the order fields are generated in (reasoning before the verdict)
+RESEARCH_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "thinking": {"type": "STRING", "description": "One or two sentences on the analysis strategy"},
+        "findings": {
+            "type": "ARRAY",
+            "items": {"type": "STRING", "description": "One actionable best practice, under 150 characters"},
+            "maxItems": 5
+        }
+    },
+    "required": ["thinking", "findings"],
+    "propertyOrdering": ["thinking", "findings"]
+}
+
+PLAN_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "thoughts": {"type": "STRING", "description": "Concise architectural reasoning"},
+        "components": {
+            "type": "ARRAY",
+            "items": {"type": "STRING", "description": "Component name, under 50 characters"},
+            "maxItems": 6
+        },
+        "plan": {"type": "STRING", "description": "High-level technical description"}
+    },
+    "required": ["thoughts", "components", "plan"],
+    "propertyOrdering": ["thoughts", "components", "plan"]
+}
+
+TEST_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "issues": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "description": {"type": "STRING"},
+                    "severity": {"type": "STRING", "enum": ["critical", "major", "minor"]}
+                },
+                "required": ["description", "severity"],
+                "propertyOrdering": ["description", "severity"]
+            },
+            "maxItems": 5
+        },
+        "passed": {"type": "BOOLEAN", "description": "True only if there are no critical or major issues"}
+    },
+    "required": ["issues", "passed"],
+    "propertyOrdering": ["issues", "passed"]
+}
+
+# Starts the schema instructions for calls that cannot set responseSchema
+# (grounded search does not support it)
+JSON_INSTRUCTION = "Respond ONLY with a JSON object matching this schema"
+
+_PYTHON_TYPES = {
+    "OBJECT": dict,
+    "ARRAY": list,
+    "STRING": str,
+    "BOOLEAN": bool,
+    "INTEGER": int,
+    "NUMBER": (int, float),
+}
+_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+class SchemaError(ValueError):
+    """The model's answer is not JSON matching the requested schema"""
+
+
+def json_config(schema: Dict) -> Dict:
+    """generation_config fields asking for JSON constrained to `schema`"""
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+
+def schema_instructions(schema: Dict) -> str:
+    """The schema spelled out in the prompt, for calls without responseSchema"""
+    return f"{JSON_INSTRUCTION} (no markdown, no prose):\n{json.dumps(schema, separators=(',', ':'))}"
+
+
+def parse_response(text: str, schema: Dict) -> Dict:
+    """
+    Parse and validate a JSON answer. Arrays longer than their maxItems
+    are cut rather than rejected.
+
+    Raises:
+        SchemaError: not JSON, or a required field is missing or mistyped
+    """
+    text = _FENCE_RE.sub('', (text or '').strip())
+    try:
+        value = _loads(text)
+    except ValueError as e:
+        raise SchemaError(f"Invalid JSON: {e}") from None
+    return _validate(value, schema, "$")
+
+
+def try_parse(text: str, schema: Dict) -> Optional[Dict]:
+    """parse_response, or None (logged) when the answer does not conform"""
+    try:
+        return parse_response(text, schema)
+    except SchemaError as e:
+        print(f"[Schema] Falling back to text parsing: {e}")
+        return None
+
+
+def _validate(value, schema: Dict, path: str):
+    expected = _PYTHON_TYPES[schema["type"]]
+    # bool is an int subclass; a boolean is never a valid number here
+    if not isinstance(value, expected) or (isinstance(value, bool) and schema["type"] != "BOOLEAN"):
+        raise SchemaError(f"{path}: expected {schema['type'].lower()}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise SchemaError(f"{path}: {value!r} is not one of {schema['enum']}")
+    if schema["type"] == "OBJECT":
+        missing = [key for key in schema.get("required", []) if key not in value]
+        if missing:
+            raise SchemaError(f"{path}: missing {', '.join(missing)}")
+        return {
+            key: _validate(item, schema["properties"][key], f"{path}.{key}") if key in schema["properties"] else item
+            for key, item in value.items()
+        }
+    if schema["type"] == "ARRAY":
+        items = value[:schema["maxItems"]] if "maxItems" in schema else value
+        return [_validate(item, schema["items"], f"{path}[{i}]") for i, item in enumerate(items)]
+    return value
@@ -0,0 +1,153 @@
+"""
+VibeBuilder V2 - Single-Flight Builds
+Identical builds requested while one is already running attach to it:
+they replay the events emitted so far and then follow it live, so N
+identical concurrent requests cost one pipeline. When the last client
+leaves, the build is cancelled.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from utils.cancellation import BuildCancelled, CancelToken
+from utils.text_utils import normalize_idea
+
+
+def flight_key(idea: str, options: Dict = None, normalize: Callable[[str], str] = normalize_idea) -> str:
+    """Same normalized idea and same options -> same key"""
+    material = json.dumps([normalize(idea), options or {}], sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def normalize_feedback(text: str) -> str:
+    """
+    Case and whitespace only: unlike an idea, refine feedback can hinge on
+    punctuation ("set color #333" is not "set color 333")
+    """
+    return ' '.join(text.lower().split())
+
+
+class Flight:
+    """
+    One running build. Its events are produced on a background thread
+    (so the build survives its first client leaving) and kept until it
+    finishes, for late subscribers to replay.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.events = []
+        self.done = False
+        # Clients attached to the flight (joined and not yet left)
+        self.subscribers = 0
+        self.started_at = time.time()
+        self.cancel = CancelToken()
+        self._changed = threading.Condition()
+
+    def run(self, events: Iterable[Dict], on_done: Callable[["Flight"], None]):
+        try:
+            for event in events:
+                self._append(event)
+        except BuildCancelled as e:
+            print(f"🛑 Build cancelled after {time.time() - self.started_at:.1f}s: {e}")
+            self._append({'status': 'cancelled', 'error': f"Build cancelled: {e}"})
+        except Exception as e:
+            self._append({'error': str(e)})
+        finally:
+            with self._changed:
+                self.done = True
+                self._changed.notify_all()
+            on_done(self)
+
+    def subscribe(self, tick: float = None) -> Iterator[Optional[Dict]]:
+        """
+        Every event of the build, from the first, ending when the build does.
+        With `tick`, None is yielded whenever that many seconds pass without
+        an event, so the caller can check on its client and send heartbeats.
+        """
+        position = 0
+        while True:
+            with self._changed:
+                if position >= len(self.events) and not self.done:
+                    self._changed.wait(tick if tick else 1.0)
+                pending = self.events[position:]
+                finished = self.done
+            position += len(pending)
+            for event in pending:
+                yield event
+            if finished and position >= len(self.events):
+                return
+            if not pending and tick:
+                yield None
+
+    def _append(self, event: Dict):
+        with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+
+class SingleFlight:
+    """In-flight builds by key; a key is free again once its build finishes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def join(self, key: str, start: Callable[[CancelToken], Iterable[Dict]]) -> Tuple[Flight, bool]:
+        """
+        Attach to the flight running under `key`, starting one from
+        `start(cancel_token)` if none is. Every join must be paired with a
+        leave().
+
+        Returns:
+            (flight, True if this call started it)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.subscribers += 1
+                self.coalesced += 1
+                return flight, False
+            flight = Flight(key)
+            flight.subscribers = 1
+            self._flights[key] = flight
+            self.started += 1
+        threading.Thread(target=flight.run, args=(start(flight.cancel), self._finish),
+                         name=f"flight-{key[:8]}", daemon=True).start()
+        return flight, True
+
+    def leave(self, flight: Flight):
+        """Detach a client; the last one out cancels a build still running"""
+        with self._lock:
+            flight.subscribers -= 1
+            abandoned = flight.subscribers <= 0 and not flight.done
+            # A new request for the same key starts fresh instead of joining a dying build
+            if abandoned and self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        if abandoned:
+            flight.cancel.cancel("every client disconnected")
+
+    def get(self, key: str) -> Optional[Flight]:
+        with self._lock:
+            return self._flights.get(key)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            flights = list(self._flights.values())
+            started, coalesced = self.started, self.coalesced
+        return {
+            "in_flight": len(flights),
+            "subscribers": sum(f.subscribers for f in flights),
+            "started": started,
+            "coalesced": coalesced
+        }
+
+    def _finish(self, flight: Flight):
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
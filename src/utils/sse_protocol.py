@@ -0,0 +1,197 @@
+"""
+VibeBuilder V2 - SSE Event Protocol
+Encoders for the build/refine event stream
+
+Protocol 1 (legacy) sends every event as plain JSON, so the generated
+document is repeated in the code, fix and export events.
+
+Protocol 2 (compact) sends each document once. Document-valued fields are
+replaced by {"$doc": <sha256>} references and the event carries a "docs"
+map with the definitions the client has not seen yet. A new version is
+shipped as a line delta against the previous document when that is
+smaller. The stream can additionally be deflate-compressed as a whole.
+"""
+
+import difflib
+import hashlib
+import json
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+PROTOCOL_HEADER = 'X-VibeBuilder-Protocol'
+LEGACY_PROTOCOL = 1
+COMPACT_PROTOCOL = 2
+
+# Event fields that hold a complete HTML document
+DOCUMENT_KEYS = ('code', 'fixed_code', 'refined_code', 'final_code')
+
+_COMPACT_JSON = {'separators': (',', ':'), 'ensure_ascii': False}
+# Same line split as the client (str.splitlines also breaks on \f, \u2028, ...)
+_LINE_RE = re.compile(r'[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$')
+
+
+class LegacyEncoder:
+    """Protocol 1: one `data:` line of plain JSON per event"""
+
+    protocol = LEGACY_PROTOCOL
+    content_encoding = None
+
+    def __init__(self):
+        self.bytes_out = 0
+        self.events = 0
+
+    def encode(self, update: Dict) -> bytes:
+        frame = f"data: {json.dumps(update)}\n\n".encode('utf-8')
+        return self._count(frame)
+
+    def seed(self, text: str, alias: str = 'input'):
+        pass
+
+    def comment(self, text: str = '') -> bytes:
+        """SSE comment line (ignored by clients), e.g. for heartbeats"""
+        return self._count(f": {text}\n\n".encode('utf-8'))
+
+    def close(self) -> bytes:
+        return b''
+
+    def _count(self, frame: bytes) -> bytes:
+        self.bytes_out += len(frame)
+        self.events += 1
+        return frame
+
+
+class CompactEncoder(LegacyEncoder):
+    """Protocol 2: documents sent once, then referenced by hash or as deltas"""
+
+    protocol = COMPACT_PROTOCOL
+
+    def __init__(self, deflate: bool = False):
+        super().__init__()
+        self.known = set()
+        self.last_doc: Optional[str] = None
+        self.last_hash: Optional[str] = None
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 15) if deflate else None
+        self.content_encoding = 'deflate' if deflate else None
+
+    def seed(self, text: str, alias: str = 'input'):
+        """Declare a document the client already holds (e.g. the code it sent to refine)"""
+        if text:
+            self.last_doc = text
+            self.last_hash = alias
+
+    def encode(self, update: Dict) -> bytes:
+        docs = {}
+        event = self._replace_documents(update, docs)
+        event["v"] = COMPACT_PROTOCOL
+        if docs:
+            event["docs"] = docs
+        frame = f"data: {json.dumps(event, **_COMPACT_JSON)}\n\n".encode('utf-8')
+        return self._count(self._compress(frame))
+
+    def comment(self, text: str = '') -> bytes:
+        return self._count(self._compress(f": {text}\n\n".encode('utf-8')))
+
+    def close(self) -> bytes:
+        if self._compressor is None:
+            return b''
+        tail = self._compressor.flush(zlib.Z_FINISH)
+        self.bytes_out += len(tail)
+        return tail
+
+    def _compress(self, frame: bytes) -> bytes:
+        if self._compressor is None:
+            return frame
+        # Sync flush so the client can decode each event as soon as it arrives
+        return self._compressor.compress(frame) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def _replace_documents(self, value, docs: Dict):
+        if isinstance(value, dict):
+            out = {}
+            for key, item in value.items():
+                if key in DOCUMENT_KEYS and isinstance(item, str) and item:
+                    out[key] = {"$doc": self._define(item, docs)}
+                else:
+                    out[key] = self._replace_documents(item, docs)
+            return out
+        if isinstance(value, list):
+            return [self._replace_documents(item, docs) for item in value]
+        return value
+
+    def _define(self, text: str, docs: Dict) -> str:
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if digest not in self.known:
+            definition = {"body": text}
+            if self.last_doc is not None:
+                delta = line_delta(self.last_doc, text)
+                if len(json.dumps(delta, **_COMPACT_JSON)) < len(text):
+                    definition = {"base": self.last_hash, "delta": delta}
+            docs[digest] = definition
+            self.known.add(digest)
+        self.last_doc = text
+        self.last_hash = digest
+        return digest
+
+
+def line_delta(old: str, new: str) -> List:
+    """
+    Line-level edit script turning `old` into `new`:
+    [n] keeps n lines, "text" inserts text, [-n] skips n old lines
+    """
+    old_lines = _LINE_RE.findall(old)
+    new_lines = _LINE_RE.findall(new)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            ops.append([i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append([-(i2 - i1)])
+        if j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return ops
+
+
+def apply_line_delta(old: str, delta: List) -> str:
+    """Inverse of line_delta (mirrors the client implementation in app.js)"""
+    old_lines = _LINE_RE.findall(old)
+    out = []
+    pos = 0
+    for op in delta:
+        if isinstance(op, str):
+            out.append(op)
+        elif op[0] >= 0:
+            out.extend(old_lines[pos:pos + op[0]])
+            pos += op[0]
+        else:
+            pos -= op[0]
+    return ''.join(out)
+
+
+def negotiate(protocol_header: str, body: Optional[Dict], accept_encoding: str) -> LegacyEncoder:
+    """Pick an encoder from the client's protocol request"""
+    body = body or {}
+    try:
+        requested = int(protocol_header or body.get('protocol') or LEGACY_PROTOCOL)
+    except (TypeError, ValueError):
+        requested = LEGACY_PROTOCOL
+    if requested < COMPACT_PROTOCOL:
+        return LegacyEncoder()
+    deflate = bool(body.get('deflate')) and 'deflate' in (accept_encoding or '').lower()
+    return CompactEncoder(deflate=deflate)
+
+
+def compare_protocols(updates: Iterable[Dict]) -> Dict:
+    """Bytes on the wire for one build's events under each protocol"""
+    encoders = {
+        "legacy": LegacyEncoder(),
+        "compact": CompactEncoder(),
+        "compact_deflate": CompactEncoder(deflate=True)
+    }
+    for update in updates:
+        for encoder in encoders.values():
+            encoder.encode(update)
+    for encoder in encoders.values():
+        encoder.close()
+    return {name: encoder.bytes_out for name, encoder in encoders.items()}
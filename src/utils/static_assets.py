@@ -0,0 +1,99 @@
+"""
+VibeBuilder V2 - Static Asset Cache
+Fingerprints frontend files at startup and keeps them (and their
+precompressed variants) in memory
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+from utils.build_optimizer import compress_variants
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_BYTES = 512
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Browsers may keep fingerprinted files forever; everything else revalidates
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+
+class StaticAssets:
+    """
+    In-memory static file table
+
+    Every file under `folder` is served by its plain name and by a
+    fingerprinted name (`app.<hash>.js`). HTML files are rewritten so their
+    `/static/...` references point at fingerprinted names.
+    """
+
+    def __init__(self, folder: str, url_prefix: str = '/static'):
+        self.folder = folder
+        self.url_prefix = url_prefix.rstrip('/')
+        self.assets: Dict[str, Dict] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.load()
+
+    def load(self):
+        """(Re)scan the folder. HTML is processed last so it can reference hashed names."""
+        assets = {}
+        fingerprints = {}
+        files = []
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                path = os.path.join(root, name)
+                files.append(os.path.relpath(path, self.folder).replace(os.sep, '/'))
+        files.sort(key=lambda f: f.endswith('.html'))
+
+        for rel in files:
+            with open(os.path.join(self.folder, rel), 'rb') as f:
+                data = f.read()
+            if rel.endswith('.html'):
+                data = self._rewrite_references(data.decode('utf-8'), fingerprints).encode('utf-8')
+
+            digest = hashlib.sha256(data).hexdigest()
+            base, ext = os.path.splitext(rel)
+            hashed = f"{base}.{digest[:12]}{ext}"
+            mimetype = mimetypes.guess_type(rel)[0] or 'application/octet-stream'
+
+            entry = {
+                "body": data,
+                "etag": digest,
+                "mimetype": mimetype,
+                "variants": self._variants(data, mimetype)
+            }
+            assets[rel] = dict(entry, cache_control=REVALIDATE_CACHE)
+            assets[hashed] = dict(entry, cache_control=IMMUTABLE_CACHE)
+            fingerprints[rel] = hashed
+
+        self.assets = assets
+        self.fingerprints = fingerprints
+        total = sum(len(a["body"]) for name, a in assets.items() if name in fingerprints)
+        print(f"📦 Cached {len(fingerprints)} static assets ({total} bytes)")
+
+    def get(self, path: str) -> Optional[Dict]:
+        return self.assets.get(path.lstrip('/'))
+
+    def url_for(self, path: str) -> str:
+        return f"{self.url_prefix}/{self.fingerprints.get(path, path)}"
+
+    def _rewrite_references(self, html: str, fingerprints: Dict[str, str]) -> str:
+        prefix = re.escape(self.url_prefix + '/')
+
+        def replace(match):
+            name = match.group(2)
+            if name in fingerprints:
+                return f"{match.group(1)}{self.url_prefix}/{fingerprints[name]}"
+            return match.group(0)
+
+        return re.sub(rf'((?:href|src)=["\']){prefix}([^"\'?#]+)', replace, html)
+
+    def _variants(self, data: bytes, mimetype: str) -> Dict[str, bytes]:
+        if len(data) < MIN_COMPRESS_BYTES or not mimetype.startswith(COMPRESSIBLE_TYPES):
+            return {}
+        variants = compress_variants(data)
+        # Drop encodings that do not actually save anything
+        return {k: v for k, v in variants.items() if len(v) < len(data)}
@@ -0,0 +1,63 @@
+"""
+VibeBuilder V2 - Text Utilities
+Idea normalization and lightweight similarity for grouping requests
+"""
+
+import re
+from typing import List, Set
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Words that say nothing about what kind of app is wanted
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'for', 'with', 'of', 'to', 'in', 'on', 'my',
+    'app', 'application', 'web', 'website', 'site', 'page', 'simple', 'modern',
+    'build', 'make', 'create', 'that', 'this', 'is', 'me', 'please'
+}
+
+
+def normalize_idea(idea: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return ' '.join(_TOKEN_RE.findall((idea or '').lower()))
+
+
+def tokenize(text: str) -> List[str]:
+    """Content words of a text, with a crude plural strip"""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def cluster_ideas(ideas: List[str], threshold: float = 0.5) -> List[List[int]]:
+    """
+    Greedy single-pass clustering by token-set Jaccard similarity.
+
+    Returns lists of indices into `ideas`; the first index of each cluster
+    is its representative.
+    """
+    clusters: List[List[int]] = []
+    signatures: List[Set[str]] = []
+    for index, idea in enumerate(ideas):
+        tokens = set(tokenize(idea))
+        best, best_score = None, threshold
+        for c, signature in enumerate(signatures):
+            score = jaccard(tokens, signature)
+            if score >= best_score:
+                best, best_score = c, score
+        if best is None:
+            clusters.append([index])
+            signatures.append(tokens)
+        else:
+            clusters[best].append(index)
+    return clusters
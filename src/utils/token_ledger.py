@@ -0,0 +1,144 @@
+"""
+VibeBuilder V2 - Token Ledger
+Prompt, output and cached tokens of every model call a build makes, by
+phase, and the token budgets (per build, per tenant per day) the
+orchestrator checks before optional work
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from utils.usage import USAGE_FIELDS, sum_usage
+
+
+class TokenLedger:
+    """
+    Token spend of one build or refine. The model client records into the
+    ledger of the current ledger_scope(), so every call is counted,
+    including chat, continuations and losing race candidates.
+    """
+
+    def __init__(self, budget: int = None, tenant: str = None):
+        # Tokens this build may spend (None: unlimited)
+        self.budget = budget
+        self.tenant = tenant
+        self.phases: Dict[str, Dict] = {}
+        # Work skipped because the budget ran out
+        self.stopped: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, usage: Dict):
+        with self._lock:
+            entry = self.phases.setdefault(phase, dict({"calls": 0}, **{f: 0 for f in USAGE_FIELDS}))
+            entry["calls"] += 1
+            for field in USAGE_FIELDS:
+                entry[field] += usage.get(field, 0)
+
+    def spent(self, phase: str = None) -> int:
+        """Total tokens of `phase`, or of the whole build"""
+        with self._lock:
+            if phase is not None:
+                return self.phases.get(phase, {}).get("total_tokens", 0)
+            return sum(entry["total_tokens"] for entry in self.phases.values())
+
+    def remaining(self) -> Optional[int]:
+        return None if self.budget is None else self.budget - self.spent()
+
+    def affords(self, phase: str, estimate: int = 0) -> bool:
+        """
+        Whether `phase`, expected to cost `estimate` tokens, fits the budget.
+        A refusal is recorded in `stopped`.
+        """
+        remaining = self.remaining()
+        if remaining is None or remaining > estimate:
+            return True
+        print(f"[Ledger] Token budget reached, skipping {phase} ({remaining} left, ~{estimate} needed)")
+        self.stopped.append({"phase": phase, "remaining": remaining, "estimate": estimate})
+        return False
+
+    def totals(self) -> Dict:
+        with self._lock:
+            entries = list(self.phases.values())
+        totals = sum_usage(entries)
+        totals["calls"] = sum(entry["calls"] for entry in entries)
+        return totals
+
+    def report(self) -> Dict:
+        with self._lock:
+            phases = {phase: dict(entry) for phase, entry in self.phases.items()}
+        return {
+            "totals": self.totals(),
+            "phases": phases,
+            "budget": self.budget,
+            "tenant": self.tenant,
+            "stopped": list(self.stopped)
+        }
+
+
+class TenantBudgets:
+    """
+    Daily token allowance per tenant. Spend is charged to `store` (a
+    utils.build_history.BuildHistory) when a ledger settles, so concurrent
+    builds of one tenant can overshoot by at most what they have in flight.
+    """
+
+    def __init__(self, store, daily_tokens: int = None, build_tokens: int = None):
+        self.store = store
+        self.daily_tokens = daily_tokens
+        # Server-wide cap per build or refine
+        self.build_tokens = build_tokens
+
+    def remaining(self, tenant: str) -> Optional[int]:
+        if self.daily_tokens is None:
+            return None
+        return max(0, self.daily_tokens - self.store.tenant_spend(tenant, _today()))
+
+    def open(self, tenant: str, budget: int = None) -> TokenLedger:
+        """Ledger for one build, limited by `budget`, the server cap and the tenant's day"""
+        limits = [limit for limit in (budget, self.build_tokens, self.remaining(tenant)) if limit is not None]
+        return TokenLedger(min(limits) if limits else None, tenant)
+
+    def settle(self, ledger: TokenLedger):
+        spent = ledger.spent()
+        if spent and ledger.tenant is not None:
+            self.store.charge(ledger.tenant, spent, _today())
+
+    def usage(self, tenant: str) -> Dict:
+        return {
+            "tenant": tenant,
+            "day": _today(),
+            "spent": self.store.tenant_spend(tenant, _today()),
+            "daily_tokens": self.daily_tokens,
+            "remaining": self.remaining(tenant)
+        }
+
+
+def _today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+_current = threading.local()
+
+
+@contextmanager
+def ledger_scope(ledger: Optional[TokenLedger], phase: str):
+    """Charge model calls made by the current thread in the block to `ledger` under `phase`"""
+    previous = getattr(_current, "scope", None)
+    _current.scope = (ledger, phase) if ledger is not None else None
+    try:
+        yield ledger
+    finally:
+        _current.scope = previous
+
+
+def current_scope() -> Optional[tuple]:
+    """(ledger, phase) of the current thread, to hand to worker threads"""
+    return getattr(_current, "scope", None)
+
+
+def record_usage(usage: Dict):
+    scope = current_scope()
+    if scope is not None:
+        scope[0].record(scope[1], usage)
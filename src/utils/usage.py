@@ -0,0 +1,27 @@
+"""
+VibeBuilder V2 - Usage Utilities
+Token counts reported by Gemini responses
+"""
+
+from typing import Dict, Iterable
+
+USAGE_FIELDS = ("prompt_tokens", "output_tokens", "cached_tokens", "total_tokens")
+
+
+def usage_from_response(response) -> Dict:
+    """Read usage_metadata from a generate_content response (zeros when absent)"""
+    meta = getattr(response, "usage_metadata", None)
+    prompt = getattr(meta, "prompt_token_count", 0) or 0
+    output = getattr(meta, "candidates_token_count", 0) or 0
+    # Part of prompt_tokens that was served from the context cache
+    cached = getattr(meta, "cached_content_token_count", 0) or 0
+    total = getattr(meta, "total_token_count", 0) or (prompt + output)
+    return {"prompt_tokens": prompt, "output_tokens": output, "cached_tokens": cached, "total_tokens": total}
+
+
+def sum_usage(usages: Iterable[Dict]) -> Dict:
+    totals = {field: 0 for field in USAGE_FIELDS}
+    for usage in usages:
+        for field in USAGE_FIELDS:
+            totals[field] += (usage or {}).get(field, 0)
+    return totals
@@ -0,0 +1,72 @@
+"""
+VibeBuilder V2 - Startup & Warmup
+Times the startup sequence and gates readiness on prewarming
+"""
+
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class StartupState:
+    """
+    Collects cold-start timings and runs warmup steps in the background.
+
+    Liveness only means the process is up; readiness is reached once every
+    warmup step has run, so traffic never lands on a cold instance.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.ready_at: Optional[float] = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @contextmanager
+    def measure(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - started, 4)
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = round(seconds, 4)
+
+    def start(self, steps: List[Tuple[str, Callable[[], None]]]):
+        """Run warmup steps on a daemon thread; a failing step is logged, not fatal"""
+        def run():
+            for name, step in steps:
+                try:
+                    with self.measure(name):
+                        step()
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    print(f"⚠️  Warmup step '{name}' failed: {e}")
+                    traceback.print_exc()
+            self.ready_at = time.time()
+            self._ready.set()
+            print(f"✅ Ready in {self.ready_at - self.started_at:.2f}s {self.timings}")
+
+        self._thread = threading.Thread(target=run, name="vibe-warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def report(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "uptime": round(time.time() - self.started_at, 2),
+            "time_to_ready": round(self.ready_at - self.started_at, 4) if self.ready_at else None,
+            "timings": dict(self.timings),
+            "errors": dict(self.errors)
+        }
@@ -0,0 +1,43 @@
+import pytest
+
+from agents.orchestrator import VibeBuilderOrchestrator
+from tools.fake_gemini import FakeGemini, serve
+from utils.text_utils import cluster_ideas
+from utils.token_ledger import TokenLedger
+
+IDEAS = ["todo list app", "todo list app with tags", "weather forecast app"]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeGemini(seed=1, code_kb=8)
+    server = serve(fake, port=0)
+    monkeypatch.setenv("VIBEBUILDER_GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1beta")
+    yield fake
+    server.shutdown()
+
+
+def test_similar_ideas_share_a_cluster():
+    assert cluster_ideas(IDEAS) == [[0, 1], [2]]
+    assert cluster_ideas(IDEAS, threshold=0.9) == [[0], [1], [2]]
+
+
+def test_research_and_plan_run_once_per_cluster(fake):
+    ledgers = {}
+
+    def open_ledger(index):
+        ledgers[index] = TokenLedger()
+        return ledgers[index]
+
+    updates = list(VibeBuilderOrchestrator("key", delay=0).build_batch(IDEAS, open_ledger=open_ledger))
+    results = sorted((u for u in updates if u["type"] == "result"), key=lambda u: u["index"])
+
+    assert [u["indices"] for u in updates if u["type"] == "cluster"] == [[0, 1], [2]]
+    assert [(r["idea"], r["cluster"], r["success"]) for r in results] == [
+        (IDEAS[0], 0, True), (IDEAS[1], 0, True), (IDEAS[2], 1, True)
+    ]
+    assert (fake.counts["research"], fake.counts["plan"], fake.counts["code"]) == (2, 2, 3)
+    # A cluster's shared phases are charged to its first idea only
+    assert {"research", "plan", "code"} <= set(ledgers[0].phases)
+    assert "research" not in ledgers[1].phases and "code" in ledgers[1].phases
+    assert updates[-1] == dict(updates[-1], type="summary", ideas=3, clusters=2)
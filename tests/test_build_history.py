@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+import pytest
+
+from utils import build_history as build_history_module
+from utils.build_history import DEFAULT_TENANT, BuildHistory, BuildRecorder
+
+
+def test_phase_timings_exclude_pacing_and_split_research_sources():
+    recorder = BuildRecorder("todo app")
+    recorder.observe({"phase": "research", "status": "starting"})
+    # The orchestrator's pacing delay sits between "starting" and the work
+    time.sleep(0.05)
+    recorder.observe({"phase": "research", "status": "complete",
+                      "data": {"source": "local", "elapsed": 0.002}})
+    recorder.observe({"phase": "plan", "status": "starting"})
+    time.sleep(0.05)
+    recorder.observe({"phase": "plan", "status": "complete", "data": {"elapsed": 0.01}})
+    assert recorder.phases == {"research_local": 0.002, "plan": 0.01}
+
+    recorder = BuildRecorder("todo app")
+    recorder.observe({"phase": "research", "status": "starting"})
+    recorder.observe({"phase": "research", "status": "complete",
+                      "data": {"source": "search", "elapsed": 4.5}})
+    assert recorder.phases == {"research": 4.5}
+
+
+def test_listings_are_scoped_to_the_tenant(tmp_path):
+    history = BuildHistory(str(tmp_path / "history.db"))
+    for build_id, tenant in (("b1", "acme"), ("b2", None), ("b3", "acme")):
+        recorder = BuildRecorder("todo app", tenant=tenant)
+        recorder.build_id = build_id
+        history.record(recorder, "<!DOCTYPE html><html></html>")
+
+    assert [b["build_id"] for b in history.list(tenant="acme")["builds"]] == ["b3", "b1"]
+    assert [b["build_id"] for b in history.list(tenant=DEFAULT_TENANT)["builds"]] == ["b2"]
+    assert [b["build_id"] for b in history.search("todo", tenant="acme")["builds"]] == ["b3", "b1"]
+    assert history.get("b1", tenant="acme")["code"]
+    assert history.get("b1", tenant=DEFAULT_TENANT) is None
+    assert len(history.list()["builds"]) == 3
+
+
+def test_other_tenants_do_not_use_up_a_search_page(tmp_path):
+    history = BuildHistory(str(tmp_path / "history.db"))
+    for number in range(6):
+        # The other tenant's builds are the newest, so they would fill a page filtered afterwards
+        tenant = "acme" if number < 2 else "globex"
+        recorder = BuildRecorder(f"todo app {number}", tenant=tenant)
+        recorder.build_id = f"build-{number}"
+        history.record(recorder, "<!DOCTYPE html><html></html>")
+
+    page = history.search("todo", limit=2, tenant="acme")
+    assert [b["build_id"] for b in page["builds"]] == ["build-1", "build-0"]
+    assert page["next_cursor"] is None
+
+
+def test_connections_are_closed_after_each_call(tmp_path, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        opened.append(connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(build_history_module.sqlite3, "connect", tracking_connect)
+    history = BuildHistory(str(tmp_path / "history.db"))
+    recorder = BuildRecorder("todo app")
+    recorder.build_id = "b1"
+    history.record(recorder, "<!DOCTYPE html><html></html>")
+    history.list()
+    history.search("todo")
+    history.get("b1")
+    history.charge("acme", 10, "2026-01-01")
+    assert history.tenant_spend("acme", "2026-01-01") == 10
+
+    assert len(opened) == 7
+    for db in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1")
@@ -0,0 +1,85 @@
+import pytest
+
+from utils.build_optimizer import minify_css, minify_html, minify_js, negotiate_encoding
+
+
+@pytest.mark.parametrize("css, expected", [
+    ("a { color : red ; margin: 0 auto; }", "a{color:red;margin:0 auto}"),
+    # A space before a pseudo-class is a descendant combinator
+    ("div :hover { color: red }", "div :hover{color:red}"),
+    ("@media (max-width: 600px) { .nav :focus { outline : none } }",
+     "@media (max-width: 600px){.nav :focus{outline:none}}"),
+    # A nested rule inside declarations keeps its selector intact
+    (".card { color: red; & :hover { color: blue } }", ".card{color:red;& :hover{color:blue}}"),
+    ("/* note */ p::before { content : \"a  :  b\" }", "p::before{content:\"a  :  b\"}"),
+])
+def test_minify_css(css, expected):
+    assert minify_css(css) == expected
+
+
+@pytest.mark.parametrize("js, expected", [
+    # Joining these would spell an HTML-like comment
+    ("if (a < !--b) x = 1", "if(a< !--b)x=1"),
+    ("x = c-- > d", "x=c-- >d"),
+    ("y = a < b ? c : d", "y=a<b?c:d"),
+    # Line breaks stay for automatic semicolon insertion
+    ("let a = 1\n\n\n   let b = 2 // two\n", "let a=1\nlet b=2"),
+    ("/* block */ f( 1 , 2 )", "f(1,2)"),
+])
+def test_minify_js(js, expected):
+    assert minify_js(js) == expected
+
+
+@pytest.mark.parametrize("literal", [
+    "'a  //  b'",
+    '"/* not a comment */"',
+    "/ +[a-z]  \\/ {2}/gi",
+    "/[/]  x/",
+])
+def test_minify_js_keeps_literals(literal):
+    assert minify_js(f"const v = {literal};") == f"const v={literal};"
+
+
+def test_minify_js_keeps_template_text():
+    # Template text is verbatim; the ${} expressions are code
+    template = "`line one\n   ${ x  +  `inner  ${ y }` }  line two`"
+    assert minify_js(f"const v = {template};") == "const v=`line one\n   ${x + `inner  ${y}`}  line two`;"
+
+
+def test_minify_js_tells_division_from_regex():
+    assert minify_js("total = a / b / c") == "total=a / b / c"
+    assert minify_js("return /  x/.test(s)") == "return /  x/.test(s)"
+
+
+def test_minify_html():
+    html = """<!DOCTYPE html>
+<html>
+  <!-- dropped -->
+  <!--[if IE]><p>kept</p><![endif]-->
+  <style> body { margin : 0 } </style>
+  <pre>  keep   this  </pre>
+  <textarea>  and  this </textarea>
+  <script type="text/template">  <b>  raw  </b>  </script>
+  <script> let a = 1 ;  </script>
+</html>"""
+    assert minify_html(html) == (
+        "<!DOCTYPE html>\n<html>\n<!--[if IE]><p>kept</p><![endif]-->\n"
+        "<style>body{margin:0}</style>\n<pre>  keep   this  </pre>\n"
+        "<textarea>  and  this </textarea>\n<script type=\"text/template\"><b>  raw  </b></script>\n"
+        "<script>let a=1;</script>\n</html>"
+    )
+    assert minify_html("") == ""
+
+
+@pytest.mark.parametrize("header, available, expected", [
+    ("gzip, deflate, br", {"gzip", "br"}, "br"),
+    ("gzip, br;q=0", {"gzip", "br"}, "gzip"),
+    ("br", {"gzip"}, None),
+    ("*", {"gzip"}, "gzip"),
+    ("*;q=0, identity", {"gzip", "br"}, None),
+    ("GZIP;q=0.5", {"gzip"}, "gzip"),
+    ("gzip;q=bogus", {"gzip"}, None),
+    ("", {"gzip"}, None),
+])
+def test_negotiate_encoding(header, available, expected):
+    assert negotiate_encoding(header, available) == expected
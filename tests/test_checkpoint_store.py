@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+from agents.orchestrator import VibeBuilderOrchestrator
+from tools.fake_gemini import FakeGemini, serve
+from utils.checkpoint_store import BuildCheckpoint, CheckpointStore
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeGemini(seed=1, code_kb=8)
+    server = serve(fake, port=0)
+    monkeypatch.setenv("VIBEBUILDER_GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1beta")
+    yield fake
+    server.shutdown()
+
+
+def test_saved_phases_survive_a_restart(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    checkpoint = BuildCheckpoint(store, "build-0001", "todo app")
+    checkpoint.save("research", {"success": True, "summary": "notes"})
+    checkpoint.save("plan", {"success": True, "plan": "steps"})
+
+    reloaded = BuildCheckpoint(CheckpointStore(str(tmp_path)), "build-0001", "todo app")
+    assert reloaded.resumed_phases == ["research", "plan"]
+    assert reloaded.get("plan")["plan"] == "steps"
+    # A checkpoint for another idea under the same ID is not reused
+    assert BuildCheckpoint(store, "build-0001", "weather app").resumed_phases == []
+
+
+def test_rerunning_a_phase_drops_the_checkpoints_after_it(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    checkpoint = BuildCheckpoint(store, "build-0001", "todo app")
+    for phase in ("research", "plan", "code", "test_1"):
+        checkpoint.save(phase, {"success": True})
+
+    resumed = BuildCheckpoint(store, "build-0001", "todo app")
+    assert resumed.get("research") is not None
+    # The plan is re-run (say its result was discarded), so code and tests are stale
+    resumed.state["phases"].pop("plan")
+    resumed.invalidate_rest()
+    assert list(resumed.state["phases"]) == ["research"]
+    resumed.save("plan", {"success": True})
+    assert list(store.load("build-0001")["phases"]) == ["research", "plan"]
+
+
+def test_invalid_ids_are_ignored_and_old_checkpoints_pruned(tmp_path):
+    store = CheckpointStore(str(tmp_path), ttl_seconds=60)
+    store.save("../escape", {"phases": {}})
+    assert store.load("../escape") is None
+    assert os.listdir(tmp_path) == []
+
+    store.save("build-0001", {"idea": "todo app", "phases": {}})
+    stale = time.time() - 120
+    os.utime(tmp_path / "build-0001.json", (stale, stale))
+    CheckpointStore(str(tmp_path), ttl_seconds=60)
+    assert store.load("build-0001") is None
+
+
+def test_a_retried_build_resumes_after_its_last_completed_phase(fake, tmp_path):
+    orchestrator = VibeBuilderOrchestrator("key", delay=0, checkpoint_store=CheckpointStore(str(tmp_path)))
+    build = orchestrator.build("todo app", build_id="resume-after-code")
+    for update in build:
+        if update.get("phase") == "code" and update.get("status") == "complete":
+            break
+    # The client went away right after code generation
+    build.close()
+    calls = dict(fake.counts)
+
+    updates = list(orchestrator.build("todo app", build_id="resume-after-code"))
+    assert updates[0]["resumed_phases"] == ["chat", "research", "plan", "code"]
+    assert updates[-1]["phase"] == "export"
+    rerun = [u["phase"] for u in updates if u.get("status") == "starting"]
+    assert not set(rerun) & {"chat", "research", "plan", "code"}
+    for kind in ("chat", "research", "plan", "code"):
+        assert fake.counts.get(kind) == calls.get(kind)
+    assert fake.counts["test"] > calls.get("test", 0)
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import cli
+from tools.fake_gemini import FakeGemini, serve
+
+
+@pytest.fixture
+def fake_env(monkeypatch):
+    server = serve(FakeGemini(seed=1, code_kb=8), port=0)
+    monkeypatch.setenv("VIBEBUILDER_GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1beta")
+    monkeypatch.setenv("GOOGLE_API_KEYS", "key-one,key-two")
+    # The worker's orchestrator is cached per process; start each test with a fresh one
+    monkeypatch.setattr(cli, "_orchestrator", None)
+    yield
+    server.shutdown()
+
+
+def test_read_ideas_skips_blanks_and_comments(tmp_path):
+    path = tmp_path / "ideas.txt"
+    path.write_text("# backlog\ntodo app\n\n  weather app  \n")
+    assert cli.read_ideas(str(path), ["chat app"]) == ["chat app", "todo app", "weather app"]
+    assert cli.slugify("Todo App: v2!") == "todo-app-v2"
+    assert cli.slugify("???") == "build"
+
+
+def test_parallel_builds_write_files_and_a_report(fake_env, tmp_path):
+    output = tmp_path / "builds"
+    code = cli.main(["--idea", "todo app", "--idea", "weather app", "-o", str(output), "-j", "2",
+                     "--iterations", "1"])
+    assert code == 0
+
+    report = json.loads((output / "report.json").read_text())
+    assert report["summary"]["builds"] == report["summary"]["succeeded"] == 2
+    assert [b["index"] for b in report["builds"]] == [0, 1]
+    for build, directory in zip(report["builds"], ("0000-todo-app", "0001-weather-app")):
+        assert build["output"] == str(output / directory)
+        assert (output / directory / "index.html").read_text().startswith("<!DOCTYPE html>")
+        versions = json.loads((output / directory / "versions.json").read_text())
+        assert [v["file"] for v in versions] == [f"v{n}.html" for n in range(1, len(versions) + 1)]
+        assert build["usage"]
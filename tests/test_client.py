@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agents.client import ModelClient, ModelError, RateLimitError
+from tools.fake_gemini import FakeGemini, serve
+from utils.cancellation import BuildCancelled, CancelToken, cancel_scope
+
+RESEARCH_PROMPT = "List best practices and UI/UX patterns for a todo app."
+
+
+@pytest.fixture
+def make_client():
+    """Client against a fresh fake server; both are shut down after the test"""
+    opened = []
+
+    def make(fake, **options):
+        server = serve(fake, port=0)
+        client = ModelClient("key", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1beta", **options)
+        opened.append((server, client))
+        return client
+
+    yield make
+    for server, client in opened:
+        client.close()
+        server.shutdown()
+
+
+def test_sequential_calls_reuse_one_connection(make_client):
+    client = make_client(FakeGemini(seed=1))
+    for _ in range(10):
+        assert client.model().generate_content(RESEARCH_PROMPT).text
+    stats = client.stats()
+    assert (stats["calls"], stats["errors"], stats["connections"]) == (10, 0, 1)
+
+
+def test_concurrent_calls_stay_within_the_pool(make_client):
+    client = make_client(FakeGemini(latency="fixed:0.05", seed=1), pool_size=4)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        texts = list(pool.map(lambda _: client.model().generate_content(RESEARCH_PROMPT).text, range(12)))
+    assert all(texts)
+    assert client.stats()["connections"] <= 4
+
+
+def test_generation_config_is_sent_in_api_field_names(make_client):
+    client = make_client(FakeGemini(seed=1))
+    model = client.model(generation_config={"response_mime_type": "application/json"})
+    # The fake only answers research prompts in JSON when responseMimeType arrives
+    assert "findings" in json.loads(model.generate_content(RESEARCH_PROMPT).text)
+
+
+def test_error_responses_raise_typed_errors(make_client):
+    client = make_client(FakeGemini(seed=1, rate_limit_rate=1.0))
+    with pytest.raises(RateLimitError) as raised:
+        client.model().generate_content(RESEARCH_PROMPT)
+    assert raised.value.status == 429 and raised.value.retry_after == 1.0
+    with pytest.raises(ModelError) as raised:
+        client.model("no/such model").generate_content(RESEARCH_PROMPT)
+    assert raised.value.status == 404
+    assert client.stats()["errors"] == 2
+
+
+def test_cancelling_aborts_a_call_in_flight(make_client):
+    client = make_client(FakeGemini(latency="fixed:5", seed=1))
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel, args=("client went away",)).start()
+    started = time.time()
+    with pytest.raises(BuildCancelled), cancel_scope(token):
+        client.model().generate_content(RESEARCH_PROMPT)
+    assert time.time() - started < 2
@@ -0,0 +1,72 @@
+import random
+import re
+
+import pytest
+
+from utils.code_cleaner import CodeCleaner, clean_code
+
+
+def legacy_clean_code(code: str) -> str:
+    """The per-agent _clean_code that utils.code_cleaner replaced"""
+    if not code: return ""
+    code = re.sub(r'^```html?\s*\n?', '', code, flags=re.MULTILINE)
+    code = re.sub(r'^```\s*$', '', code, flags=re.MULTILINE)
+    code = re.sub(r'```$', '', code)
+    code = code.strip()
+    html_start = code.lower().find('<!doctype')
+    if html_start == -1: html_start = code.lower().find('<html')
+    if html_start > 0: code = code[html_start:]
+    return code
+
+
+# Pieces that exercise every rule: fences, whitespace around them, markers
+# in mixed case and prose. No characters whose lowercase changes length
+# (e.g. U+0130): the legacy code cut at a shifted offset on those.
+_PIECES = ["```", "```html", "```htm", "```HTML", "``", "`", "\n", " ", "\t", "\r\n",
+           "<!DOCTYPE html>", "<!doctype html>", "<!DocType", "<html>", "<HTML lang=\"en\">",
+           "</html>", "<body>", "text", "Here is the app:", "h", "t", "m", "l", "é", "😀"]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "<!DOCTYPE html><html></html>",
+    "```html\n<!DOCTYPE html>\n<html></html>\n```",
+    "Sure! Here it is:\n```html\n<!DOCTYPE html><html></html>\n```\nEnjoy.",
+    "```\n<html><body>no doctype</body></html>\n```",
+    "  \n<HTML>\n```",
+    "no markup at all ```",
+])
+def test_matches_legacy_examples(text):
+    assert clean_code(text) == legacy_clean_code(text)
+
+
+def test_matches_legacy_fuzzed():
+    rng = random.Random(36)
+    for _ in range(20000):
+        text = ''.join(rng.choice(_PIECES) for _ in range(rng.randint(0, 24)))
+        assert clean_code(text) == legacy_clean_code(text), repr(text)
+
+
+def feed_in_chunks(text: str, rng: random.Random) -> str:
+    cleaner = CodeCleaner()
+    output, start = [], 0
+    while start < len(text):
+        end = start + rng.randint(1, 12)
+        output.append(cleaner.feed(text[start:end]))
+        start = end
+    output.append(cleaner.finish())
+    return ''.join(output)
+
+
+def test_chunked_feeding_matches_whole_text():
+    rng = random.Random(3636)
+    for _ in range(20000):
+        text = ''.join(rng.choice(_PIECES) for _ in range(rng.randint(0, 24)))
+        assert feed_in_chunks(text, rng) == clean_code(text), repr(text)
+
+
+def test_output_is_released_while_streaming():
+    cleaner = CodeCleaner()
+    assert cleaner.feed("Here you go:\n```html\n<!DOCTYPE html>\n<html><body>") == "<!DOCTYPE html>\n<html><body"
+    assert cleaner.feed("<h1>Hi</h1></body></html>\n```") == "><h1>Hi</h1></body></html"
+    assert cleaner.finish() == ">"
@@ -0,0 +1,26 @@
+import pytest
+
+from agents.client import ModelClient
+from agents.coder import CoderAgent
+from tools.fake_gemini import FakeGemini, serve
+
+
+@pytest.fixture
+def fake_client():
+    server = serve(FakeGemini(seed=1, code_kb=12), port=0)
+    client = ModelClient("key", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1beta")
+    yield client
+    client.close()
+    server.shutdown()
+
+
+def test_streamed_code_is_cleaned_as_it_arrives(fake_client):
+    coder = CoderAgent("key", client=fake_client)
+    pieces = []
+    streamed = coder.generate("todo app", "a list with an input", on_code=pieces.append)
+    whole = coder.generate("todo app", "a list with an input")
+
+    assert len(pieces) > 1
+    assert ''.join(pieces) == streamed["code"] == whole["code"]
+    assert streamed["code"].startswith("<!DOCTYPE html>")
+    assert streamed["usage"]["total_tokens"] == whole["usage"]["total_tokens"]
@@ -0,0 +1,43 @@
+import json
+
+from utils.component_library import ComponentLibrary
+
+
+def _component(component_id, kind, features, uses=1):
+    return {"id": component_id, "kind": kind, "html": "", "css": "", "classes": [], "names": [],
+            "features": features, "uses": uses, "updated_at": 0}
+
+
+def _library(tmp_path, components):
+    """A library loaded from a saved library file holding `components`"""
+    path = tmp_path / "components.json"
+    path.write_text(json.dumps(components))
+    return ComponentLibrary(str(path))
+
+
+def test_select_prefers_components_with_the_ideas_features(tmp_path):
+    library = _library(tmp_path, [
+        _component("form-aaaaaaaa", "form", ["submit"], uses=5),
+        _component("form-bbbbbbbb", "form", ["submit", "local_storage"]),
+    ])
+    chosen = library.select("contact form that remembers drafts offline")
+    assert [c["id"] for c in chosen] == ["form-bbbbbbbb"]
+
+
+def test_restaurant_menu_does_not_ask_for_navigation(tmp_path):
+    library = _library(tmp_path, [_component("nav-aaaaaaaa", "nav", [])])
+    assert library.select("restaurant menu with daily specials") == []
+
+
+def test_mined_components_are_selected_and_persisted(tmp_path):
+    path = str(tmp_path / "components.json")
+    library = ComponentLibrary(path)
+    code = ("<!DOCTYPE html><html><head><style>.site-nav { display: flex; gap: 1rem; }</style></head>"
+            "<body><nav class=\"site-nav\"><a href=\"#home\">Home</a><a href=\"#about\">About</a>"
+            "<a href=\"#contact\">Contact</a></nav></body></html>")
+    stored = library.mine(code, ["Navigation bar"])
+    assert len(stored) == 1 and stored[0].startswith("nav-")
+
+    chosen = ComponentLibrary(path).select("portfolio with a navigation menu")
+    assert [c["id"] for c in chosen] == stored
+    assert chosen[0]["css"] == ".site-nav { display: flex; gap: 1rem; }"
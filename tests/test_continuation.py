@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+from agents.debugger import DebuggerAgent
+from tools.fake_gemini import FakeGemini, serve
+from utils.code_cleaner import clean_code
+from utils.continuation import CONTINUATION_MARKER, generate_document, is_truncated, stitch
+
+DOCUMENT = "<!DOCTYPE html>\n<html><body><h1>Todo</h1></body></html>"
+
+
+class ScriptedModel:
+    """Returns the given (text, finish_reason) answers in order"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        text, finish_reason = self.answers.pop(0)
+        return SimpleNamespace(text=text, finish_reason=finish_reason)
+
+
+def test_prose_after_the_fence_is_not_a_truncation():
+    text = f"```html\n{DOCUMENT}\n```\n\nThis app uses localStorage to keep your tasks."
+    model = ScriptedModel((text, "STOP"), ("Sure! Here is the rest.", "STOP"))
+    output = generate_document(model, "build a todo app")
+    assert len(model.prompts) == 1
+    assert output["continuations"] == 0
+    assert output["text"] == text
+    # Without a finish reason the closing tag still counts, wherever it is
+    assert not is_truncated(text)
+
+
+def test_cut_off_document_is_continued_and_stitched():
+    cut = len(DOCUMENT) // 2
+    model = ScriptedModel((DOCUMENT[:cut], "MAX_TOKENS"), (DOCUMENT[cut - 20:], "STOP"))
+    output = generate_document(model, "build a todo app")
+    assert output["continuations"] == 1
+    assert output["text"] == DOCUMENT
+    assert not output["truncated"]
+
+
+def test_stitch_drops_restated_fences_and_repeated_text():
+    head, tail = DOCUMENT[:30], DOCUMENT[30:]
+    assert stitch(head, "```html\n" + DOCUMENT[10:]) == DOCUMENT
+    # A short accidental match is not taken for a repeat
+    assert stitch("<p>a</p>", "</p><p>b</p>") == "<p>a</p></p><p>b</p>"
+    # A model that starts over replaces the partial output
+    assert stitch(head, DOCUMENT) == DOCUMENT
+    assert stitch(head, tail) == DOCUMENT
+
+
+def test_continuations_stop_at_the_limit_or_an_empty_answer():
+    cut = len(DOCUMENT) // 3
+    pieces = [DOCUMENT[:cut], DOCUMENT[cut:2 * cut], DOCUMENT[2 * cut:]]
+    model = ScriptedModel(*[(piece, "MAX_TOKENS") for piece in pieces])
+    output = generate_document(model, "build a todo app", max_continuations=1)
+    assert output["continuations"] == 1 and output["truncated"]
+    assert output["text"] == DOCUMENT[:2 * cut]
+    assert CONTINUATION_MARKER in model.prompts[1] and model.prompts[1].count(pieces[0]) == 1
+
+    model = ScriptedModel((pieces[0], "MAX_TOKENS"), ("", "STOP"))
+    output = generate_document(model, "build a todo app")
+    assert output["continuations"] == 1 and output["truncated"] and output["text"] == pieces[0]
+
+
+def test_truncated_fix_is_continued_into_the_whole_document(monkeypatch):
+    fake = FakeGemini(seed=1, code_kb=12, truncate_rate=1.0)
+    server = serve(fake, port=0)
+    monkeypatch.setenv("VIBEBUILDER_GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1beta")
+    try:
+        result = DebuggerAgent("key").fix(DOCUMENT, "The heading is too small.")
+    finally:
+        server.shutdown()
+    assert result["continuations"] == 1 and fake.counts["continue"] == 1
+    assert result["fixed_code"] == clean_code(fake.document)
+    assert result["usage"]["total_tokens"] > 0
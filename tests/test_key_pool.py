@@ -0,0 +1,83 @@
+import pytest
+
+from agents import key_pool
+from agents.client import ModelResponse, RateLimitError
+from agents.key_pool import KeyPool, api_keys_from_env
+
+
+class _FakeClient:
+    """Answers locally; `limited` keys always return 429, `tokens` sets each key's next usage"""
+    limited = {}
+    tokens = {}
+
+    def __init__(self, api_key, **options):
+        self.api_key = api_key
+        self.calls = 0
+
+    def generate_content(self, model, prompt, generation_config=None, tools=None, on_text=None):
+        self.calls += 1
+        if self.api_key in self.limited:
+            raise RateLimitError(429, "Resource has been exhausted", self.limited[self.api_key])
+        total = self.tokens.pop(self.api_key, 10)
+        return ModelResponse({"candidates": [{"content": {"parts": [{"text": self.api_key}]}}],
+                              "usageMetadata": {"totalTokenCount": total}})
+
+    def stats(self):
+        return {"connections": 0}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    monkeypatch.setattr(key_pool, "ModelClient", _FakeClient)
+    monkeypatch.setattr(_FakeClient, "limited", {})
+    monkeypatch.setattr(_FakeClient, "tokens", {})
+    return _FakeClient
+
+
+def _keys_used(pool, calls):
+    return [pool.generate_content("gemini-2.5-flash", "prompt").text for _ in range(calls)]
+
+
+def test_calls_are_spread_evenly_across_keys(fake_clients):
+    pool = KeyPool(["a", "b", "c"], rpm_limit=100, tpm_limit=100000)
+    assert _keys_used(pool, 6) == ["a", "b", "c", "a", "b", "c"]
+    assert [k["calls"] for k in pool.stats()["keys"]] == [2, 2, 2]
+
+
+def test_a_key_near_its_token_quota_is_avoided(fake_clients):
+    fake_clients.tokens["a"] = 900
+    pool = KeyPool(["a", "b"], rpm_limit=100, tpm_limit=1000)
+    # "a" keeps a tenth of its tokens after the first call; "b" has more room for a while
+    assert _keys_used(pool, 5) == ["a", "b", "b", "b", "b"]
+    assert pool.stats()["keys"][0]["token_utilization"] == 0.9
+
+
+def test_a_rate_limited_key_cools_down_and_the_call_moves_on(fake_clients):
+    fake_clients.limited["a"] = 30
+    pool = KeyPool(["a", "b"], rpm_limit=100, tpm_limit=100000)
+    assert _keys_used(pool, 3) == ["b", "b", "b"]
+
+    stats = pool.stats()
+    assert stats["available"] == 1 and stats["rate_limited"] == 1
+    assert 29 <= stats["keys"][0]["cooling_down_for"] <= 30
+    # The pool's own bookkeeping for the failed call was released
+    assert stats["keys"][0]["in_flight"] == 0
+
+
+def test_every_key_cooling_past_the_wait_limit_fails_fast(fake_clients):
+    fake_clients.limited.update(a=key_pool.MAX_WAIT_SECONDS * 2, b=key_pool.MAX_WAIT_SECONDS * 2)
+    pool = KeyPool(["a", "b"])
+    with pytest.raises(RateLimitError):
+        pool.generate_content("gemini-2.5-flash", "prompt")
+    assert pool.stats()["available"] == 0
+
+
+def test_keys_from_env_drop_duplicates(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEYS", "a, b,a,,c")
+    assert api_keys_from_env() == ["a", "b", "c"]
+    monkeypatch.setenv("GOOGLE_API_KEYS", "")
+    monkeypatch.setenv("GOOGLE_API_KEY", "solo")
+    assert api_keys_from_env() == ["solo"]
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from agents.orchestrator import VibeBuilderOrchestrator
+from tools.fake_gemini import FakeGemini, serve
+from utils.checkpoint_store import CheckpointStore
+from utils.token_ledger import TokenLedger
+
+
+@pytest.fixture
+def fake_base_url(monkeypatch):
+    # Every test fails, so builds run all their test/fix rounds
+    server = serve(FakeGemini(seed=1, code_kb=8, pass_rate=0.0), port=0)
+    monkeypatch.setenv("VIBEBUILDER_GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1beta")
+    yield
+    server.shutdown()
+
+
+def test_resume_without_a_mode_after_research_was_cut(fake_base_url, tmp_path):
+    orchestrator = VibeBuilderOrchestrator("key", delay=0, checkpoint_store=CheckpointStore(str(tmp_path)))
+    build = orchestrator.build("todo app", build_id="resume-after-cut", mode="fast", deadline=60)
+    for update in build:
+        if update.get("phase") == "research" and update.get("status") == "complete":
+            assert update["data"]["source"] == "skipped"
+            break
+    # The client went away after research; the retry has no mode or deadline
+    build.close()
+
+    updates = list(orchestrator.build("todo app", build_id="resume-after-cut"))
+    export = updates[-1]
+    assert export["phase"] == "export"
+    assert "budget" not in export
+    assert "research" in updates[0]["resumed_phases"]
+
+
+@pytest.mark.parametrize("budget", [1, 500, 3000, 6000, 9000, 15000])
+def test_spend_stays_within_one_phase_of_the_budget(fake_base_url, budget):
+    orchestrator = VibeBuilderOrchestrator("key", delay=0)
+    ledger = TokenLedger(budget)
+    updates = list(orchestrator.build("todo app", max_iterations=2, ledger=ledger))
+
+    largest_phase = max((entry["total_tokens"] for entry in ledger.phases.values()), default=0)
+    assert ledger.spent() <= budget + largest_phase
+    if "error" in updates[-1]:
+        assert "code" not in ledger.phases
+    else:
+        assert updates[-1]["phase"] == "export"
@@ -0,0 +1,97 @@
+import hashlib
+import io
+import json
+import random
+import re
+import tarfile
+import zipfile
+
+import pytest
+
+from utils.project_export import split_project, stream_archive
+
+APP = """<!DOCTYPE html>
+<html>
+<head>
+<style>body { background: url(img/bg.png); }</style>
+<style media="print">nav { display: none; }</style>
+<script type="application/json" id="data">{"items": []}</script>
+</head>
+<body>
+<nav>Menu</nav>
+<script>console.log("first");</script>
+<script type="module">import { x } from "./local.js";</script>
+<script>console.log("second");</script>
+</body>
+</html>"""
+
+
+def _files(files):
+    return {f["path"]: f["data"] for f in files}
+
+
+def test_inline_css_and_js_become_hashed_assets_in_place():
+    files = _files(split_project(APP))
+    assets = sorted(path for path in files if path.startswith("assets/"))
+    assert [re.sub(r'\.[0-9a-f]{12}\.', '.<hash>.', path) for path in assets] == [
+        "assets/app-2.<hash>.js", "assets/app.<hash>.js", "assets/style-2.<hash>.css", "assets/style.<hash>.css"
+    ]
+    for path in assets:
+        assert hashlib.sha256(files[path]).hexdigest()[:12] in path
+
+    page = files["index.html"].decode("utf-8")
+    # Relative CSS urls move down a directory with the stylesheet
+    stylesheet = next(path for path in assets if path.startswith("assets/style."))
+    assert files[stylesheet] == b"body { background: url(../img/bg.png); }"
+    assert f'<link rel="stylesheet" href="{stylesheet}">' in page
+    assert 'media="print"' in page
+    # Data blocks and modules with relative imports stay inline; script order is kept
+    assert '<script type="application/json" id="data">' in page and 'from "./local.js"' in page
+    scripts = {path.split(".")[0]: path for path in assets if path.endswith(".js")}
+    first, second = (page.index(f'src="{scripts[name]}"') for name in ("assets/app", "assets/app-2"))
+    assert first < page.index('type="module">import') < second
+
+
+def test_manifest_lists_every_file_with_its_hash():
+    files = split_project(APP)
+    manifest = json.loads(_files(files)["manifest.json"])
+    assert manifest["entry"] == "index.html"
+    listed = {entry["path"]: entry for entry in manifest["files"]}
+    for f in files:
+        if f["path"] in ("manifest.json", "_headers"):
+            continue
+        assert listed[f["path"]]["sha256"] == hashlib.sha256(f["data"]).hexdigest()
+        assert listed[f["path"]]["bytes"] == len(f["data"])
+    assert "immutable" in listed[next(p for p in listed if p.endswith(".css"))]["cache_control"]
+    assert "immutable" not in listed["index.html"]["cache_control"]
+
+
+def test_identical_blocks_share_one_asset():
+    files = _files(split_project("<!DOCTYPE html><html><body><script>go()</script>"
+                                 "<p>x</p><script>go()</script></body></html>"))
+    (script,) = [path for path in files if path.endswith(".js")]
+    assert files["index.html"].decode("utf-8").count(f'src="{script}"') == 2
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar.gz"])
+def test_streamed_archives_hold_every_file(archive_format):
+    files = split_project(APP)
+    # An incompressible file past one chunk is written, and yielded, in pieces
+    files.append({"path": "assets/big.bin", "data": random.Random(1).randbytes(200_000), "cache_control": ""})
+    chunks = list(stream_archive(files, archive_format, root="todo-app"))
+    assert len(chunks) > 1
+    data = b"".join(chunks)
+
+    if archive_format == "zip":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert archive.testzip() is None
+            unpacked = {name: archive.read(name) for name in archive.namelist()}
+    else:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+            unpacked = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+    assert unpacked == {f"todo-app/{f['path']}": f["data"] for f in files}
+
+
+def test_unknown_archive_format_is_rejected():
+    with pytest.raises(ValueError):
+        list(stream_archive([], "rar"))
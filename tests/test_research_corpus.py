@@ -0,0 +1,41 @@
+import json
+
+from utils.research_corpus import ResearchCorpus
+
+NOTES = [{"title": "Todo list", "tags": "todo tasks", "text": "Persist tasks to localStorage."}]
+
+
+def test_oldest_learned_entries_are_evicted_past_the_cap(tmp_path):
+    path = tmp_path / "research.json"
+    corpus = ResearchCorpus(str(path), notes=NOTES, max_learned=2)
+    for name in ("weather app", "kanban board", "music player"):
+        assert corpus.add(name, f"Research about a {name} with charts.", tags="widgets")
+
+    assert corpus.stats()["sources"] == {"curated": 1, "build": 2}
+    assert [e["title"] for e in json.loads(path.read_text())] == ["kanban board", "music player"]
+    assert corpus.search("weather") == []
+    # An evicted idea can be learned again
+    assert corpus.add("weather app", "Research about a weather app with charts.", tags="widgets")
+
+
+def test_bm25_stats_after_eviction_match_a_fresh_index(tmp_path):
+    corpus = ResearchCorpus(notes=NOTES, max_learned=2)
+    for name in ("weather app", "kanban board", "music player"):
+        corpus.add(name, f"Research about a {name} with charts.", tags="widgets")
+
+    fresh = ResearchCorpus(notes=NOTES, max_learned=2)
+    for name in ("kanban board", "music player"):
+        fresh.add(name, f"Research about a {name} with charts.", tags="widgets")
+
+    for query in ("kanban charts", "todo tasks widgets", "weather"):
+        assert corpus.search(query) == fresh.search(query)
+    assert corpus.stats() == fresh.stats()
+
+
+def test_restart_loads_only_the_newest_entries(tmp_path):
+    path = tmp_path / "research.json"
+    path.write_text(json.dumps([{"title": f"app {n}", "tags": "", "text": f"notes {n}", "source": "build"}
+                                for n in range(5)]))
+    corpus = ResearchCorpus(str(path), notes=NOTES, max_learned=3)
+    assert corpus.stats()["sources"] == {"curated": 1, "build": 3}
+    assert corpus.search("notes")[0]["title"] in ("app 2", "app 3", "app 4")
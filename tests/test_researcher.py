@@ -0,0 +1,10 @@
+from agents.researcher import ResearcherAgent
+
+
+def test_insights_skip_bold_section_headers():
+    text = ("**Thinking Process**: Looking at leading apps.\n"
+            "**Key Findings**:\n"
+            "* Persist every change to localStorage.\n"
+            "- Visible focus rings on every control.")
+    insights = ResearcherAgent("fake")._extract_key_insights(text)
+    assert insights == ["Persist every change to localStorage.", "Visible focus rings on every control."]
@@ -0,0 +1,89 @@
+import threading
+
+from utils.single_flight import SingleFlight, flight_key, normalize_feedback
+
+
+def _gated_build(gate, started):
+    """A build that emits one event, then waits on `gate` (or its cancel token)"""
+    def start(cancel):
+        started.append(cancel)
+
+        def events():
+            yield {"phase": "research", "status": "starting"}
+            while not gate.wait(0.01):
+                cancel.check()
+            yield {"phase": "complete", "status": "complete"}
+        return events()
+    return start
+
+
+def test_identical_requests_share_one_build_and_replay_its_events():
+    flights = SingleFlight()
+    gate, started = threading.Event(), []
+    key = flight_key("Todo app!", {"mode": "fast"})
+    assert key == flight_key("  todo APP ", {"mode": "fast"})
+    assert key != flight_key("todo app", {"mode": "quality"})
+
+    first, first_started = flights.join(key, _gated_build(gate, started))
+    late, late_started = flights.join(key, _gated_build(gate, started))
+    assert (first_started, late_started) == (True, False)
+    assert late is first and len(started) == 1
+    assert flights.stats() == {"in_flight": 1, "subscribers": 2, "started": 1, "coalesced": 1}
+
+    gate.set()
+    events = list(late.subscribe())
+    assert [e["phase"] for e in events] == ["research", "complete"]
+    assert list(first.subscribe()) == events
+    flights.leave(first)
+    flights.leave(late)
+    assert not started[0].cancelled
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_last_client_leaving_cancels_the_build():
+    flights = SingleFlight()
+    gate, started = threading.Event(), []
+    key = flight_key("todo app")
+    first, _ = flights.join(key, _gated_build(gate, started))
+    second, _ = flights.join(key, _gated_build(gate, started))
+
+    flights.leave(first)
+    assert not started[0].cancelled
+    flights.leave(second)
+    assert started[0].cancelled
+
+    events = list(first.subscribe())
+    assert events[-1]["status"] == "cancelled"
+    assert "every client disconnected" in events[-1]["error"]
+
+
+def test_a_new_request_does_not_join_a_cancelled_build():
+    flights = SingleFlight()
+    gate, started = threading.Event(), []
+    key = flight_key("todo app")
+    abandoned, _ = flights.join(key, _gated_build(gate, started))
+    flights.leave(abandoned)
+
+    fresh, fresh_started = flights.join(key, _gated_build(gate, started))
+    assert fresh_started and fresh is not abandoned
+    gate.set()
+    assert list(fresh.subscribe())[-1]["phase"] == "complete"
+    flights.leave(fresh)
+
+
+def test_subscribe_ticks_while_the_build_is_quiet():
+    flights = SingleFlight()
+    gate, started = threading.Event(), []
+    flight, _ = flights.join(flight_key("todo app"), _gated_build(gate, started))
+    stream = flight.subscribe(tick=0.01)
+    assert next(stream)["phase"] == "research"
+    assert next(stream) is None
+    gate.set()
+    assert [e for e in stream if e is not None][-1]["phase"] == "complete"
+    flights.leave(flight)
+
+
+def test_feedback_keys_keep_punctuation():
+    assert normalize_feedback("  Set color  #333 ") == "set color #333"
+    assert (flight_key("Set color #333", normalize=normalize_feedback)
+            != flight_key("set color 333", normalize=normalize_feedback))
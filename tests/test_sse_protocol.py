@@ -0,0 +1,101 @@
+import json
+import zlib
+
+from utils.sse_protocol import (CompactEncoder, LegacyEncoder, apply_line_delta, compare_protocols,
+                                line_delta, negotiate)
+
+PAGE = "<!DOCTYPE html>\n<html>\n<body>\n" + "".join(f"<p>row {n}</p>\n" for n in range(60)) + "</body>\n</html>"
+FIXED = PAGE.replace("<p>row 30</p>", "<p>row thirty</p>")
+
+
+class _Client:
+    """What the browser does with protocol 2 frames (app.js): resolve docs and $doc refs"""
+
+    def __init__(self, seeded=None):
+        self.docs = {"input": seeded} if seeded else {}
+
+    def decode(self, frame: bytes):
+        assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+        event = json.loads(frame[len(b"data: "):])
+        assert event.pop("v") == 2
+        for digest, definition in event.pop("docs", {}).items():
+            if "body" in definition:
+                self.docs[digest] = definition["body"]
+            else:
+                self.docs[digest] = apply_line_delta(self.docs[definition["base"]], definition["delta"])
+        return self._resolve(event)
+
+    def _resolve(self, value):
+        if isinstance(value, dict):
+            if set(value) == {"$doc"}:
+                return self.docs[value["$doc"]]
+            return {key: self._resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(item) for item in value]
+        return value
+
+
+EVENTS = [
+    {"phase": "code", "status": "complete", "data": {"code": PAGE}},
+    {"phase": "fix", "status": "complete", "data": {"fixed_code": FIXED}},
+    {"phase": "export", "status": "complete", "data": {"final_code": FIXED, "versions": [{"code": PAGE}]}},
+]
+
+
+def test_documents_are_sent_once_then_referenced_or_delta_encoded():
+    encoder, client = CompactEncoder(), _Client()
+    frames = [encoder.encode(event) for event in EVENTS]
+    assert [client.decode(frame) for frame in frames] == EVENTS
+
+    sent = [json.loads(frame[len(b"data: "):]).get("docs", {}) for frame in frames]
+    assert [d["body"] for d in sent[0].values()] == [PAGE]
+    # The fix changes one line, so it goes out as a delta against the first document
+    (fix,) = sent[1].values()
+    assert fix == {"base": list(sent[0])[0], "delta": [[33], [-1], "<p>row thirty</p>\n", [31]]}
+    # Both documents are known by the export, which repeats neither
+    assert sent[2] == {}
+
+
+def test_refine_deltas_against_the_code_the_client_sent():
+    encoder, client = CompactEncoder(), _Client(seeded=PAGE)
+    encoder.seed(PAGE)
+    frame = encoder.encode({"phase": "refine", "data": {"refined_code": FIXED}})
+    (definition,) = json.loads(frame[len(b"data: "):])["docs"].values()
+    assert definition["base"] == "input"
+    assert client.decode(frame)["data"]["refined_code"] == FIXED
+
+
+def test_line_delta_round_trips_mixed_line_endings():
+    cases = [
+        ("", "one\ntwo"),
+        ("one\ntwo\n", ""),
+        ("a\r\nb\rc\nd", "a\r\nB\rc\nd\n"),
+        ("keep same line\nend", "keep same line\nchanged"),
+        ("no trailing newline", "no trailing newline\nadded"),
+        (PAGE, FIXED),
+    ]
+    for old, new in cases:
+        assert apply_line_delta(old, line_delta(old, new)) == new
+
+
+def test_deflated_stream_decodes_event_by_event():
+    encoder, client = CompactEncoder(deflate=True), _Client()
+    inflater = zlib.decompressobj(15)
+    for event in EVENTS:
+        # Each event is sync-flushed, so it decodes before the stream ends
+        assert client.decode(inflater.decompress(encoder.encode(event))) == event
+    heartbeat = inflater.decompress(encoder.comment("heartbeat"))
+    assert heartbeat == b": heartbeat\n\n"
+    assert inflater.decompress(encoder.close()) == b"" and inflater.eof
+
+
+def test_negotiation_and_sizes():
+    assert isinstance(negotiate(None, {}, "gzip, deflate"), LegacyEncoder)
+    assert negotiate("2", None, "").content_encoding is None
+    assert negotiate(None, {"protocol": 2, "deflate": True}, "gzip, deflate").content_encoding == "deflate"
+    # Deflate is only used when the client accepts it
+    assert negotiate(None, {"protocol": 2, "deflate": True}, "gzip").content_encoding is None
+    assert negotiate("junk", {}, "deflate").protocol == 1
+
+    sizes = compare_protocols(EVENTS)
+    assert sizes["compact_deflate"] < sizes["compact"] < sizes["legacy"] / 2
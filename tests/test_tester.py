@@ -0,0 +1,44 @@
+import json
+from types import SimpleNamespace
+
+from agents import tester
+
+CODE = "<!DOCTYPE html>\n<html><body><button>Add</button><script>add()</script></body></html>"
+
+
+class ScriptedClient:
+    """ModelClient stand-in whose model answers `text`"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def model(self, name, generation_config=None):
+        return SimpleNamespace(generate_content=lambda prompt: SimpleNamespace(text=self.text))
+
+
+def run_tester(text):
+    return tester.TesterAgent("key", client=ScriptedClient(text)).test(CODE)
+
+
+def test_verdict_follows_issue_severities():
+    minor = {"issues": [{"description": "Footer spacing is tight.", "severity": "minor"}], "passed": False}
+    assert run_tester(json.dumps(minor))["passed"]
+
+    major = {"issues": [{"description": "Add button does nothing.", "severity": "major"}], "passed": True}
+    result = run_tester(json.dumps(major))
+    assert not result["passed"]
+    assert result["analysis"] == "- Add button does nothing. (major)"
+
+
+def test_text_fallback_without_marker():
+    assert run_tester("The code looks solid.")["passed"]
+
+    result = run_tester("- Buttons lack focus styles (minor)\n- The form does not validate input")
+    assert not result["passed"]
+    assert [issue["severity"] for issue in result["issues"]] == ["minor", "major"]
+
+
+def test_failure_without_issues_still_guides_the_fix():
+    result = run_tester("")
+    assert not result["passed"]
+    assert result["analysis"] == tester.UNSPECIFIED_FAILURE